@@ -4,7 +4,9 @@ from PyQt6.QtWidgets import (
     QHBoxLayout, QLabel, QPushButton, QMessageBox
 )
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor, QPalette,QIcon
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme, set_variant, VARIANT_MENU
+from LogConfig import setup_logging
 
 from Appointment import AppointmentsApp
 from Diagnosis import DiagnosisApp
@@ -14,6 +16,10 @@ from Doctor import DoctorsApp
 from MedicalCard import MedicalCardApp
 from Users import UsersApp
 from Patient import PatientsApp
+from Analytics import DashboardApp
+from Waitlist import WaitlistApp
+from Audit import AuditApp
+from WindowManager import WindowManager
 
 class MainApp(QMainWindow):
     def __init__(self):
@@ -29,37 +35,11 @@ class MainApp(QMainWindow):
         self.med_white = QColor(255, 255, 255)  # Белый
         self.med_red = QColor(200, 16, 46)  # Для предупреждений
 
-        # Установка стиля приложения
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {self.med_light.name()};
-            }}
-            QPushButton {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 15px 20px;
-                font-size: 16px;
-                min-width: 200px;
-            }}
-            QPushButton:hover {{
-                background-color: {self.med_blue.darker(110).name()};
-            }}
-            QPushButton:pressed {{
-                background-color: {self.med_blue.darker(120).name()};
-            }}
-            QPushButton:disabled {{
-                background-color: #cccccc;
-            }}
-        """)
-
-        # Настройка цветовой палитры
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Window, self.med_light)
-        palette.setColor(QPalette.ColorRole.Base, self.med_white)
-        palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-        self.setPalette(palette)
+        # Оформление задаётся темой приложения (Theme.py)
+        set_variant(self, VARIANT_MENU)
+
+        # Открытые из меню окна переиспользуются, а не создаются заново
+        self.windows = WindowManager(self)
 
         self.setup_ui()
 
@@ -73,14 +53,7 @@ class MainApp(QMainWindow):
 
         # Заголовок
         title_label = QLabel("Главное меню")
-        title_label.setStyleSheet(f"""
-            QLabel {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {self.med_blue.name()};
-                padding: 10px;
-            }}
-        """)
+        title_label.setObjectName("title")
         layout.addWidget(title_label)
 
         # Контейнер для кнопок (две колонки)
@@ -104,13 +77,16 @@ class MainApp(QMainWindow):
         self.patient_btn = QPushButton("Пациенты")
         self.specialization_btn = QPushButton("Специализации")
         self.users_btn = QPushButton("Пользователи")
+        self.analytics_btn = QPushButton("Аналитика")
+        self.waitlist_btn = QPushButton("Лист ожидания")
+        self.audit_btn = QPushButton("Журнал аудита")
         self.logout_btn = QPushButton("Выход")
 
         # Установка курсора для кнопок
         for btn in [
             self.appointment_btn, self.diagnosis_btn, self.doctor_btn, self.jobtitle_btn,
             self.medicalcard_btn, self.patient_btn, self.specialization_btn, self.users_btn,
-            self.logout_btn
+            self.analytics_btn, self.waitlist_btn, self.audit_btn, self.logout_btn
         ]:
             btn.setCursor(Qt.CursorShape.PointingHandCursor)
 
@@ -123,6 +99,9 @@ class MainApp(QMainWindow):
         self.patient_btn.clicked.connect(self.open_patient)
         self.specialization_btn.clicked.connect(self.open_specialization)
         self.users_btn.clicked.connect(self.open_users)
+        self.analytics_btn.clicked.connect(self.open_analytics)
+        self.waitlist_btn.clicked.connect(self.open_waitlist)
+        self.audit_btn.clicked.connect(self.open_audit)
         self.logout_btn.clicked.connect(self.open_login)
 
         # Распределение кнопок по колонкам (без кнопки выхода)
@@ -136,11 +115,19 @@ class MainApp(QMainWindow):
         right_column.addWidget(self.specialization_btn)
         right_column.addWidget(self.users_btn)
 
+        # Аналитика, лист ожидания и журнал аудита отдельной строкой под колонками
+        analytics_layout = QHBoxLayout()
+        analytics_layout.setSpacing(20)
+        analytics_layout.addWidget(self.analytics_btn)
+        analytics_layout.addWidget(self.waitlist_btn)
+        analytics_layout.addWidget(self.audit_btn)
+
         # Добавление колонок в основной layout
         buttons_layout.addLayout(left_column)
         buttons_layout.addLayout(right_column)
 
         layout.addLayout(buttons_layout)
+        layout.addLayout(analytics_layout)
 
         # Создаем отдельный layout для кнопки "Выход" и центрируем её
         logout_layout = QHBoxLayout()
@@ -158,57 +145,67 @@ class MainApp(QMainWindow):
         if AppointmentsApp is None:
             QMessageBox.critical(self, "Ошибка", "Модуль 'Приёмы' не найден.")
             return
-        self.appointment_window = AppointmentsApp()
-        self.appointment_window.show()
+        self.windows.open("appointment", AppointmentsApp)
 
     def open_diagnosis(self):
         if DiagnosisApp is None:
             QMessageBox.critical(self, "Ошибка", "Модуль 'Диагнозы' не найден.")
             return
-        self.diagnosis_window = DiagnosisApp()
-        self.diagnosis_window.show()
+        self.windows.open("diagnosis", DiagnosisApp)
 
     def open_doctor(self):
         if DoctorsApp is None:
             QMessageBox.critical(self, "Ошибка", "Модуль 'Врачи' не найден.")
             return
-        self.doctor_window = DoctorsApp()
-        self.doctor_window.show()
+        self.windows.open("doctor", DoctorsApp)
 
     def open_jobtitle(self):
         if JobTitleApp is None:
             QMessageBox.critical(self, "Ошибка", "Модуль 'Должности' не найден.")
             return
-        self.jobtitle_window = JobTitleApp()
-        self.jobtitle_window.show()
+        self.windows.open("jobtitle", JobTitleApp)
 
     def open_medicalcard(self):
         if MedicalCardApp is None:
             QMessageBox.critical(self, "Ошибка", "Модуль 'Мед. карты' не найден.")
             return
-        self.medicalcard_window = MedicalCardApp()
-        self.medicalcard_window.show()
+        self.windows.open("medicalcard", MedicalCardApp)
 
     def open_patient(self):
         if PatientsApp is None:
             QMessageBox.critical(self, "Ошибка", "Модуль 'Пациенты' не найден.")
             return
-        self.patient_window = PatientsApp()
-        self.patient_window.show()
+        self.windows.open("patient", PatientsApp)
 
     def open_specialization(self):
         if SpecializationApp is None:
             QMessageBox.critical(self, "Ошибка", "Модуль 'Специализации' не найден.")
             return
-        self.specialization_window = SpecializationApp()
-        self.specialization_window.show()
+        self.windows.open("specialization", SpecializationApp)
 
     def open_users(self):
         if UsersApp is None:
             QMessageBox.critical(self, "Ошибка", "Модуль 'Пользователи' не найден.")
             return
-        self.users_window = UsersApp()
-        self.users_window.show()
+        self.windows.open("users", UsersApp)
+
+    def open_analytics(self):
+        if DashboardApp is None:
+            QMessageBox.critical(self, "Ошибка", "Модуль 'Аналитика' не найден.")
+            return
+        self.windows.open("analytics", DashboardApp)
+
+    def open_waitlist(self):
+        if WaitlistApp is None:
+            QMessageBox.critical(self, "Ошибка", "Модуль 'Лист ожидания' не найден.")
+            return
+        self.windows.open("waitlist", WaitlistApp)
+
+    def open_audit(self):
+        if AuditApp is None:
+            QMessageBox.critical(self, "Ошибка", "Модуль 'Журнал аудита' не найден.")
+            return
+        self.windows.open("audit", AuditApp)
 
     def open_login(self):
         """Закрывает текущее окно и открывает окно авторизации"""
@@ -217,8 +214,14 @@ class MainApp(QMainWindow):
         self.login_window = LoginWindow()
         self.login_window.show()
 
+    def closeEvent(self, event):
+        self.windows.close_all()
+        event.accept()
+
 if __name__ == "__main__":
+    setup_logging()
     app = QApplication(sys.argv)
+    apply_theme(app)
     app.setStyle("Fusion")
     window = MainApp()
     window.show()
@@ -0,0 +1,373 @@
+import sys
+import logging
+from Database import connect
+from PyQt6.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout,
+    QHBoxLayout, QLabel, QPushButton, QTableWidget,
+    QTableWidgetItem, QMessageBox, QHeaderView, QDateEdit, QTabWidget,
+    QComboBox, QScrollArea
+)
+from PyQt6.QtCore import Qt, QDate, QTimer
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme
+from LogConfig import setup_logging
+
+from datetime import timedelta
+
+from Scheduling import WORKDAY_START_HOUR, WORKDAY_END_HOUR
+from Heatmap import np, SlotMatrix, HeatmapWidget, SLOT_LABELS
+from Formatting import format_price
+from QueryRunner import run_cancellable, QueryCancelled, is_busy
+from Config import config
+
+# Материализованные представления из миграции 003_appointment_stats_views пересчитывает задание
+# обслуживания (python Maintenance.py stats); окно только перечитывает их по таймеру
+STATS_REFRESH_INTERVAL_MS = config.getint('cache', 'stats_refresh_interval', fallback=10 * 60) * 1000
+WORKDAY_MINUTES = (WORKDAY_END_HOUR - WORKDAY_START_HOUR) * 60
+
+# Общие агрегаты поверх appointment_monthly_stats (алиас s)
+STATS_COLUMNS = """
+    SUM(s.total_count), SUM(s.completed_count), SUM(s.cancelled_count),
+    SUM(s.revenue), SUM(s.expected_revenue), SUM(s.booked_minutes), SUM(s.working_days)
+"""
+
+STATS_QUERIES = {
+    'doctor': f"""
+        SELECT COALESCE(d.secondname || ' ' || d.firstname || ' ' || COALESCE(d.midname, ''), 'Без врача'),
+               COALESCE(sp.specializationname, '—'),
+               {STATS_COLUMNS}
+        FROM appointment_monthly_stats s
+        LEFT JOIN doctor d ON d.doctorid = s.doctorid
+        LEFT JOIN specialization sp ON sp.specializationid = d.specializationid
+        WHERE s.month BETWEEN %s AND %s
+        GROUP BY s.doctorid, d.secondname, d.firstname, d.midname, sp.specializationname
+        ORDER BY SUM(s.revenue) DESC
+    """,
+    'specialization': f"""
+        SELECT COALESCE(sp.specializationname, 'Без специализации'),
+               {STATS_COLUMNS}
+        FROM appointment_monthly_stats s
+        LEFT JOIN doctor d ON d.doctorid = s.doctorid
+        LEFT JOIN specialization sp ON sp.specializationid = d.specializationid
+        WHERE s.month BETWEEN %s AND %s
+        GROUP BY sp.specializationname
+        ORDER BY SUM(s.revenue) DESC
+    """,
+    'month': f"""
+        SELECT to_char(s.month, 'MM.YYYY'),
+               {STATS_COLUMNS}
+        FROM appointment_monthly_stats s
+        WHERE s.month BETWEEN %s AND %s
+        GROUP BY s.month
+        ORDER BY s.month
+    """,
+    # По дням: рабочим днём врача считается день, в который у него есть неотменённые приёмы
+    'day': """
+        SELECT to_char(s.day, 'DD.MM.YYYY'),
+               SUM(s.total_count), SUM(s.completed_count), SUM(s.cancelled_count),
+               SUM(s.revenue), SUM(s.expected_revenue), SUM(s.booked_minutes),
+               COUNT(*) FILTER (WHERE s.booked_minutes > 0)
+        FROM appointment_daily_stats s
+        WHERE s.day >= %s AND s.day < %s::date + interval '1 month'
+        GROUP BY s.day
+        ORDER BY s.day
+    """,
+}
+
+STATS_HEADERS = ["Приёмов", "Завершено", "Отменено", "Выручка", "Ожидается", "Загрузка, %"]
+
+
+def utilisation(booked_minutes, working_days):
+    """Доля занятого времени в дни приёма (в процентах)"""
+    if not working_days:
+        return 0.0
+    return float(booked_minutes) / (working_days * WORKDAY_MINUTES) * 100
+
+
+class DashboardApp(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Медицинская информационная система - Аналитика")
+        self.setGeometry(100, 100, 1100, 700)
+        self.setWindowIcon(QIcon('icon.jpg'))
+
+        # Медицинская цветовая схема
+        self.med_blue = QColor(0, 109, 176)  # Основной синий цвет
+        self.med_light = QColor(229, 243, 255)  # Светлый фон
+        self.med_white = QColor(255, 255, 255)  # Белый
+
+        self.conn = None
+        self.cursor = None
+        self.connect_to_db()
+        self.setup_ui()
+        self.load_data()
+
+        # Периодическое обновление, пока окно на экране (таймер запускается в showEvent)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(STATS_REFRESH_INTERVAL_MS)
+        self.refresh_timer.timeout.connect(self.refresh_data)
+
+    def connect_to_db(self):
+        """Подключение к базе данных"""
+        try:
+            self.conn = connect()
+            self.cursor = self.conn.cursor()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {str(e)}")
+            sys.exit(1)
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса"""
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout(central_widget)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        title_label = QLabel("Выручка и загрузка врачей")
+        title_label.setObjectName("title")
+        layout.addWidget(title_label)
+
+        # Период (по месяцам)
+        period_layout = QHBoxLayout()
+        period_layout.setSpacing(10)
+        today = QDate.currentDate()
+        self.month_start_input = QDateEdit(QDate(today.year(), 1, 1))
+        self.month_start_input.setDisplayFormat("MM.yyyy")
+        self.month_start_input.setCalendarPopup(True)
+        self.month_end_input = QDateEdit(QDate(today.year(), today.month(), 1))
+        self.month_end_input.setDisplayFormat("MM.yyyy")
+        self.month_end_input.setCalendarPopup(True)
+
+        self.show_btn = QPushButton("Показать")
+        self.refresh_btn = QPushButton("Обновить")
+        for btn in [self.show_btn, self.refresh_btn]:
+            btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.show_btn.clicked.connect(self.load_data)
+        self.refresh_btn.clicked.connect(self.load_data)
+
+        period_layout.addWidget(QLabel("С:"))
+        period_layout.addWidget(self.month_start_input)
+        period_layout.addWidget(QLabel("По:"))
+        period_layout.addWidget(self.month_end_input)
+        period_layout.addWidget(self.show_btn)
+        period_layout.addStretch()
+        period_layout.addWidget(self.refresh_btn)
+        layout.addLayout(period_layout)
+
+        self.summary_label = QLabel()
+        self.summary_label.setStyleSheet("font-size: 14px; padding: 5px;")
+        layout.addWidget(self.summary_label)
+
+        # Таблицы в разрезах: врач, специализация, месяц
+        self.tabs = QTabWidget()
+        self.tables = {
+            'doctor': self.create_table(["Врач", "Специализация"]),
+            'specialization': self.create_table(["Специализация"]),
+            'month': self.create_table(["Месяц"]),
+            'day': self.create_table(["День"]),
+        }
+        self.tabs.addTab(self.tables['doctor'], "По врачам")
+        self.tabs.addTab(self.tables['specialization'], "По специализациям")
+        self.tabs.addTab(self.tables['month'], "По месяцам")
+        self.tabs.addTab(self.tables['day'], "По дням")
+        self.tabs.addTab(self.create_heatmap_tab(), "Тепловая карта")
+        layout.addWidget(self.tabs)
+
+    def create_heatmap_tab(self):
+        """Вкладка с картой загрузки врачей по слотам/дням и показателями по врачам"""
+        tab = QWidget()
+        tab_layout = QVBoxLayout(tab)
+        self.slot_matrix = None
+        if np is None:
+            tab_layout.addWidget(QLabel("Для тепловой карты нужна библиотека numpy (pip install numpy)"))
+            return tab
+
+        self.heatmap_mode_combo = QComboBox()
+        self.heatmap_mode_combo.addItem("По времени приёма", 'slot')
+        self.heatmap_mode_combo.addItem("По дням", 'day')
+        self.heatmap_mode_combo.currentIndexChanged.connect(self.show_heatmap)
+        tab_layout.addWidget(self.heatmap_mode_combo)
+
+        self.heatmap = HeatmapWidget()
+        scroll = QScrollArea()
+        scroll.setWidget(self.heatmap)
+        scroll.setWidgetResizable(True)
+        tab_layout.addWidget(scroll, 3)
+
+        self.heatmap_table = QTableWidget()
+        headers = ["Врач", "Загрузка, %", "Пиковое время", "Двойная запись (слотов)", "Отмены, %", "Неявки, %"]
+        self.heatmap_table.setColumnCount(len(headers))
+        self.heatmap_table.setHorizontalHeaderLabels(headers)
+        self.heatmap_table.verticalHeader().setVisible(False)
+        self.heatmap_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.heatmap_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        tab_layout.addWidget(self.heatmap_table, 2)
+        return tab
+
+    def create_table(self, label_headers):
+        table = QTableWidget()
+        headers = label_headers + STATS_HEADERS
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.verticalHeader().setVisible(False)
+        table.setAlternatingRowColors(True)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        return table
+
+    def period(self):
+        """Первые дни начального и конечного месяцев"""
+        start = self.month_start_input.date()
+        end = self.month_end_input.date()
+        return (QDate(start.year(), start.month(), 1).toString("yyyy-MM-dd"),
+                QDate(end.year(), end.month(), 1).toString("yyyy-MM-dd"))
+
+    def load_data(self, quiet=False):
+        """Загрузка предрасчитанных показателей за период; при quiet ошибки только журналируются"""
+        month_start, month_end = self.period()
+        if month_start > month_end:
+            QMessageBox.warning(self, "Ошибка", "Начальный месяц не может быть позже конечного")
+            return
+        heatmap_period = self.heatmap_period()
+        try:
+            report = run_cancellable(
+                self, self.conn, lambda cursor: self.fetch_report(cursor, month_start, month_end, heatmap_period),
+                "Загрузка аналитики..."
+            )
+        except QueryCancelled:
+            logging.debug("Загрузка аналитики отменена")
+            return
+        except Exception as e:
+            logging.error(f"Ошибка при загрузке аналитики: {str(e)}")
+            if not quiet:
+                QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить аналитику: {str(e)}")
+            return
+
+        for key, table in self.tables.items():
+            self.fill_table(table, report['tables'][key])
+        self.update_summary(report['summary'])
+        if report['heatmap'] is not None:
+            self.show_heatmap_report(*report['heatmap'])
+        logging.debug(f"Аналитика загружена за период {month_start} - {month_end}")
+
+    def fetch_report(self, cursor, month_start, month_end, heatmap_period):
+        """Все запросы отчёта; выполняется в потоке QueryRunner, виджеты здесь не трогаются"""
+        report = {'tables': {}, 'heatmap': None}
+        for key in self.tables:
+            cursor.execute(STATS_QUERIES[key], (month_start, month_end))
+            report['tables'][key] = cursor.fetchall()
+        cursor.execute(f"""
+            SELECT {STATS_COLUMNS}
+            FROM appointment_monthly_stats s
+            WHERE s.month BETWEEN %s AND %s
+        """, (month_start, month_end))
+        report['summary'] = cursor.fetchone()
+        if np is not None:
+            report['heatmap'] = self.fetch_heatmap(cursor, *heatmap_period)
+        return report
+
+    def heatmap_period(self):
+        """Первый и последний день выбранных месяцев"""
+        start = self.month_start_input.date()
+        end = self.month_end_input.date()
+        start_date = QDate(start.year(), start.month(), 1).toPyDate()
+        end_date = QDate(end.year(), end.month(), 1).addMonths(1).toPyDate() - timedelta(days=1)
+        return start_date, end_date
+
+    def fetch_heatmap(self, cursor, start_date, end_date):
+        """Матрица занятости слотов за период"""
+        cursor.execute("""
+            SELECT doctorid, secondname || ' ' || firstname || ' ' || COALESCE(midname, '')
+            FROM doctor
+            ORDER BY secondname, firstname
+        """)
+        doctors = cursor.fetchall()
+        matrix = SlotMatrix.load(cursor, [doctor_id for doctor_id, _ in doctors], start_date, end_date)
+        return [name for _, name in doctors], matrix
+
+    def show_heatmap_report(self, doctor_names, matrix):
+        self.heatmap_doctor_names = doctor_names
+        self.slot_matrix = matrix
+        rows = zip(self.heatmap_doctor_names, matrix.utilisation(), matrix.peak_slots(),
+                   matrix.double_booked_slots(), matrix.cancel_rate(), matrix.no_show_rate(),
+                   matrix.appointment_count)
+        self.heatmap_table.setRowCount(len(doctor_names))
+        for row_idx, (name, load, peak, doubled, cancelled, no_show, count) in enumerate(rows):
+            values = [name, f"{load * 100:.1f}", SLOT_LABELS[peak] if count else "—",
+                      str(doubled), f"{cancelled * 100:.1f}", f"{no_show * 100:.1f}"]
+            for col_idx, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col_idx:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                self.heatmap_table.setItem(row_idx, col_idx, item)
+        self.show_heatmap()
+
+    def show_heatmap(self):
+        if self.slot_matrix is None:
+            return
+        if self.heatmap_mode_combo.currentData() == 'slot':
+            self.heatmap.set_data(self.slot_matrix.slot_utilisation(), self.heatmap_doctor_names, SLOT_LABELS)
+        else:
+            self.heatmap.set_data(self.slot_matrix.day_utilisation(), self.heatmap_doctor_names,
+                                  self.slot_matrix.day_labels())
+
+    def fill_table(self, table, rows):
+        table.setRowCount(len(rows))
+        for row_idx, row in enumerate(rows):
+            labels, stats = row[:-7], row[-7:]
+            total, completed, cancelled, revenue, expected, booked_minutes, working_days = stats
+            values = list(labels) + [
+                str(total), str(completed), str(cancelled),
+                format_price(revenue), format_price(expected),
+                f"{utilisation(booked_minutes, working_days):.1f}"
+            ]
+            for col_idx, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col_idx >= len(labels):
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                table.setItem(row_idx, col_idx, item)
+
+    def update_summary(self, summary):
+        total, completed, cancelled, revenue, expected, booked_minutes, working_days = summary
+        self.summary_label.setText(
+            f"Приёмов: {total or 0}   Завершено: {completed or 0}   Отменено: {cancelled or 0}   "
+            f"Выручка: {revenue or 0:.2f}   Ожидается: {expected or 0:.2f}   "
+            f"Средняя загрузка: {utilisation(booked_minutes or 0, working_days):.1f}%"
+        )
+
+    def refresh_data(self):
+        """Перечитывание показателей по таймеру"""
+        if is_busy(self):
+            # Соединение занято загрузкой отчёта; следующее обновление — по таймеру
+            logging.debug("Обновление аналитики пропущено: идёт загрузка")
+            return
+        self.load_data(quiet=True)
+
+    def showEvent(self, event):
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        # Закрытое из меню окно только скрывается (WindowManager): скрытое окно не обновляется
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def closeEvent(self, event):
+        """Обработчик закрытия окна"""
+        self.refresh_timer.stop()
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.close()
+        event.accept()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    app = QApplication(sys.argv)
+    apply_theme(app)
+    app.setStyle("Fusion")
+    window = DashboardApp()
+    window.show()
+    sys.exit(app.exec())
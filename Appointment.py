@@ -1,15 +1,18 @@
 import sys
-import psycopg2
+import shutil
+from Database import connect
 import logging
-import os
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout,
     QHBoxLayout, QLabel, QPushButton, QTableWidget,
     QTableWidgetItem, QMessageBox, QLineEdit,
-    QHeaderView, QDialog, QFormLayout, QDateEdit, QComboBox, QTimeEdit
+    QHeaderView, QDialog, QFormLayout, QDateEdit, QComboBox, QTimeEdit, QSpinBox, QCheckBox,
+    QTableView, QDoubleSpinBox
 )
-from PyQt6.QtCore import Qt, QDate, QTime, QDateTime
-from PyQt6.QtGui import QColor, QPalette, QIcon
+from PyQt6.QtCore import Qt, QDate, QTime, QDateTime, QTimer
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme
+from LogConfig import setup_logging
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 from reportlab.lib import colors
@@ -17,19 +20,42 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime
-
-# Настройка логирования
-log_dir = 'logs'
-log_file = os.path.join(log_dir, 'Appointment.log')
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename=log_file
+from LocalReplica import get_replica
+from Scheduling import (
+    count_overlaps, series_dates, find_series_conflicts, suggest_alternative_slots, insert_appointments,
+    plan_reschedule, apply_reschedule, StalePlanError
+)
+from SearchPicker import SearchPicker, LRUCache
+from PatientSearch import search_patients
+from DiagnosisSearch import DiagnosisPicker
+from Waitlist import offer_backfill
+from Partitions import default_window, shift_window
+from Formatting import format_date, format_time, format_price
+from AppointmentModel import (
+    AppointmentTableModel, AppointmentFilterProxy, AppointmentColumns, HEADERS, CLIENT_SIDE_ROW_LIMIT,
+    PATIENT_NAME_SQL, RECORD_SELECT, RECORD_WIDTH, UNKNOWN_NAMES, COL_PATIENT, COL_DOCTOR, COL_DIAGNOSIS,
+    DEFAULT_PAGE_KEYS, empty_filters, filter_clauses, page_keys, order_clause, after_clause
 )
+from OfflineQueue import (
+    get_offline_queue, OFFLINE_QUEUE_ENABLED, CONNECTION_ERRORS, OP_INSERT, OP_UPDATE, OP_CANCEL
+)
+from Config import config
+from QueryRunner import run_cancellable, QueryCancelled, QueryBusy, is_busy, BUSY_RETRY_MS
+from WindowManager import connect_global, disconnect_global
+from ReportCache import get_report_cache, report_fingerprint, build_in_background
+
+# Уже загруженные периоды таблицы приёмов; сбрасываются после любого изменения приёмов
+PAGE_CACHE_SIZE = config.getint('cache', 'appointment_pages', fallback=12)
+PAGE_CACHE_TTL = config.getint('cache', 'appointment_pages_ttl', fallback=120)
+# Вид отчёта для кэша отчётов; номер меняется вместе с оформлением build_pdf,
+# чтобы отчёты в старом оформлении не брались из кэша
+APPOINTMENT_REPORT_KIND = "appointments_v2"
 
 
 class AppointmentsApp(QMainWindow):
+    # Изменения этих таблиц дочитываются при повторном открытии окна (WindowManager, apply_changes)
+    CHANGE_TABLES = ("appointment", "patient", "doctor", "diagnosis")
+
     def __init__(self, medical_card_id=None, role=None, user_id=None):
         super().__init__()
         logging.debug(
@@ -38,6 +64,20 @@ class AppointmentsApp(QMainWindow):
         self.role = role
         self.user_id = user_id
         self.patient_id = None
+        self.window_start, self.window_end = default_window()
+        self.page_cache = LRUCache(maxsize=PAGE_CACHE_SIZE, ttl=PAGE_CACHE_TTL)
+        # ID показанных приёмов из appointment_archive: архивные строки только для чтения
+        self.archived_ids = set()
+        # Фильтры и сортировка таблицы; при большом числе строк они выполняются в SQL
+        self.filters = empty_filters()
+        self.sort_column = None
+        self.sort_descending = False
+        self.server_side = False
+        # Продолжение показанного периода при загрузке страницами: (where, params, ключи, направление,
+        # ключ последней строки) или None, если строк больше нет
+        self.next_page = None
+        # Показаны результаты поиска, а не период
+        self.search_results = False
         try:
             title = "Медицинская информационная система - Все приемы" if medical_card_id is None else f"Медицинская информационная система - Приемы (Карта №{medical_card_id})"
             self.setWindowTitle(title)
@@ -56,67 +96,6 @@ class AppointmentsApp(QMainWindow):
             self.med_white = QColor(255, 255, 255)
             self.med_red = QColor(200, 16, 46)
 
-            # Установка стиля приложения
-            self.setStyleSheet(f"""
-                QMainWindow {{
-                    background-color: {self.med_light.name()};
-                }}
-                QTableWidget {{
-                    background-color: {self.med_white.name()};
-                    border: 1px solid #d1d8e0;
-                    border-radius: 5px;
-                    gridline-color: #d1d8e0;
-                    font-size: 14px;
-                }}
-                QTableWidget::item {{
-                    padding: 8px;
-                }}
-                QHeaderView::section {{
-                    background-color: {self.med_blue.name()};
-                    color: white;
-                    padding: 8px;
-                    border: none;
-                    font-weight: bold;
-                }}
-                QPushButton {{
-                    background-color: {self.med_blue.name()};
-                    color: white;
-                    border: none;
-                    border-radius: 5px;
-                    padding: 10px 15px;
-                    font-size: 14px;
-                    min-width: 100px;
-                }}
-                QPushButton:hover {{
-                    background-color: {self.med_blue.darker(110).name()};
-                }}
-                QPushButton:pressed {{
-                    background-color: {self.med_blue.darker(120).name()};
-                }}
-                QPushButton:disabled {{
-                    background-color: #cccccc;
-                }}
-                QLineEdit, QDateEdit, QTimeEdit, QComboBox {{
-                    border: 1px solid #d1d8e0;
-                    border-radius: 5px;
-                    padding: 8px;
-                    font-size: 14px;
-                    max-width: 300px;
-                }}
-                QLineEdit[readOnly="true"] {{
-                    background-color: #f0f0f0;
-                }}
-                QDialog {{
-                    background-color: {self.med_light.name()};
-                }}
-            """)
-
-            palette = self.palette()
-            palette.setColor(QPalette.ColorRole.Window, self.med_light)
-            palette.setColor(QPalette.ColorRole.Base, self.med_white)
-            palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-            self.setPalette(palette)
-
             self.conn = None
             self.cursor = None
             logging.debug("Вызов connect_to_db")
@@ -132,14 +111,13 @@ class AppointmentsApp(QMainWindow):
             self.load_doctors()
             logging.debug("Вызов load_doctor_prices")
             self.load_doctor_prices()
-            logging.debug("Вызов load_diagnoses")
-            self.load_diagnoses()
             # Now set up the UI
             logging.debug("Вызов setup_ui")
             self.setup_ui()
             # Load table data after UI is set up
             logging.debug("Вызов load_data")
             self.load_data()
+            connect_global(self, get_offline_queue().replayed, self.on_offline_queue_replayed)
             logging.debug("Инициализация AppointmentsApp завершена")
         except Exception as e:
             logging.error(f"Ошибка в инициализации AppointmentsApp: {str(e)}")
@@ -149,12 +127,7 @@ class AppointmentsApp(QMainWindow):
     def connect_to_db(self):
         logging.debug("Попытка подключения к базе данных")
         try:
-            self.conn = psycopg2.connect(
-                dbname='Practice',
-                user='postgres',
-                password='123',
-                host='localhost'
-            )
+            self.conn = connect()
             self.cursor = self.conn.cursor()
             self.cursor.execute("SELECT 1")
             logging.debug("Подключение к базе данных успешно")
@@ -163,6 +136,34 @@ class AppointmentsApp(QMainWindow):
             QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {str(e)}")
             raise
 
+    def queue_offline(self, op, payload, parent):
+        """Постановка операции в офлайн-очередь при потере связи с сервером"""
+        get_offline_queue().enqueue(op, payload)
+        self.queue_offline_notice(parent)
+
+    def queue_offline_notice(self, parent):
+        QMessageBox.information(
+            parent, "Нет связи с сервером",
+            "Операция сохранена локально и будет выполнена после восстановления соединения"
+        )
+
+    def on_offline_queue_replayed(self, applied, conflicts):
+        if is_busy(self):
+            # Соединение окна занято фоновым запросом: откат и перезагрузка — после него
+            QTimer.singleShot(BUSY_RETRY_MS, lambda: self.on_offline_queue_replayed(applied, conflicts))
+            return
+        logging.debug(f"Офлайн-очередь воспроизведена: {applied} применено, {conflicts} конфликтов")
+        try:
+            self.conn.rollback()
+        except Exception:
+            try:
+                self.connect_to_db()
+            except Exception as e:
+                logging.error(f"Не удалось переподключиться после восстановления связи: {str(e)}")
+                return
+        self.page_cache.clear()
+        self.load_data()
+
     def load_patient_id(self):
         logging.debug("Загрузка ID пациента")
         try:
@@ -189,14 +190,11 @@ class AppointmentsApp(QMainWindow):
         logging.debug("Загрузка списка пациентов")
         try:
             if self.medical_card_id is None:
-                query = """
-                    SELECT p.patientid, 
-                           p.lastname || ' ' || p.firstname || ' ' || COALESCE(p.midname, '') as patient_name, 
-                           p.medicalcardid 
-                    FROM patient p 
-                    ORDER BY p.lastname, p.firstname
-                """
-                self.cursor.execute(query)
+                # Общий список пациентов не загружается: в диалогах пациент ищется на сервере,
+                # а имена в таблице приёмов приходят из JOIN в load_data
+                self.patients = []
+                self.patient_dict = {}
+                return
             else:
                 query = """
                     SELECT p.patientid, 
@@ -221,7 +219,9 @@ class AppointmentsApp(QMainWindow):
         logging.debug("Загрузка списка медицинских карт")
         try:
             if self.medical_card_id is None:
-                self.cursor.execute("SELECT medicalcardid FROM medicalcard ORDER BY medicalcardid")
+                # Номер карты подставляется из найденного пациента, полный список не нужен
+                self.medical_cards = []
+                return
             else:
                 self.cursor.execute("SELECT medicalcardid FROM medicalcard WHERE medicalcardid = %s",
                                     (self.medical_card_id,))
@@ -233,17 +233,23 @@ class AppointmentsApp(QMainWindow):
             self.medical_cards = []
             QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить медицинские карты: {str(e)}")
 
-    def load_doctors(self):
+    def load_doctors(self, use_replica=True):
         logging.debug("Загрузка списка врачей")
         try:
-            self.cursor.execute("""
-                SELECT d.doctorid, 
-                       d.secondname || ' ' || d.firstname || ' ' || COALESCE(d.midname, '') as doctor_name
-                FROM doctor d
-                ORDER BY d.secondname, d.firstname
-            """)
-            self.doctors = self.cursor.fetchall()
+            replica_rows = get_replica().doctors() if use_replica else None
+            if replica_rows is not None:
+                self.doctors = replica_rows
+            else:
+                self.cursor.execute("""
+                    SELECT d.doctorid, 
+                           d.secondname || ' ' || d.firstname || ' ' || COALESCE(d.midname, '') as doctor_name
+                    FROM doctor d
+                    ORDER BY d.secondname, d.firstname
+                """)
+                self.doctors = self.cursor.fetchall()
             self.doctor_dict = {doctor[0]: doctor[1] for doctor in self.doctors}
+            if hasattr(self, 'model'):
+                self.model.set_doctor_names(self.doctor_dict)
             logging.debug(f"Загружено {len(self.doctors)} врачей")
         except Exception as e:
             logging.error(f"Ошибка при загрузке врачей: {str(e)}")
@@ -252,15 +258,19 @@ class AppointmentsApp(QMainWindow):
             self.doctor_dict = {}
             QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить врачей: {str(e)}")
 
-    def load_doctor_prices(self):
+    def load_doctor_prices(self, use_replica=True):
         logging.debug("Загрузка цен врачей")
         try:
-            self.cursor.execute("""
-                SELECT d.doctorid, p.price
-                FROM doctor d
-                LEFT JOIN price p ON d.priceid = p.priceid
-            """)
-            self.doctor_prices = dict(self.cursor.fetchall())
+            replica_prices = get_replica().doctor_prices() if use_replica else None
+            if replica_prices is not None:
+                self.doctor_prices = replica_prices
+            else:
+                self.cursor.execute("""
+                    SELECT d.doctorid, p.price
+                    FROM doctor d
+                    LEFT JOIN price p ON d.priceid = p.priceid
+                """)
+                self.doctor_prices = dict(self.cursor.fetchall())
             logging.debug(f"Загружены цены для {len(self.doctor_prices)} врачей")
         except Exception as e:
             logging.error(f"Ошибка при загрузке цен врачей: {str(e)}")
@@ -268,24 +278,6 @@ class AppointmentsApp(QMainWindow):
             self.doctor_prices = {}
             QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить цены врачей: {str(e)}")
 
-    def load_diagnoses(self):
-        logging.debug("Загрузка списка диагнозов")
-        try:
-            self.cursor.execute("""
-                SELECT diagnosisid, diagnosisname 
-                FROM diagnosis
-                ORDER BY diagnosisname
-            """)
-            self.diagnoses = self.cursor.fetchall()
-            self.diagnosis_dict = {diagnosis[0]: diagnosis[1] for diagnosis in self.diagnoses}
-            logging.debug(f"Загружено {len(self.diagnoses)} диагнозов")
-        except Exception as e:
-            logging.error(f"Ошибка при загрузке диагнозов: {str(e)}")
-            self.conn.rollback()
-            self.diagnoses = []
-            self.diagnosis_dict = {}
-            QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить диагнозы: {str(e)}")
-
     def setup_ui(self):
         logging.debug("Настройка пользовательского интерфейса")
         try:
@@ -297,14 +289,7 @@ class AppointmentsApp(QMainWindow):
 
             title_text = "Управление приемами" if self.medical_card_id is None else f"Управление приемами (Медицинская карта №{self.medical_card_id})"
             title_label = QLabel(title_text)
-            title_label.setStyleSheet(f"""
-                QLabel {{
-                    font-size: 18px;
-                    font-weight: bold;
-                    color: {self.med_blue.name()};
-                    padding: 10px;
-                }}
-            """)
+            title_label.setObjectName("title")
             layout.addWidget(title_label)
 
             # Search layout
@@ -312,18 +297,16 @@ class AppointmentsApp(QMainWindow):
             search_layout.setSpacing(10)
 
             self.search_doctor_combo = QComboBox()
-            self.search_doctor_combo.addItem("Все врачи", None)
-            for doctor_id, doctor_name in self.doctors:
-                self.search_doctor_combo.addItem(doctor_name, doctor_id)
+            self.fill_doctor_combo(self.search_doctor_combo)
 
             self.search_date_start_input = QDateEdit()
-            self.search_date_start_input.setDate(QDate.currentDate())
+            self.search_date_start_input.setDate(QDate(self.window_start))
             self.search_date_start_input.setCalendarPopup(True)
             self.search_date_start_input.setDisplayFormat("dd.MM.yyyy")
             self.search_date_start_input.setMinimumDate(QDate(2000, 1, 1))
 
             self.search_date_end_input = QDateEdit()
-            self.search_date_end_input.setDate(QDate.currentDate())
+            self.search_date_end_input.setDate(QDate(self.window_end))
             self.search_date_end_input.setCalendarPopup(True)
             self.search_date_end_input.setDisplayFormat("dd.MM.yyyy")
             self.search_date_end_input.setMinimumDate(QDate(2000, 1, 1))
@@ -336,6 +319,9 @@ class AppointmentsApp(QMainWindow):
             self.clear_search_btn.setCursor(Qt.CursorShape.PointingHandCursor)
             self.clear_search_btn.clicked.connect(self.clear_search)
 
+            # Приёмы старше ARCHIVE_AFTER_MONTHS хранятся в архиве и ищутся только по запросу
+            self.archive_check = QCheckBox("Искать в архиве")
+
             search_layout.addWidget(QLabel("Врач:"))
             search_layout.addWidget(self.search_doctor_combo)
             search_layout.addWidget(QLabel("Дата с:"))
@@ -343,11 +329,39 @@ class AppointmentsApp(QMainWindow):
             search_layout.addWidget(QLabel("по:"))
             search_layout.addWidget(self.search_date_end_input)
             search_layout.addWidget(self.search_btn)
+            search_layout.addWidget(self.archive_check)
             search_layout.addWidget(self.clear_search_btn)
             search_layout.addStretch()
 
             layout.addLayout(search_layout)
 
+            # Навигация по периодам: таблица всегда показывает ограниченный диапазон дат
+            period_layout = QHBoxLayout()
+            period_layout.setSpacing(10)
+            self.prev_period_btn = QPushButton("◀ Предыдущий период")
+            self.current_period_btn = QPushButton("Текущий период")
+            self.next_period_btn = QPushButton("Следующий период ▶")
+            for btn in (self.prev_period_btn, self.current_period_btn, self.next_period_btn):
+                btn.setCursor(Qt.CursorShape.PointingHandCursor)
+            self.prev_period_btn.clicked.connect(lambda: self.move_window(-1))
+            self.next_period_btn.clicked.connect(lambda: self.move_window(1))
+            self.current_period_btn.clicked.connect(self.clear_search)
+
+            self.period_label = QLabel()
+            self.period_label.setStyleSheet("color: #57606f;")
+            # Следующая страница периода, если строк больше CLIENT_SIDE_ROW_LIMIT
+            self.more_btn = QPushButton("Ещё")
+            self.more_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+            self.more_btn.setEnabled(False)
+            self.more_btn.clicked.connect(self.load_more)
+            period_layout.addWidget(self.prev_period_btn)
+            period_layout.addWidget(self.period_label)
+            period_layout.addWidget(self.more_btn)
+            period_layout.addWidget(self.next_period_btn)
+            period_layout.addWidget(self.current_period_btn)
+            period_layout.addStretch()
+            layout.addLayout(period_layout)
+
             btn_layout = QHBoxLayout()
             btn_layout.setSpacing(10)
 
@@ -359,10 +373,11 @@ class AppointmentsApp(QMainWindow):
             self.pdf_btn = QPushButton("Создать PDF")
             self.schedule_btn = QPushButton("Записаться на прием")
             self.cancel_btn = QPushButton("Отменить прием")
+            self.reschedule_btn = QPushButton("Перенос приёмов")
 
             # Set cursor for all buttons
             for btn in [self.add_btn, self.edit_btn, self.delete_btn, self.refresh_btn, self.pdf_btn, self.schedule_btn,
-                        self.cancel_btn]:
+                        self.cancel_btn, self.reschedule_btn]:
                 btn.setCursor(Qt.CursorShape.PointingHandCursor)
 
             # Connect signals for admin buttons
@@ -415,6 +430,8 @@ class AppointmentsApp(QMainWindow):
                 logging.error(f"Ошибка подключения cancel_btn.clicked: {str(e)}")
                 QMessageBox.critical(self, "Ошибка", f"Ошибка подключения сигнала cancel_btn: {str(e)}")
 
+            self.reschedule_btn.clicked.connect(self.show_reschedule_dialog)
+
             # Conditionally add buttons based on role
             if self.role != "Пользователь":
                 btn_layout.addWidget(self.add_btn)
@@ -422,38 +439,92 @@ class AppointmentsApp(QMainWindow):
                 btn_layout.addWidget(self.delete_btn)
                 btn_layout.addWidget(self.refresh_btn)
                 btn_layout.addWidget(self.pdf_btn)
+                btn_layout.addWidget(self.reschedule_btn)
+                btn_layout.addWidget(self.cancel_btn)
             else:
                 btn_layout.addWidget(self.schedule_btn)
                 btn_layout.addWidget(self.cancel_btn)
 
-            self.table = QTableWidget()
-            self.table.setColumnCount(10)
-            self.table.setHorizontalHeaderLabels([
-                "ID", "Пациент", "Номер мед. карты", "Врач", "Дата",
-                "Время начала", "Время окончания", "Статус", "Диагноз", "Цена"
-            ])
+            # Фильтры по столбцам
+            filter_layout = QHBoxLayout()
+            filter_layout.setSpacing(10)
+
+            self.filter_status_combo = QComboBox()
+            self.filter_status_combo.addItem("Все статусы", None)
+            for status in ("Назначен", "В процессе", "Завершён", "Отменён"):
+                self.filter_status_combo.addItem(status, status)
+
+            self.filter_doctor_combo = QComboBox()
+            self.fill_doctor_combo(self.filter_doctor_combo)
+
+            self.filter_diagnosis_input = QLineEdit()
+            self.filter_diagnosis_input.setPlaceholderText("Диагноз содержит...")
+
+            # Нулевое значение означает, что граница цены не задана
+            self.filter_price_min = QDoubleSpinBox()
+            self.filter_price_max = QDoubleSpinBox()
+            for spin in (self.filter_price_min, self.filter_price_max):
+                spin.setRange(0, 1000000)
+                spin.setDecimals(2)
+                spin.setSpecialValueText("—")
+
+            # Изменения фильтров применяются с задержкой, чтобы не пересчитывать таблицу на каждую букву
+            self.filter_timer = QTimer(self)
+            self.filter_timer.setSingleShot(True)
+            self.filter_timer.setInterval(300)
+            self.filter_timer.timeout.connect(self.apply_filters)
+            self.filter_status_combo.currentIndexChanged.connect(self.filter_timer.start)
+            self.filter_doctor_combo.currentIndexChanged.connect(self.filter_timer.start)
+            self.filter_diagnosis_input.textChanged.connect(self.filter_timer.start)
+            self.filter_price_min.valueChanged.connect(self.filter_timer.start)
+            self.filter_price_max.valueChanged.connect(self.filter_timer.start)
+
+            filter_layout.addWidget(QLabel("Статус:"))
+            filter_layout.addWidget(self.filter_status_combo)
+            filter_layout.addWidget(QLabel("Врач:"))
+            filter_layout.addWidget(self.filter_doctor_combo)
+            filter_layout.addWidget(QLabel("Диагноз:"))
+            filter_layout.addWidget(self.filter_diagnosis_input)
+            filter_layout.addWidget(QLabel("Цена от:"))
+            filter_layout.addWidget(self.filter_price_min)
+            filter_layout.addWidget(QLabel("до:"))
+            filter_layout.addWidget(self.filter_price_max)
+            filter_layout.addStretch()
+
+            # Таблица: модель со строками периода и прокси-модель для сортировки и фильтров
+            self.model = AppointmentTableModel(self)
+            self.model.set_doctor_names(self.doctor_dict)
+            self.proxy = AppointmentFilterProxy(self)
+            self.proxy.setSourceModel(self.model)
+
+            self.table = QTableView()
+            self.table.setModel(self.proxy)
             self.table.setColumnHidden(0, True)
 
             self.table.setWordWrap(True)
             self.table.setTextElideMode(Qt.TextElideMode.ElideNone)
 
             header = self.table.horizontalHeader()
-            for col in range(self.table.columnCount()):
+            for col in range(len(HEADERS)):
                 header.setSectionResizeMode(col, QHeaderView.ResizeMode.Stretch)
 
             self.table.setColumnWidth(1, 150)  # Пациент
             self.table.setColumnWidth(3, 150)  # Врач
             self.table.setColumnWidth(8, 200)  # Диагноз
 
+            # Сортировка по щелчку на заголовке; до первого щелчка строки идут в порядке запроса
+            header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+            self.table.setSortingEnabled(True)
+            header.sortIndicatorChanged.connect(self.on_sort_changed)
+
             self.table.verticalHeader().setVisible(False)
+            # Выделение строк целиком, можно несколько (Ctrl/Shift) — для пакетной отмены и удаления
+            self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+            self.table.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
 
             self.table.setAlternatingRowColors(True)
-            self.table.setStyleSheet("""
-                QTableWidget {
-                    alternate-background-color: #f5f5f5;
-                }
-            """)
 
+            layout.addLayout(filter_layout)
             layout.addLayout(btn_layout)
             layout.addWidget(self.table)
             logging.debug("Интерфейс успешно настроен")
@@ -467,77 +538,64 @@ class AppointmentsApp(QMainWindow):
             doctor_id = self.search_doctor_combo.currentData()
             search_date_start = self.search_date_start_input.date().toString("yyyy-MM-dd")
             search_date_end = self.search_date_end_input.date().toString("yyyy-MM-dd")
-            current_date = QDate.currentDate().toString("yyyy-MM-dd")
 
             # Проверка корректности периода
             if search_date_start > search_date_end:
                 QMessageBox.warning(self, "Ошибка", "Начальная дата не может быть позже конечной")
                 return
 
+            # Архивные секции читаются только при явном запросе
+            source = "appointment_all" if self.archive_check.isChecked() else "appointment"
+
             # Базовый запрос
-            query = """
-                SELECT a.appointmentid, a.patientid, a.medicalcardid, a.doctorid, a.appointmentdate, 
-                       a.starttime, a.endtime, a.status, a.diagnosisid, a.appointmentprice
-                FROM appointment a
+            query = f"""
+                SELECT {RECORD_SELECT}
+                FROM {source} a
+                LEFT JOIN patient p ON a.patientid = p.patientid
+                LEFT JOIN diagnosis dg ON a.diagnosisid = dg.diagnosisid
                 WHERE 1=1
             """
+            conditions = ""
             params = []
 
             # Добавляем условие по medical_card_id, если оно задано
             if self.medical_card_id is not None:
-                query += " AND a.medicalcardid = %s"
+                conditions += " AND a.medicalcardid = %s"
                 params.append(self.medical_card_id)
 
             # Проверяем, задан ли врач
             if doctor_id is not None:
-                query += " AND a.doctorid = %s"
+                conditions += " AND a.doctorid = %s"
                 params.append(doctor_id)
 
-            # Проверяем, задан ли период дат, и отличается ли он от текущей даты
-            if search_date_start != current_date or search_date_end != current_date:
-                query += " AND a.appointmentdate BETWEEN %s AND %s"
-                params.extend([search_date_start, search_date_end])
-
-            query += " ORDER BY a.appointmentdate, a.starttime"
-
-            self.cursor.execute(query, params)
-            data = self.cursor.fetchall()
-            logging.debug(f"Найдено {len(data)} записей при поиске")
-
-            self.table.setRowCount(len(data))
-            for row_idx, row in enumerate(data):
-                for col_idx, value in enumerate(row):
-                    if col_idx == 1:
-                        value = self.patient_dict.get(value, "Неизвестный пациент")
-                    elif col_idx == 3:
-                        value = self.doctor_dict.get(value, "Неизвестный врач")
-                    elif col_idx == 4 and value is not None:
-                        value = value.strftime("%d.%m.%Y")
-                    elif col_idx in (5, 6) and value is not None:
-                        value = value.strftime("%H:%M")
-                    elif col_idx == 8:
-                        value = self.diagnosis_dict.get(value, "Неизвестный диагноз")
-                    elif col_idx == 9 and value is not None:
-                        value = f"{value:.2f}"
-
-                    item = QTableWidgetItem(str(value) if value is not None else "")
-                    item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-
-                    if col_idx == 8:
-                        item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-                        self.table.resizeRowToContents(row_idx)
-                    else:
-                        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-
-                    if row_idx % 2 == 0:
-                        item.setForeground(QColor(53, 59, 72))
-                    else:
-                        item.setForeground(QColor(47, 53, 66))
-
-                    self.table.setItem(row_idx, col_idx, item)
-
-                self.table.resizeRowToContents(row_idx)
-
+            # Поиск всегда ограничен периодом дат
+            conditions += " AND a.appointmentdate BETWEEN %s AND %s"
+            params.extend([search_date_start, search_date_end])
+
+            query += conditions + " ORDER BY a.appointmentdate, a.starttime"
+
+            def fetch(cursor):
+                cursor.execute(query, params)
+                data = AppointmentColumns.from_cursor(cursor)
+                archived_ids = set()
+                if source == "appointment_all":
+                    # Какие из найденных строк лежат в архиве: изменять их из окна нельзя
+                    cursor.execute(f"SELECT a.appointmentid FROM appointment_archive a WHERE 1=1{conditions}", params)
+                    archived_ids = {row[0] for row in cursor.fetchall()}
+                return data, archived_ids
+
+            data, archived_ids = run_cancellable(self, self.conn, fetch, "Поиск приёмов...")
+            logging.debug(f"Найдено {len(data)} записей при поиске в {source}")
+            self.period_label.setText("Результаты поиска, включая архив" if source == "appointment_all" else "Результаты поиска")
+
+            # Результаты поиска сортируются и фильтруются в клиенте
+            self.server_side = False
+            self.next_page = None
+            self.search_results = True
+            self.show_rows(data, archived_ids)
+
+        except QueryCancelled:
+            logging.debug("Поиск приемов отменён")
         except Exception as e:
             logging.error(f"Ошибка при поиске приемов: {str(e)}")
             QMessageBox.critical(self, "Ошибка", f"Не удалось выполнить поиск: {str(e)}")
@@ -545,44 +603,331 @@ class AppointmentsApp(QMainWindow):
     def clear_search(self):
         logging.debug("Сброс поиска")
         self.search_doctor_combo.setCurrentIndex(0)  # Сбрасываем выбор врача
-        self.search_date_start_input.setDate(QDate.currentDate())  # Сбрасываем начальную дату
-        self.search_date_end_input.setDate(QDate.currentDate())  # Сбрасываем конечную дату
-        self.load_data()  # Перезагружаем все данные
+        self.archive_check.setChecked(False)
+        self.window_start, self.window_end = default_window()  # Возвращаемся к текущему периоду
+        self.load_data()
+
+    def move_window(self, steps):
+        """Переход к предыдущему или следующему периоду той же длины"""
+        self.window_start, self.window_end = shift_window(self.window_start, self.window_end, steps)
+        self.load_data()
+
+    def period_where(self, start, end):
+        where = "a.appointmentdate BETWEEN %s AND %s"
+        params = [start, end]
+        if self.medical_card_id is not None:
+            where += " AND a.medicalcardid = %s"
+            params.append(self.medical_card_id)
+        return where, params
+
+    def window_query(self, start, end, server_side):
+        """Условие, параметры и ключ страницы для строк периода; ключ кэша учитывает фильтры и сортировку"""
+        where, params = self.period_where(start, end)
+        keys, direction = DEFAULT_PAGE_KEYS, "ASC"
+        cache_key = ('rows', self.medical_card_id, start, end)
+        if server_side:
+            clauses, filter_params = filter_clauses(self.filters)
+            for clause in clauses:
+                where += f" AND {clause}"
+            params.extend(filter_params)
+            if self.sort_column is not None:
+                keys, direction = page_keys(self.sort_column, self.sort_descending)
+            cache_key += (tuple(sorted(self.filters.items())), keys, direction)
+        return cache_key, where, params, keys, direction
+
+    @staticmethod
+    def page_select(where, keys, direction, paged):
+        return f"""
+            SELECT {RECORD_SELECT}
+                   {''.join(f', {key}' for key in keys) if paged else ''}
+            FROM appointment a
+            LEFT JOIN patient p ON a.patientid = p.patientid
+            LEFT JOIN diagnosis dg ON a.diagnosisid = dg.diagnosisid
+            WHERE {where}
+            ORDER BY {order_clause(keys, direction)}
+        """
+
+    @classmethod
+    def fetch_page(cls, cursor, where, params, keys, direction, paged, after=None):
+        """Строки периода и продолжение для следующей страницы (None, если строк больше нет).
+
+        Страница выбирается по ключу (keyset), а не OFFSET: следующая начинается сразу после
+        ключа after последней строки, поэтому каждая читается по индексу за одно и то же время.
+        """
+        page_where, page_params = where, list(params)
+        if after is not None:
+            page_where += f" AND {after_clause(keys, direction)}"
+            page_params.extend(after)
+        query = cls.page_select(page_where, keys, direction, paged)
+        if not paged:
+            cursor.execute(query, page_params)
+            return AppointmentColumns.from_cursor(cursor), None
+        cursor.execute(query + " LIMIT %s", page_params + [CLIENT_SIDE_ROW_LIMIT])
+        rows = cursor.fetchall()
+        data = AppointmentColumns.from_rows(row[:RECORD_WIDTH] for row in rows)
+        if len(rows) < CLIENT_SIDE_ROW_LIMIT:
+            return data, None
+        return data, (where, params, keys, direction, rows[-1][RECORD_WIDTH:])
+
+    def fetch_window(self, start, end):
+        """Приёмы за период; уже просмотренные периоды берутся из кэша.
+
+        Если за период не больше CLIENT_SIDE_ROW_LIMIT строк, загружаются все, а фильтры
+        и сортировка выполняются прокси-моделью. Иначе они передаются в WHERE/ORDER BY,
+        загружается первая страница, а следующие — кнопкой "Ещё" (load_more).
+        """
+        count_key = ('count', self.medical_card_id, start, end)
+        count = self.page_cache.get(count_key)
+        if count is not None:
+            self.server_side = count > CLIENT_SIDE_ROW_LIMIT
+            cached = self.page_cache.get(self.window_query(start, end, self.server_side)[0])
+            if cached is not None:
+                logging.debug(f"Период {start} - {end} взят из кэша")
+                data, self.next_page = cached
+                return data
+
+        def fetch(cursor):
+            window_count = count
+            if window_count is None:
+                # Считаем строки только до порога: точное число при большом периоде не нужно
+                where, params = self.period_where(start, end)
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM (SELECT 1 FROM appointment a WHERE {where} LIMIT %s) s",
+                    params + [CLIENT_SIDE_ROW_LIMIT + 1]
+                )
+                window_count = cursor.fetchone()[0]
+            server_side = window_count > CLIENT_SIDE_ROW_LIMIT
+            cache_key, where, params, keys, direction = self.window_query(start, end, server_side)
+            data, next_page = self.fetch_page(cursor, where, params, keys, direction, server_side)
+            return window_count, cache_key, data, next_page
+
+        count, cache_key, data, self.next_page = run_cancellable(self, self.conn, fetch, "Загрузка приёмов...")
+        self.server_side = count > CLIENT_SIDE_ROW_LIMIT
+        self.page_cache.put(count_key, count)
+        self.page_cache.put(cache_key, (data, self.next_page))
+        return data
+
+    def load_more(self):
+        """Следующая страница периода: строки после последней загруженной в текущем порядке"""
+        if self.next_page is None:
+            return
+        where, params, keys, direction, last_key = self.next_page
+        try:
+            data, next_page = run_cancellable(
+                self, self.conn,
+                lambda cursor: self.fetch_page(cursor, where, params, keys, direction, True, after=last_key),
+                "Загрузка приёмов..."
+            )
+        except QueryBusy:
+            logging.debug("Загрузка страницы пропущена: окно занято другим запросом")
+            return
+        except QueryCancelled:
+            logging.debug("Загрузка страницы отменена")
+            return
+        except Exception as e:
+            logging.error(f"Ошибка при загрузке страницы приёмов: {str(e)}")
+            self.conn.rollback()
+            QMessageBox.critical(self, "Ошибка загрузки", f"Не удалось загрузить данные из базы:\n{str(e)}")
+            return
+        self.next_page = next_page
+        self.model.append_columns(data)
+        self.table.resizeRowsToContents()
+        self.show_period_label()
+        logging.debug(f"Загружено ещё {len(data)} записей о приемах")
+
+    def apply_changes(self, changes):
+        """Изменения за время, пока окно было скрыто: {таблица: {id}} из WindowManager.
+
+        Перечитываются только изменённые приёмы показанного периода, а для изменённых пациентов
+        и диагнозов — только их имена в справочниках таблицы. Результаты поиска перечитываются целиком.
+        """
+        renamed_tables = changes.keys() & {'patient', 'diagnosis'}
+        reload_all = self.search_results or changes.keys() - set(self.CHANGE_TABLES)
+        if renamed_tables and self.server_side and not reload_all:
+            # Отбор и порядок строк выполнены сервером: новое имя может изменить и то, и другое
+            reload_all = self.sort_column in (COL_PATIENT, COL_DIAGNOSIS) or bool(self.filters['diagnosis'])
+        if reload_all:
+            self.page_cache.clear()
+            self.load_data()
+            return
+        if 'doctor' in changes:
+            self.load_doctors(use_replica=False)
+            self.fill_doctor_combo(self.search_doctor_combo)
+            self.filter_doctor_combo.blockSignals(True)
+            self.fill_doctor_combo(self.filter_doctor_combo)
+            self.filter_doctor_combo.blockSignals(False)
+        ids = [int(row_id) for row_id in changes.get('appointment', ())]
+        renamed = {}
+        for col, table in ((COL_PATIENT, 'patient'), (COL_DIAGNOSIS, 'diagnosis')):
+            shown = self.model.names(col)
+            renamed[col] = [item_id for item_id in map(int, changes.get(table, ())) if item_id in shown]
+        if not ids and not any(renamed.values()):
+            return
+        self.page_cache.clear()
+        _, where, params, keys, direction = self.window_query(self.window_start, self.window_end, self.server_side)
+        query = self.page_select(f"{where} AND a.appointmentid = ANY(%s)", keys, direction, False)
+
+        checked_at = datetime.now()
+
+        def fetch(cursor):
+            names = {col: dict.fromkeys(item_ids, UNKNOWN_NAMES[col]) for col, item_ids in renamed.items()}
+            if renamed[COL_PATIENT]:
+                cursor.execute(f"SELECT p.patientid, {PATIENT_NAME_SQL} FROM patient p WHERE p.patientid = ANY(%s)",
+                               (renamed[COL_PATIENT],))
+                names[COL_PATIENT].update(cursor.fetchall())
+            if renamed[COL_DIAGNOSIS]:
+                cursor.execute("SELECT diagnosisid, diagnosisname FROM diagnosis WHERE diagnosisid = ANY(%s)",
+                               (renamed[COL_DIAGNOSIS],))
+                names[COL_DIAGNOSIS].update(cursor.fetchall())
+            if not ids:
+                return {}, names
+            cursor.execute(query, params + [ids])
+            return {record[0]: record for record in cursor.fetchall()}, names
+
+        try:
+            records, names = run_cancellable(self, self.conn, fetch, "Загрузка приёмов...")
+        except (QueryBusy, QueryCancelled):
+            return
+        for col, col_names in names.items():
+            if col_names:
+                self.model.update_names(col, col_names)
+        new_records = [record for appointment_id, record in records.items()
+                       if self.model.find_row(appointment_id) is None]
+        if new_records and self.next_page is not None:
+            # Новая строка может относиться к ещё не загруженной странице
+            self.load_data()
+            return
+        removed = []
+        for appointment_id in ids:
+            row = self.model.find_row(appointment_id)
+            if row is None:
+                continue
+            if appointment_id in records:
+                self.model.set_record(row, records[appointment_id])
+            else:
+                # Удалён, перенесён в другой период или больше не проходит фильтры
+                removed.append(row)
+        self.model.remove_rows(removed)
+        self.model.append_columns(AppointmentColumns.from_rows(new_records))
+        # Остальные строки не менялись с момента скрытия окна: таблица актуальна на время проверки
+        self.model.set_loaded_at(checked_at)
+        for appointment_id in records:
+            view_row = self.proxy.mapFromSource(self.model.index(self.model.find_row(appointment_id), 0)).row()
+            if view_row >= 0:
+                self.table.resizeRowToContents(view_row)
+        self.show_period_label()
+        logging.debug(f"Обновлено приёмов: {len(ids)}")
+
+    def show_rows(self, data, archived_ids=None):
+        self.archived_ids = archived_ids or set()
+        self.model.set_columns(data)
+        self.table.resizeRowsToContents()
+        self.more_btn.setEnabled(self.next_page is not None)
+        logging.debug(f"Таблица заполнена {len(data)} записями")
+
+    def show_period_label(self):
+        text = f"Период: {self.window_start.strftime('%d.%m.%Y')} – {self.window_end.strftime('%d.%m.%Y')}"
+        if self.server_side:
+            more = "; есть ещё" if self.next_page is not None else ""
+            text += (f" (загружено {self.model.rowCount()} строк{more}; "
+                     "фильтры и сортировка выполняются на сервере)")
+        self.period_label.setText(text)
+        self.more_btn.setEnabled(self.next_page is not None)
+
+    def fill_doctor_combo(self, combo):
+        combo.clear()
+        combo.addItem("Все врачи", None)
+        for doctor_id, doctor_name in self.doctors:
+            combo.addItem(doctor_name, doctor_id)
+
+    def apply_filters(self):
+        """Фильтры по столбцам: в прокси-модели, а при большом периоде ещё и в SQL"""
+        if is_busy(self):
+            # Идёт загрузка: фильтры применятся после неё
+            self.filter_timer.start()
+            return
+        self.filters = {
+            'status': self.filter_status_combo.currentData(),
+            'doctor_id': self.filter_doctor_combo.currentData(),
+            'diagnosis': self.filter_diagnosis_input.text().strip(),
+            'price_min': self.filter_price_min.value() or None,
+            'price_max': self.filter_price_max.value() or None,
+        }
+        self.proxy.set_filters(self.filters)
+        if self.server_side:
+            self.load_data()
+
+    def on_sort_changed(self, column, order):
+        self.sort_column = column
+        self.sort_descending = order == Qt.SortOrder.DescendingOrder
+        # Прокси-модель сортирует загруженные строки сама; при большом периоде страницы читаются заново
+        if self.server_side:
+            self.load_data()
+
+    def selected_rows(self):
+        """Номера выделенных строк модели (не представления) по возрастанию"""
+        return sorted({self.proxy.mapToSource(index).row() for index in self.table.selectionModel().selectedRows()})
+
+    def has_archived(self, rows):
+        """Предупреждение, если среди строк есть архивные (их нельзя изменять)"""
+        if any(int(self.model.text(row, 0)) in self.archived_ids for row in rows):
+            QMessageBox.warning(self, "Ошибка", "Архивные приемы доступны только для просмотра")
+            return True
+        return False
 
     def cancel_appointment(self):
-        logging.debug("Отмена приема")
+        logging.debug("Отмена приемов")
         try:
-            selected_items = self.table.selectedItems()
-            if not selected_items:
+            rows = self.selected_rows()
+            if not rows:
                 QMessageBox.warning(self, "Ошибка", "Выберите прием для отмены")
                 return
-
-            row = selected_items[0].row()
-            appointment_id = int(self.table.item(row, 0).text())
-            appointment_date = self.table.item(row, 4).text()
-            current_status = self.table.item(row, 7).text()
-
-            if current_status == "Отменён":
-                QMessageBox.warning(self, "Ошибка", "Этот прием уже отменен")
+            if self.has_archived(rows):
                 return
 
-            if current_status == "Завершён":
-                QMessageBox.warning(self, "Ошибка", "Нельзя отменить завершенный прием")
+            rows = [row for row in rows if self.model.text(row, 7) not in ("Отменён", "Завершён")]
+            if not rows:
+                QMessageBox.warning(self, "Ошибка", "Выбранные приемы уже отменены или завершены")
                 return
+            appointment_ids = [int(self.model.text(row, 0)) for row in rows]
 
+            if len(rows) == 1:
+                question = f"Вы уверены, что хотите отменить прием от {self.model.text(rows[0], 4)}?"
+            else:
+                question = f"Вы уверены, что хотите отменить выбранные приемы ({len(rows)})?"
             reply = QMessageBox.question(
-                self, "Подтверждение",
-                f"Вы уверены, что хотите отменить прием от {appointment_date}?",
+                self, "Подтверждение", question,
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
 
             if reply == QMessageBox.StandardButton.Yes:
                 self.cursor.execute(
-                    "UPDATE appointment SET status = %s WHERE appointmentid = %s",
-                    ("Отменён", appointment_id))
+                    """UPDATE appointment SET status = %s
+                    WHERE appointmentid = ANY(%s) AND status NOT IN ('Отменён', 'Завершён')
+                    RETURNING appointmentid, doctorid, appointmentdate, starttime, endtime""",
+                    ("Отменён", appointment_ids))
+                cancelled = self.cursor.fetchall()
                 self.conn.commit()
-                self.table.item(row, 7).setText("Отменён")
-                logging.debug("Прием успешно отменен")
-                QMessageBox.information(self, "Успех", "Прием успешно отменен")
+                self.page_cache.clear()
+                cancelled_ids = {str(row[0]) for row in cancelled}
+                for row in rows:
+                    if self.model.text(row, 0) in cancelled_ids:
+                        self.model.set_text(row, 7, "Отменён")
+                logging.debug(f"Отменено приемов: {len(cancelled)}")
+                QMessageBox.information(self, "Успех", f"Отменено приемов: {len(cancelled)}")
+                # Освободившееся время предлагается пациентам из листа ожидания
+                freed_slots = [row[1:] for row in cancelled if row[1] is not None]
+                if freed_slots and offer_backfill(self, self.conn, freed_slots):
+                    self.load_data()
+        except CONNECTION_ERRORS as e:
+            logging.error(f"Нет связи с БД при отмене приема: {str(e)}")
+            if not OFFLINE_QUEUE_ENABLED:
+                QMessageBox.critical(self, "Ошибка", f"Не удалось отменить прием:\n{str(e)}")
+                return
+            for appointment_id in appointment_ids:
+                get_offline_queue().enqueue(OP_CANCEL, {'appointmentid': appointment_id})
+            self.queue_offline_notice(self)
+            for row in rows:
+                self.model.set_text(row, 7, "Отменён")
         except Exception as e:
             self.conn.rollback()
             logging.error(f"Ошибка при отмене приема: {str(e)}")
@@ -766,34 +1111,37 @@ class AppointmentsApp(QMainWindow):
                                         "Заполните все обязательные поля, включая врача для установки цены")
                     return
 
-                self.cursor.execute("""
-                    SELECT COUNT(*) 
-                    FROM appointment 
-                    WHERE doctorid = %s 
-                    AND appointmentdate = %s 
-                    AND status != 'Отменён'
-                    AND (
-                        (starttime <= %s AND endtime > %s) OR
-                        (starttime < %s AND endtime >= %s) OR
-                        (starttime >= %s AND endtime <= %s)
-                    )
-                """, (doctor_id, appointment_date.toString("yyyy-MM-dd"), start_time, start_time, end_time, end_time,
-                      start_time, end_time))
-                overlap_count = self.cursor.fetchone()[0]
+                price_value = float(price) if price else None
+                payload = {
+                    'patientid': self.patient_id, 'medicalcardid': medical_card_id, 'doctorid': doctor_id,
+                    'diagnosisid': None, 'appointmentdate': appointment_date.toString("yyyy-MM-dd"),
+                    'starttime': start_time, 'endtime': end_time, 'status': "Назначен",
+                    'appointmentprice': price_value,
+                }
+
+                try:
+                    overlap_count = count_overlaps(self.cursor, doctor_id, payload['appointmentdate'],
+                                                   start_time, end_time)
+                except CONNECTION_ERRORS as e:
+                    logging.error(f"Нет связи с БД при записи на прием: {str(e)}")
+                    if not OFFLINE_QUEUE_ENABLED:
+                        raise
+                    self.queue_offline(OP_INSERT, payload, dialog)
+                    dialog.close()
+                    return
                 if overlap_count > 0:
                     QMessageBox.warning(dialog, "Ошибка", "В это время врач уже занят")
                     return
 
-                price_value = float(price) if price else None
-
                 self.cursor.execute(
                     """INSERT INTO appointment 
                     (patientid, medicalcardid, doctorid, appointmentdate, starttime, endtime, status, appointmentprice) 
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-                    (self.patient_id, medical_card_id, doctor_id, appointment_date.toString("yyyy-MM-dd"), start_time,
+                    (self.patient_id, medical_card_id, doctor_id, payload['appointmentdate'], start_time,
                      end_time, "Назначен", price_value)
                 )
                 self.conn.commit()
+                self.page_cache.clear()
                 QMessageBox.information(dialog, "Успех", "Вы успешно записались на прием")
                 self.load_data()
                 dialog.close()
@@ -809,52 +1157,304 @@ class AppointmentsApp(QMainWindow):
 
         dialog.exec()
 
+    def create_patient_picker(self):
+        """Поле выбора пациента с поиском на сервере по мере ввода"""
+        return SearchPicker(
+            lambda text: search_patients(self.cursor, text, medical_card_id=self.medical_card_id),
+            placeholder="Начните вводить ФИО или телефон"
+        )
+
+    def fill_medical_card_combo(self, medical_card_combo, patient_entry):
+        """Номер мед. карты выбранного пациента (entry = (patientid, medicalcardid))"""
+        medical_card_combo.clear()
+        medical_card_combo.addItem("Не выбрано", None)
+        if patient_entry and patient_entry[1] is not None:
+            medical_card_combo.addItem(str(patient_entry[1]), patient_entry[1])
+            medical_card_combo.setCurrentIndex(1)
+
+    def remember_names(self, patient_id, patient_name, diagnosis_id, diagnosis_name):
+        """Имена пациента и диагноза добавленной или изменённой строки в справочники таблицы"""
+        if patient_id is not None:
+            self.model.update_names(COL_PATIENT, {patient_id: patient_name})
+        if diagnosis_id is not None:
+            self.model.update_names(COL_DIAGNOSIS, {diagnosis_id: diagnosis_name})
+
+    def append_table_row(self, columns):
+        row = self.model.append_row(columns)
+        view_row = self.proxy.mapFromSource(self.model.index(row, 0)).row()
+        if view_row >= 0:
+            self.table.resizeRowToContents(view_row)
+
+    def create_appointment_series(self, parent, payload, dates, starttime, endtime, names):
+        """Серия приёмов: все даты проверяются одним запросом, свободные вставляются одним INSERT.
+
+        payload — поля приёма без даты и времени, names — (пациент, диагноз) для таблицы.
+        Возвращает True, если серия создана (или поставлена в офлайн-очередь).
+        """
+        doctor_id = payload['doctorid']
+        # Альтернативы подбираются той же длительности, что и выбранный приём, и не в прошлом
+        duration = datetime.strptime(endtime, "%H:%M:%S") - datetime.strptime(starttime, "%H:%M:%S")
+        try:
+            conflicts = find_series_conflicts(self.cursor, doctor_id, dates, starttime, endtime)
+            alternatives = suggest_alternative_slots(
+                self.cursor, doctor_id, sorted(conflicts), starttime, duration, not_before=datetime.now()
+            ) if conflicts else {}
+        except CONNECTION_ERRORS as e:
+            logging.error(f"Нет связи с БД при создании серии приемов: {str(e)}")
+            if not OFFLINE_QUEUE_ENABLED:
+                raise
+            for appointment_date in dates:
+                get_offline_queue().enqueue(OP_INSERT, dict(
+                    payload, appointmentdate=appointment_date.strftime("%Y-%m-%d"),
+                    starttime=starttime, endtime=endtime))
+            QMessageBox.information(
+                parent, "Нет связи с сервером",
+                "Серия сохранена локально и будет создана после восстановления соединения"
+            )
+            return True
+
+        # (дата, начало, конец) каждого приёма, который будет создан
+        slots = [(appointment_date, starttime, endtime) for appointment_date in dates if appointment_date not in conflicts]
+        if conflicts:
+            lines = []
+            for appointment_date in sorted(conflicts):
+                alternative = alternatives.get(appointment_date)
+                suggestion = f"предлагается {alternative.strftime('%H:%M')}" if alternative else "свободного времени нет"
+                lines.append(f"{appointment_date.strftime('%d.%m.%Y')}: время занято, {suggestion}")
+            text = "Часть дат серии занята:\n" + "\n".join(lines)
+            if alternatives:
+                answer = QMessageBox.question(
+                    parent, "Конфликты в серии",
+                    text + "\n\nЗаписать на предложенное время?\n(«Нет» — создать только свободные даты)",
+                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel
+                )
+            else:
+                if not slots:
+                    QMessageBox.warning(parent, "Ошибка", text)
+                    return False
+                answer = QMessageBox.question(
+                    parent, "Конфликты в серии", text + "\n\nСоздать приёмы на свободные даты?",
+                    QMessageBox.StandardButton.Ok | QMessageBox.StandardButton.Cancel
+                )
+            if answer == QMessageBox.StandardButton.Cancel:
+                return False
+            if answer == QMessageBox.StandardButton.Yes:
+                for appointment_date, alternative in alternatives.items():
+                    alternative_end = (datetime.combine(appointment_date, alternative) + duration).time()
+                    slots.append((appointment_date, alternative.strftime("%H:%M:%S"), alternative_end.strftime("%H:%M:%S")))
+                slots.sort()
+
+        if not slots:
+            QMessageBox.warning(parent, "Ошибка", "На все даты серии врач уже занят")
+            return False
+
+        rows = [
+            (payload['patientid'], payload['medicalcardid'], doctor_id, payload['diagnosisid'],
+             appointment_date.strftime("%Y-%m-%d"), start, end, payload['status'], payload['appointmentprice'])
+            for appointment_date, start, end in slots
+        ]
+        new_ids = insert_appointments(self.cursor, rows)
+        self.conn.commit()
+        self.page_cache.clear()
+
+        patient_name, diagnosis_name = names
+        self.remember_names(payload['patientid'], patient_name, payload['diagnosisid'], diagnosis_name)
+        price_value = payload['appointmentprice']
+        for new_id, (appointment_date, start, end) in zip(new_ids, slots):
+            self.append_table_row([
+                str(new_id), payload['patientid'], str(payload['medicalcardid']), doctor_id,
+                format_date(appointment_date), start[:5], end[:5],
+                payload['status'] or "", payload['diagnosisid'], format_price(price_value)
+            ])
+        logging.debug(f"Создана серия из {len(new_ids)} приемов")
+        QMessageBox.information(parent, "Успех", f"Создано приёмов: {len(new_ids)}")
+        return True
+
+    def show_reschedule_dialog(self):
+        """Массовый перенос назначенных приёмов врача (например, на время его отсутствия)"""
+        logging.debug("Открытие диалога переноса приемов")
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Перенос приёмов")
+        dialog.setFixedSize(700, 650)
+
+        layout = QFormLayout(dialog)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        source_doctor_combo = QComboBox()
+        target_doctor_combo = QComboBox()
+        target_doctor_combo.addItem("Тот же врач", None)
+        for doctor_id, doctor_name in self.doctors:
+            source_doctor_combo.addItem(doctor_name, doctor_id)
+            target_doctor_combo.addItem(doctor_name, doctor_id)
+
+        def date_edit(value):
+            edit = QDateEdit(value)
+            edit.setDisplayFormat("dd.MM.yyyy")
+            edit.setCalendarPopup(True)
+            return edit
+
+        date_from_input = date_edit(QDate.currentDate())
+        date_to_input = date_edit(QDate.currentDate())
+        period_layout = QHBoxLayout()
+        period_layout.addWidget(date_from_input)
+        period_layout.addWidget(QLabel("по"))
+        period_layout.addWidget(date_to_input)
+
+        move_dates_check = QCheckBox("Перенести на другие даты")
+        target_from_input = date_edit(QDate.currentDate().addDays(1))
+        target_to_input = date_edit(QDate.currentDate().addDays(7))
+        target_period_layout = QHBoxLayout()
+        target_period_layout.addWidget(target_from_input)
+        target_period_layout.addWidget(QLabel("по"))
+        target_period_layout.addWidget(target_to_input)
+        for edit in (target_from_input, target_to_input):
+            edit.setEnabled(False)
+            move_dates_check.toggled.connect(edit.setEnabled)
+
+        preview_table = QTableWidget()
+        preview_table.setColumnCount(3)
+        preview_table.setHorizontalHeaderLabels(["Пациент", "Было", "Станет"])
+        preview_table.verticalHeader().setVisible(False)
+        preview_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        preview_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+
+        plan = {'moves': []}
+
+        def calculate():
+            if date_from_input.date() > date_to_input.date() or (
+                    move_dates_check.isChecked() and target_from_input.date() > target_to_input.date()):
+                QMessageBox.warning(dialog, "Ошибка", "Начальная дата не может быть позже конечной")
+                return
+            if not move_dates_check.isChecked() and target_doctor_combo.currentData() in (
+                    None, source_doctor_combo.currentData()):
+                QMessageBox.warning(dialog, "Ошибка", "Выберите другого врача или новые даты")
+                return
+            try:
+                moves, unplaced = plan_reschedule(
+                    self.cursor, source_doctor_combo.currentData(),
+                    date_from_input.date().toPyDate(), date_to_input.date().toPyDate(),
+                    target_doctor_id=target_doctor_combo.currentData(),
+                    target_date_from=target_from_input.date().toPyDate() if move_dates_check.isChecked() else None,
+                    target_date_to=target_to_input.date().toPyDate() if move_dates_check.isChecked() else None,
+                    not_before=datetime.now()
+                )
+            except Exception as e:
+                self.conn.rollback()
+                logging.error(f"Ошибка при расчете переноса: {str(e)}")
+                QMessageBox.critical(dialog, "Ошибка", f"Не удалось рассчитать перенос:\n{str(e)}")
+                return
+            plan['moves'] = moves
+            preview_table.setRowCount(len(moves) + len(unplaced))
+            for row_idx, move in enumerate(moves):
+                _, patient_name, old_date, old_start, doctor_id, new_date, new_start, _ = move
+                values = [
+                    patient_name or "Неизвестный пациент",
+                    f"{old_date.strftime('%d.%m.%Y')} {old_start.strftime('%H:%M')}",
+                    f"{new_date.strftime('%d.%m.%Y')} {new_start.strftime('%H:%M')}, "
+                    f"{self.doctor_dict.get(doctor_id, 'Неизвестный врач')}"
+                ]
+                for col_idx, value in enumerate(values):
+                    preview_table.setItem(row_idx, col_idx, QTableWidgetItem(value))
+            for row_idx, (_, patient_name, old_date, old_start) in enumerate(unplaced, start=len(moves)):
+                values = [patient_name or "Неизвестный пациент",
+                          f"{old_date.strftime('%d.%m.%Y')} {old_start.strftime('%H:%M')}",
+                          "Нет свободного времени"]
+                for col_idx, value in enumerate(values):
+                    item = QTableWidgetItem(value)
+                    item.setForeground(QColor(200, 16, 46))
+                    preview_table.setItem(row_idx, col_idx, item)
+            apply_btn.setEnabled(bool(moves))
+
+        def apply():
+            moves = plan['moves']
+            try:
+                apply_reschedule(self.cursor, moves)
+                self.conn.commit()
+                self.page_cache.clear()
+            except StalePlanError as e:
+                self.conn.rollback()
+                logging.warning(f"План переноса устарел: {str(e)}")
+                apply_btn.setEnabled(False)
+                QMessageBox.warning(dialog, "План устарел",
+                                    f"Расписание изменилось после расчёта, приёмы не перенесены:\n{str(e)}\n\n"
+                                    f"Нажмите «Рассчитать», чтобы составить план заново.")
+                return
+            except Exception as e:
+                self.conn.rollback()
+                logging.error(f"Ошибка при переносе приемов: {str(e)}")
+                QMessageBox.critical(dialog, "Ошибка", f"Не удалось перенести приёмы:\n{str(e)}")
+                return
+            self.update_rescheduled_rows(moves)
+            logging.debug(f"Перенесено {len(moves)} приемов")
+            QMessageBox.information(dialog, "Успех", f"Перенесено приёмов: {len(moves)}")
+            dialog.close()
+
+        btn_box = QHBoxLayout()
+        btn_box.setSpacing(10)
+        calculate_btn = QPushButton("Рассчитать")
+        apply_btn = QPushButton("Применить")
+        apply_btn.setEnabled(False)
+        cancel_btn = QPushButton("Отмена")
+        btn_box.addWidget(calculate_btn)
+        btn_box.addWidget(apply_btn)
+        btn_box.addWidget(cancel_btn)
+        calculate_btn.clicked.connect(calculate)
+        apply_btn.clicked.connect(apply)
+        cancel_btn.clicked.connect(dialog.close)
+
+        layout.addRow("Врач:", source_doctor_combo)
+        layout.addRow("Приёмы с:", period_layout)
+        layout.addRow("Новый врач:", target_doctor_combo)
+        layout.addRow("", move_dates_check)
+        layout.addRow("Новые даты с:", target_period_layout)
+        layout.addRow(preview_table)
+        layout.addRow(btn_box)
+
+        dialog.exec()
+
+    def update_rescheduled_rows(self, moves):
+        """Обновление в таблице только перенесённых приёмов"""
+        rows = {self.model.text(row, 0): row for row in range(self.model.rowCount())}
+        for appointment_id, _, _, _, doctor_id, new_date, new_start, new_end in moves:
+            row = rows.get(str(appointment_id))
+            if row is None:
+                continue
+            self.model.set_text(row, 3, doctor_id)
+            self.model.set_text(row, 4, format_date(new_date))
+            self.model.set_text(row, 5, format_time(new_start))
+            self.model.set_text(row, 6, format_time(new_end))
+
     def show_add_dialog(self):
         logging.debug("Открытие диалога добавления приема")
         try:
             dialog = QDialog(self)
             dialog.setWindowTitle("Добавить прием")
-            dialog.setFixedSize(500, 700)
+            dialog.setFixedSize(500, 760)
 
             layout = QFormLayout(dialog)
             layout.setContentsMargins(20, 20, 20, 20)
             layout.setSpacing(15)
 
-            patient_combo = QComboBox()
-            patient_combo.addItem("Не выбрано", None)
-            for patient in self.patients:
-                patient_combo.addItem(patient[1], patient[0])
-
+            patient_combo = self.create_patient_picker()
             medical_card_combo = QComboBox()
-            medical_card_combo.addItem("Не выбрано", None)
-            for card_id, in self.medical_cards:
-                medical_card_combo.addItem(str(card_id), card_id)
             medical_card_combo.setEnabled(False)
 
             def update_medical_card():
-                selected_patient_id = patient_combo.currentData()
-                medical_card_combo.setCurrentIndex(0)
-                if selected_patient_id:
-                    for patient in self.patients:
-                        if patient[0] == selected_patient_id:
-                            medical_card_id = patient[2]
-                            for i in range(medical_card_combo.count()):
-                                if medical_card_combo.itemData(i) == medical_card_id:
-                                    medical_card_combo.setCurrentIndex(i)
-                                    break
-                            break
+                self.fill_medical_card_combo(medical_card_combo, patient_combo.current_entry())
 
             patient_combo.currentIndexChanged.connect(update_medical_card)
+            if self.patients:
+                patient_id, patient_name, card_id = self.patients[0]
+                patient_combo.set_current(patient_id, patient_name, card_id)
+            update_medical_card()
 
             doctor_combo = QComboBox()
             doctor_combo.addItem("Не выбрано", None)
             for doctor in self.doctors:
                 doctor_combo.addItem(doctor[1], doctor[0])
 
-            diagnosis_combo = QComboBox()
-            diagnosis_combo.addItem("Не выбрано", None)
-            for diagnosis in self.diagnoses:
-                diagnosis_combo.addItem(diagnosis[1], diagnosis[0])
+            diagnosis_combo = DiagnosisPicker(self.cursor)
 
             date_input = QDateEdit()
             date_input.setDisplayFormat("dd.MM.yyyy")
@@ -962,6 +1562,21 @@ class AppointmentsApp(QMainWindow):
 
             doctor_combo.currentIndexChanged.connect(update_price)
 
+            # Повторяющаяся серия: каждые N дней/недель, всего M приёмов (1 — обычный приём)
+            repeat_interval_input = QSpinBox()
+            repeat_interval_input.setRange(1, 52)
+            repeat_unit_combo = QComboBox()
+            repeat_unit_combo.addItem("недель", 7)
+            repeat_unit_combo.addItem("дней", 1)
+            repeat_count_input = QSpinBox()
+            repeat_count_input.setRange(1, 52)
+            repeat_layout = QHBoxLayout()
+            repeat_layout.addWidget(QLabel("каждые"))
+            repeat_layout.addWidget(repeat_interval_input)
+            repeat_layout.addWidget(repeat_unit_combo)
+            repeat_layout.addWidget(QLabel("всего"))
+            repeat_layout.addWidget(repeat_count_input)
+
             btn_box = QHBoxLayout()
             btn_box.setSpacing(10)
 
@@ -979,14 +1594,15 @@ class AppointmentsApp(QMainWindow):
             layout.addRow("Доступное время:", time_table)
             layout.addRow("Статус:", status_combo)
             layout.addRow("Цена:", price_input)
+            layout.addRow("Повторять:", repeat_layout)
             layout.addRow(btn_box)
 
             def add_appointment():
                 try:
-                    patient_id = patient_combo.currentData()
+                    patient_id = patient_combo.current_id()
                     medical_card_id = medical_card_combo.currentData()
                     doctor_id = doctor_combo.currentData()
-                    diagnosis_id = diagnosis_combo.currentData()
+                    diagnosis_id = diagnosis_combo.current_id()
                     date = date_input.date()
                     if selected_time[0] is None:
                         QMessageBox.warning(dialog, "Ошибка", "Выберите время из таблицы")
@@ -1010,26 +1626,40 @@ class AppointmentsApp(QMainWindow):
                                             "Заполните все обязательные поля, включая врача для установки цены")
                         return
 
-                    self.cursor.execute("""
-                        SELECT COUNT(*) 
-                        FROM appointment 
-                        WHERE doctorid = %s 
-                        AND appointmentdate = %s 
-                        AND status != 'Отменён'
-                        AND (
-                            (starttime <= %s AND endtime > %s) OR
-                            (starttime < %s AND endtime >= %s) OR
-                            (starttime >= %s AND endtime <= %s)
-                        )
-                    """, (
-                    doctor_id, date.toString("yyyy-MM-dd"), starttime, starttime, endtime, endtime, starttime, endtime))
-                    overlap_count = self.cursor.fetchone()[0]
+                    price_value = float(price) if price else None
+
+                    if repeat_count_input.value() > 1:
+                        dates = series_dates(date.toPyDate(), repeat_count_input.value(),
+                                             repeat_interval_input.value() * repeat_unit_combo.currentData())
+                        payload = {
+                            'patientid': patient_id, 'medicalcardid': medical_card_id, 'doctorid': doctor_id,
+                            'diagnosisid': diagnosis_id, 'status': status or None, 'appointmentprice': price_value,
+                        }
+                        names = (patient_combo.currentText(),
+                                 diagnosis_combo.currentText() if diagnosis_id is not None else "Неизвестный диагноз")
+                        if self.create_appointment_series(dialog, payload, dates, starttime, endtime, names):
+                            dialog.close()
+                        return
+
+                    try:
+                        overlap_count = count_overlaps(self.cursor, doctor_id, date.toString("yyyy-MM-dd"),
+                                                       starttime, endtime)
+                    except CONNECTION_ERRORS as e:
+                        logging.error(f"Нет связи с БД при добавлении приема: {str(e)}")
+                        if not OFFLINE_QUEUE_ENABLED:
+                            raise
+                        self.queue_offline(OP_INSERT, {
+                            'patientid': patient_id, 'medicalcardid': medical_card_id, 'doctorid': doctor_id,
+                            'diagnosisid': diagnosis_id, 'appointmentdate': date.toString("yyyy-MM-dd"),
+                            'starttime': starttime, 'endtime': endtime, 'status': status or None,
+                            'appointmentprice': price_value,
+                        }, dialog)
+                        dialog.close()
+                        return
                     if overlap_count > 0:
                         QMessageBox.warning(dialog, "Ошибка", "В это время врач уже занят")
                         return
 
-                    price_value = float(price) if price else None
-
                     self.cursor.execute(
                         """INSERT INTO appointment 
                         (patientid, medicalcardid, doctorid, diagnosisid, appointmentdate, 
@@ -1042,35 +1672,23 @@ class AppointmentsApp(QMainWindow):
 
                     new_id = self.cursor.fetchone()[0]
                     self.conn.commit()
+                    self.page_cache.clear()
 
-                    row_pos = self.table.rowCount()
-                    self.table.insertRow(row_pos)
-
-                    patient_name = self.patient_dict.get(patient_id, "Неизвестный пациент")
-                    doctor_name = self.doctor_dict.get(doctor_id, "Неизвестный врач")
-                    diagnosis_name = self.diagnosis_dict.get(diagnosis_id, "Неизвестный диагноз")
+                    patient_name = patient_combo.currentText()
+                    diagnosis_name = diagnosis_combo.currentText() if diagnosis_id is not None else "Неизвестный диагноз"
 
                     formatted_date = date_input.date().toString("dd.MM.yyyy")
                     formatted_starttime = selected_time[0].toString("HH:mm")
                     formatted_endtime = selected_time[0].addSecs(1800).toString("HH:mm")
-                    formatted_price = f"{price_value:.2f}" if price_value is not None else ""
+                    formatted_price = format_price(price_value)
 
+                    self.remember_names(patient_id, patient_name, diagnosis_id, diagnosis_name)
                     columns = [
-                        str(new_id), patient_name, str(medical_card_id), doctor_name,
+                        str(new_id), patient_id, str(medical_card_id), doctor_id,
                         formatted_date, formatted_starttime, formatted_endtime,
-                        status or "", diagnosis_name, formatted_price
+                        status or "", diagnosis_id, formatted_price
                     ]
-
-                    for col_idx, value in enumerate(columns):
-                        item = QTableWidgetItem(value)
-                        item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                        if col_idx == 8:
-                            item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-                        else:
-                            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                        self.table.setItem(row_pos, col_idx, item)
-
-                    self.table.resizeRowToContents(row_pos)
+                    self.append_table_row(columns)
 
                     dialog.close()
                     logging.debug("Прием успешно добавлен")
@@ -1092,41 +1710,27 @@ class AppointmentsApp(QMainWindow):
     def show_edit_dialog(self):
         logging.debug("Открытие диалога редактирования приема")
         try:
-            selected_items = self.table.selectedItems()
-            if not selected_items:
+            rows = self.selected_rows()
+            if not rows:
                 QMessageBox.warning(self, "Ошибка", "Выберите прием для редактирования")
                 return
+            if self.has_archived(rows[:1]):
+                return
 
-            row = selected_items[0].row()
-            appointment_id = int(self.table.item(row, 0).text())
-
-            current_patient_name = self.table.item(row, 1).text()
-            current_medical_card = self.table.item(row, 2).text()
-            current_doctor_name = self.table.item(row, 3).text()
-            current_date = QDate.fromString(self.table.item(row, 4).text(), "dd.MM.yyyy")
-            current_starttime = QTime.fromString(self.table.item(row, 5).text(), "HH:mm")
-            current_endtime = QTime.fromString(self.table.item(row, 6).text(), "HH:mm")
-            current_status = self.table.item(row, 7).text()
-            current_diagnosis_name = self.table.item(row, 8).text()
-            current_price = self.table.item(row, 9).text()
-
-            current_patient_id = None
-            for patient_id, patient_name in self.patient_dict.items():
-                if patient_name == current_patient_name:
-                    current_patient_id = patient_id
-                    break
-
-            current_doctor_id = None
-            for doctor_id, doctor_name in self.doctor_dict.items():
-                if doctor_name == current_doctor_name:
-                    current_doctor_id = doctor_id
-                    break
-
-            current_diagnosis_id = None
-            for diagnosis_id, diagnosis_name in self.diagnosis_dict.items():
-                if diagnosis_name == current_diagnosis_name:
-                    current_diagnosis_id = diagnosis_id
-                    break
+            row = rows[0]
+            appointment_id = int(self.model.text(row, 0))
+
+            current_patient_name = self.model.text(row, 1)
+            current_medical_card = self.model.text(row, 2)
+            current_patient_id = self.model.item_id(row, COL_PATIENT)
+            current_doctor_id = self.model.item_id(row, COL_DOCTOR)
+            current_date = QDate.fromString(self.model.text(row, 4), "dd.MM.yyyy")
+            current_starttime = QTime.fromString(self.model.text(row, 5), "HH:mm")
+            current_endtime = QTime.fromString(self.model.text(row, 6), "HH:mm")
+            current_status = self.model.text(row, 7)
+            current_diagnosis_id = self.model.item_id(row, COL_DIAGNOSIS)
+            current_diagnosis_name = self.model.text(row, 8)
+            current_price = self.model.text(row, 9)
 
             dialog = QDialog(self)
             dialog.setWindowTitle("Редактировать прием")
@@ -1136,39 +1740,19 @@ class AppointmentsApp(QMainWindow):
             layout.setContentsMargins(20, 20, 20, 20)
             layout.setSpacing(15)
 
-            patient_combo = QComboBox()
-            patient_combo.addItem("Не выбрано", None)
-            current_patient_index = 0
-            for i, patient in enumerate(self.patients):
-                patient_combo.addItem(patient[1], patient[0])
-                if patient[0] == current_patient_id:
-                    current_patient_index = i + 1
-            patient_combo.setCurrentIndex(current_patient_index)
+            patient_combo = self.create_patient_picker()
+            current_card_id = int(current_medical_card) if current_medical_card.isdigit() else None
+            if current_patient_id is not None:
+                patient_combo.set_current(current_patient_id, current_patient_name, current_card_id)
 
             medical_card_combo = QComboBox()
-            medical_card_combo.addItem("Не выбрано", None)
-            current_card_index = 0
-            for i, (card_id,) in enumerate(self.medical_cards):
-                medical_card_combo.addItem(str(card_id), card_id)
-                if str(card_id) == current_medical_card:
-                    current_card_index = i + 1
-            medical_card_combo.setCurrentIndex(current_card_index)
             medical_card_combo.setEnabled(False)
 
             def update_medical_card():
-                selected_patient_id = patient_combo.currentData()
-                medical_card_combo.setCurrentIndex(0)
-                if selected_patient_id:
-                    for patient in self.patients:
-                        if patient[0] == selected_patient_id:
-                            medical_card_id = patient[2]
-                            for i in range(medical_card_combo.count()):
-                                if medical_card_combo.itemData(i) == medical_card_id:
-                                    medical_card_combo.setCurrentIndex(i)
-                                    break
-                            break
+                self.fill_medical_card_combo(medical_card_combo, patient_combo.current_entry())
 
             patient_combo.currentIndexChanged.connect(update_medical_card)
+            update_medical_card()
 
             doctor_combo = QComboBox()
             doctor_combo.addItem("Не выбрано", None)
@@ -1179,14 +1763,9 @@ class AppointmentsApp(QMainWindow):
                     current_doctor_index = i + 1
             doctor_combo.setCurrentIndex(current_doctor_index)
 
-            diagnosis_combo = QComboBox()
-            diagnosis_combo.addItem("Не выбрано", None)
-            current_diagnosis_index = 0
-            for i, diagnosis in enumerate(self.diagnoses):
-                diagnosis_combo.addItem(diagnosis[1], diagnosis[0])
-                if diagnosis[0] == current_diagnosis_id:
-                    current_diagnosis_index = i + 1
-            diagnosis_combo.setCurrentIndex(current_diagnosis_index)
+            diagnosis_combo = DiagnosisPicker(self.cursor)
+            if current_diagnosis_id is not None:
+                diagnosis_combo.set_current(current_diagnosis_id, current_diagnosis_name)
 
             date_input = QDateEdit(current_date)
             date_input.setDisplayFormat("dd.MM.yyyy")
@@ -1314,10 +1893,10 @@ class AppointmentsApp(QMainWindow):
 
             def update_appointment():
                 try:
-                    patient_id = patient_combo.currentData()
+                    patient_id = patient_combo.current_id()
                     medical_card_id = medical_card_combo.currentData()
                     doctor_id = doctor_combo.currentData()
-                    diagnosis_id = diagnosis_combo.currentData()
+                    diagnosis_id = diagnosis_combo.current_id()
                     date = date_input.date()
                     if selected_time[0] is None:
                         QMessageBox.warning(dialog, "Ошибка", "Выберите время из таблицы")
@@ -1341,28 +1920,27 @@ class AppointmentsApp(QMainWindow):
                                             "Заполните все обязательные поля, включая врача для установки цены")
                         return
 
-                    self.cursor.execute("""
-                        SELECT COUNT(*) 
-                        FROM appointment 
-                        WHERE doctorid = %s 
-                        AND appointmentdate = %s 
-                        AND appointmentid != %s
-                        AND status != 'Отменён'
-                        AND (
-                            (starttime <= %s AND endtime > %s) OR
-                            (starttime < %s AND endtime >= %s) OR
-                            (starttime >= %s AND endtime <= %s)
-                        )
-                    """, (
-                    doctor_id, date.toString("yyyy-MM-dd"), appointment_id, starttime, starttime, endtime, endtime,
-                    starttime, endtime))
-                    overlap_count = self.cursor.fetchone()[0]
+                    price_value = float(price) if price else None
+
+                    try:
+                        overlap_count = count_overlaps(self.cursor, doctor_id, date.toString("yyyy-MM-dd"),
+                                                       starttime, endtime, exclude_appointment_id=appointment_id)
+                    except CONNECTION_ERRORS as e:
+                        logging.error(f"Нет связи с БД при обновлении приема: {str(e)}")
+                        if not OFFLINE_QUEUE_ENABLED:
+                            raise
+                        self.queue_offline(OP_UPDATE, {
+                            'appointmentid': appointment_id, 'patientid': patient_id,
+                            'medicalcardid': medical_card_id, 'doctorid': doctor_id, 'diagnosisid': diagnosis_id,
+                            'appointmentdate': date.toString("yyyy-MM-dd"), 'starttime': starttime,
+                            'endtime': endtime, 'status': status or None, 'appointmentprice': price_value,
+                        }, dialog)
+                        dialog.close()
+                        return
                     if overlap_count > 0:
                         QMessageBox.warning(dialog, "Ошибка", "В это время врач уже занят")
                         return
 
-                    price_value = float(price) if price else None
-
                     self.cursor.execute(
                         """UPDATE appointment SET 
                         patientid = %s,
@@ -1378,32 +1956,43 @@ class AppointmentsApp(QMainWindow):
                         (patient_id, medical_card_id, doctor_id, diagnosis_id, date.toString("yyyy-MM-dd"), starttime,
                          endtime,
                          status or None, price_value, appointment_id))
+                    if self.cursor.rowcount == 0:
+                        self.conn.rollback()
+                        QMessageBox.warning(dialog, "Ошибка", "Прием не найден: он удален или перенесен в архив")
+                        return
 
                     self.conn.commit()
+                    self.page_cache.clear()
 
-                    patient_name = self.patient_dict.get(patient_id, "Неизвестный пациент")
-                    doctor_name = self.doctor_dict.get(doctor_id, "Неизвестный врач")
-                    diagnosis_name = self.diagnosis_dict.get(diagnosis_id, "Неизвестный диагноз")
+                    patient_name = patient_combo.currentText()
+                    diagnosis_name = diagnosis_combo.currentText() if diagnosis_id is not None else "Неизвестный диагноз"
                     formatted_date = date_input.date().toString("dd.MM.yyyy")
                     formatted_starttime = selected_time[0].toString("HH:mm")
                     formatted_endtime = selected_time[0].addSecs(1800).toString("HH:mm")
-                    formatted_price = f"{price_value:.2f}" if price_value is not None else ""
+                    formatted_price = format_price(price_value)
 
-                    self.table.item(row, 1).setText(patient_name)
-                    self.table.item(row, 2).setText(str(medical_card_id))
-                    self.table.item(row, 3).setText(doctor_name)
-                    self.table.item(row, 4).setText(formatted_date)
-                    self.table.item(row, 5).setText(formatted_starttime)
-                    self.table.item(row, 6).setText(formatted_endtime)
-                    self.table.item(row, 7).setText(status or "")
-                    self.table.item(row, 8).setText(diagnosis_name or "")
-                    self.table.item(row, 8).setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-                    self.table.item(row, 9).setText(formatted_price)
+                    self.remember_names(patient_id, patient_name, diagnosis_id, diagnosis_name)
+                    self.model.set_text(row, 1, patient_id)
+                    self.model.set_text(row, 2, str(medical_card_id))
+                    self.model.set_text(row, 3, doctor_id)
+                    self.model.set_text(row, 4, formatted_date)
+                    self.model.set_text(row, 5, formatted_starttime)
+                    self.model.set_text(row, 6, formatted_endtime)
+                    self.model.set_text(row, 7, status or "")
+                    self.model.set_text(row, 8, diagnosis_id)
+                    self.model.set_text(row, 9, formatted_price)
 
-                    self.table.resizeRowToContents(row)
+                    self.table.resizeRowsToContents()
 
                     dialog.close()
                     logging.debug("Прием успешно обновлен")
+                    # Отмена через редактирование освобождает прежнее время приёма
+                    if (status == "Отменён" and current_status not in ("Отменён", "Завершён")
+                            and current_doctor_id is not None):
+                        freed_slot = (current_doctor_id, current_date.toPyDate(),
+                                      current_starttime.toPyTime(), current_endtime.toPyTime())
+                        if offer_backfill(self, self.conn, [freed_slot]):
+                            self.load_data()
                 except Exception as e:
                     self.conn.rollback()
                     logging.error(f"Ошибка при обновлении приема: {str(e)}")
@@ -1455,125 +2044,167 @@ class AppointmentsApp(QMainWindow):
                 else:
                     pdf_filename = f"общий_отчёт_{timestamp}.pdf"
 
-            page_width, page_height = A4
-            left_margin = 36
-            right_margin = 36
-            top_margin = 36
-            bottom_margin = 36
-            available_width = page_width - left_margin - right_margin
-
-            doc = SimpleDocTemplate(
-                pdf_filename,
-                pagesize=A4,
-                leftMargin=left_margin,
-                rightMargin=right_margin,
-                topMargin=top_margin,
-                bottomMargin=bottom_margin
-            )
-            elements = []
-
-            styles = getSampleStyleSheet()
-            styles['Title'].fontName = 'DejaVuSans'
-            styles['Normal'].fontName = 'DejaVuSans'
-            title = Paragraph("Отчёт по приёмам", styles['Title'])
-            elements.append(title)
-            elements.append(
-                Paragraph(f"Дата создания: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}", styles['Normal']))
-            elements.append(Paragraph("<br/><br/>", styles['Normal']))
-
-            data = []
-            headers = ["Пациент/Мед.Карта", "Врач", "Дата/время", "Диагноз", "Статус", "Итог"]
-            data.append(headers)
-
-            for row in range(self.table.rowCount()):
-                medical_card = self.table.item(row, 2).text() if self.table.item(row, 2) else ""
-                patient = self.table.item(row, 1).text() if self.table.item(row, 1) else ""
-                doctor = self.table.item(row, 3).text() if self.table.item(row, 3) else ""
-                date = self.table.item(row, 4).text() if self.table.item(row, 4) else ""
-                start_time = self.table.item(row, 5).text() if self.table.item(row, 5) else ""
-                end_time = self.table.item(row, 6).text() if self.table.item(row, 6) else ""
-                status = self.table.item(row, 7).text() if self.table.item(row, 7) else ""
-                diagnosis = self.table.item(row, 8).text() if self.table.item(row, 8) else ""
-                price = self.table.item(row, 9).text() if self.table.item(row, 9) else ""
+            # В отчёт попадают строки в том виде, в каком они показаны: с учётом фильтров и сортировки.
+            # Строки собираются здесь, в потоке окна; PDF строится в фоне (build_in_background)
+            report_rows = []
+            for view_row in range(self.proxy.rowCount()):
+                row = self.proxy.mapToSource(self.proxy.index(view_row, 0)).row()
+                medical_card = self.model.text(row, 2)
+                patient = self.model.text(row, 1)
+                doctor = self.model.text(row, 3)
+                date = self.model.text(row, 4)
+                start_time = self.model.text(row, 5)
+                end_time = self.model.text(row, 6)
+                status = self.model.text(row, 7)
+                diagnosis = self.model.text(row, 8)
+                price = self.model.text(row, 9)
 
                 date_time = f"{date}\n{start_time}-{end_time}"
                 medical_card_patient = f"{patient}\n№ мед. карты {medical_card}"
+                report_rows.append([medical_card_patient, doctor, date_time, diagnosis, status, price])
+
+            # Те же строки — тот же отчёт: копируется файл первого построения как есть,
+            # поэтому в отчёте указано время, на которое взяты данные, а не время копирования
+            report_cache = get_report_cache()
+            report_key = report_fingerprint(APPOINTMENT_REPORT_KIND, report_rows)
+            cached_path = report_cache.get(report_key)
+            if cached_path is not None:
+                shutil.copyfile(cached_path, pdf_filename)
+                QMessageBox.information(self, "Успех", f"PDF-файл успешно создан: {pdf_filename}\n"
+                                                       f"Данные не изменились, использован ранее построенный отчёт")
+                logging.debug(f"PDF-файл взят из кэша отчётов: {report_key}")
+                return
 
-                row_data = [medical_card_patient, doctor, date_time, diagnosis, status, price]
-
-                for col_idx, text in enumerate(row_data):
-                    if col_idx in [0, 1, 2, 3, 4]:
-                        style = styles['Normal'].clone('cell_style')
-                        style.wordWrap = 'CJK'
-                        if col_idx == 0:
-                            style.fontSize = 8
-                            style.leading = 10
-                            style.alignment = 1
-                        elif col_idx in [1, 2, 3]:
-                            style.fontSize = 8
-                            style.leading = 10
-                        elif col_idx == 4:
-                            style.fontSize = 7
-                            style.leading = 8
-                            style.alignment = 1
-                        row_data[col_idx] = Paragraph(text, style)
-
-                data.append(row_data)
-
-            relative_widths = [25, 20, 15, 25, 10, 10]
-            total_relative_width = sum(relative_widths)
-            col_widths = [(width / total_relative_width) * available_width for width in relative_widths]
-
-            table = Table(data, colWidths=col_widths, repeatRows=1)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006DB0')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('FONTNAME', (0, 0), (-1, -1), 'DejaVuSans'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F5F5F5')),
-                ('WORDWRAP', (0, 0), (-1, -1), True),
-                ('LEADING', (0, 0), (-1, -1), 12),
-                ('ALIGN', (0, 1), (0, -1), 'CENTER'),
-                ('VALIGN', (0, 1), (0, -1), 'TOP'),
-                ('FONTSIZE', (0, 1), (0, -1), 8),
-                ('LEADING', (0, 1), (0, -1), 10),
-                ('ALIGN', (3, 1), (3, -1), 'LEFT'),
-                ('VALIGN', (3, 1), (3, -1), 'TOP'),
-                ('FONTSIZE', (3, 1), (3, -1), 8),
-                ('LEADING', (3, 1), (3, -1), 10),
-                ('ALIGN', (4, 1), (4, -1), 'CENTER'),
-                ('VALIGN', (4, 1), (4, -1), 'MIDDLE'),
-                ('FONTSIZE', (4, 1), (4, -1), 7),
-                ('LEADING', (4, 1), (4, -1), 8),
-            ]))
-
-            elements.append(table)
-            doc.build(elements)
+            loaded_at = self.model.loaded_at() or datetime.now()
+            build_in_background(self, lambda path: self.build_pdf(path, report_rows, loaded_at), pdf_filename)
+            try:
+                report_cache.put(report_key, pdf_filename)
+            except OSError as e:
+                logging.warning(f"Не удалось сохранить отчёт в кэш: {str(e)}")
 
             QMessageBox.information(self, "Успех", f"PDF-файл успешно создан: {pdf_filename}")
             logging.debug("PDF-файл успешно создан")
+        except QueryBusy as e:
+            logging.debug("Отчёт не построен: окно занято другим запросом")
+            QMessageBox.information(self, "Подождите", str(e))
         except Exception as e:
             logging.error(f"Ошибка при создании PDF: {str(e)}")
             QMessageBox.critical(self, "Ошибка", f"Не удалось создать PDF-файл:\n{str(e)}")
 
+    @staticmethod
+    def build_pdf(pdf_filename, report_rows, loaded_at):
+        """Построение PDF-отчёта по готовым строкам; выполняется в фоновом потоке.
+
+        loaded_at — время, когда строки таблицы прочитаны из базы.
+        """
+        page_width, page_height = A4
+        left_margin = 36
+        right_margin = 36
+        top_margin = 36
+        bottom_margin = 36
+        available_width = page_width - left_margin - right_margin
+
+        doc = SimpleDocTemplate(
+            pdf_filename,
+            pagesize=A4,
+            leftMargin=left_margin,
+            rightMargin=right_margin,
+            topMargin=top_margin,
+            bottomMargin=bottom_margin
+        )
+        elements = []
+
+        styles = getSampleStyleSheet()
+        styles['Title'].fontName = 'DejaVuSans'
+        styles['Normal'].fontName = 'DejaVuSans'
+        title = Paragraph("Отчёт по приёмам", styles['Title'])
+        elements.append(title)
+        # Отчёт может быть выдан из кэша позже, поэтому указывается время данных, а не выдачи отчёта
+        elements.append(
+            Paragraph(f"Данные на: {loaded_at.strftime('%d.%m.%Y %H:%M:%S')}", styles['Normal']))
+        elements.append(Paragraph("<br/><br/>", styles['Normal']))
+
+        data = []
+        headers = ["Пациент/Мед.Карта", "Врач", "Дата/время", "Диагноз", "Статус", "Итог"]
+        data.append(headers)
+
+        for report_row in report_rows:
+            row_data = list(report_row)
+
+            for col_idx, text in enumerate(row_data):
+                if col_idx in [0, 1, 2, 3, 4]:
+                    style = styles['Normal'].clone('cell_style')
+                    style.wordWrap = 'CJK'
+                    if col_idx == 0:
+                        style.fontSize = 8
+                        style.leading = 10
+                        style.alignment = 1
+                    elif col_idx in [1, 2, 3]:
+                        style.fontSize = 8
+                        style.leading = 10
+                    elif col_idx == 4:
+                        style.fontSize = 7
+                        style.leading = 8
+                        style.alignment = 1
+                    row_data[col_idx] = Paragraph(text, style)
+
+            data.append(row_data)
+
+        relative_widths = [25, 20, 15, 25, 10, 10]
+        total_relative_width = sum(relative_widths)
+        col_widths = [(width / total_relative_width) * available_width for width in relative_widths]
+
+        table = Table(data, colWidths=col_widths, repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006DB0')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, -1), 'DejaVuSans'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F5F5F5')),
+            ('WORDWRAP', (0, 0), (-1, -1), True),
+            ('LEADING', (0, 0), (-1, -1), 12),
+            ('ALIGN', (0, 1), (0, -1), 'CENTER'),
+            ('VALIGN', (0, 1), (0, -1), 'TOP'),
+            ('FONTSIZE', (0, 1), (0, -1), 8),
+            ('LEADING', (0, 1), (0, -1), 10),
+            ('ALIGN', (3, 1), (3, -1), 'LEFT'),
+            ('VALIGN', (3, 1), (3, -1), 'TOP'),
+            ('FONTSIZE', (3, 1), (3, -1), 8),
+            ('LEADING', (3, 1), (3, -1), 10),
+            ('ALIGN', (4, 1), (4, -1), 'CENTER'),
+            ('VALIGN', (4, 1), (4, -1), 'MIDDLE'),
+            ('FONTSIZE', (4, 1), (4, -1), 7),
+            ('LEADING', (4, 1), (4, -1), 8),
+        ]))
+
+        elements.append(table)
+        doc.build(elements)
+
     def refresh_all(self):
         logging.debug("Обновление всех данных")
         try:
+            # Кнопка "Обновить" всегда читает справочники с сервера и заодно копирует реплику
+            # целиком (если её не обновляет в этот момент фоновый поток)
+            try:
+                get_replica().refresh(self.conn, blocking=False, full=True)
+            except Exception as e:
+                logging.warning(f"Не удалось обновить локальную реплику: {str(e)}")
             self.load_patients()
             self.load_medical_cards()
-            self.load_doctors()
-            self.load_doctor_prices()
-            self.load_diagnoses()
+            self.load_doctors(use_replica=False)
+            self.load_doctor_prices(use_replica=False)
+            self.page_cache.clear()
             self.load_data()
-            # Update search doctor combo
-            self.search_doctor_combo.clear()
-            self.search_doctor_combo.addItem("Все врачи", None)
-            for doctor_id, doctor_name in self.doctors:
-                self.search_doctor_combo.addItem(doctor_name, doctor_id)
+            # Update search and filter doctor combos
+            self.fill_doctor_combo(self.search_doctor_combo)
+            self.filter_doctor_combo.blockSignals(True)
+            self.fill_doctor_combo(self.filter_doctor_combo)
+            self.filter_doctor_combo.blockSignals(False)
+            self.apply_filters()
         except Exception as e:
             logging.error(f"Ошибка при обновлении данных: {str(e)}")
             QMessageBox.critical(self, "Ошибка", f"Не удалось обновить данные: {str(e)}")
@@ -1586,61 +2217,21 @@ class AppointmentsApp(QMainWindow):
             return
 
         try:
-            if self.medical_card_id is None:
-                query = """
-                    SELECT a.appointmentid, a.patientid, a.medicalcardid, a.doctorid, a.appointmentdate, 
-                           a.starttime, a.endtime, a.status, a.diagnosisid, a.appointmentprice
-                    FROM appointment a
-                    ORDER BY a.appointmentdate, a.starttime
-                """
-                self.cursor.execute(query)
-            else:
-                query = """
-                    SELECT a.appointmentid, a.patientid, a.medicalcardid, a.doctorid, a.appointmentdate, 
-                           a.starttime, a.endtime, a.status, a.diagnosisid, a.appointmentprice
-                    FROM appointment a
-                    WHERE a.medicalcardid = %s
-                    ORDER BY a.appointmentdate, a.starttime
-                """
-                self.cursor.execute(query, (self.medical_card_id,))
-            data = self.cursor.fetchall()
+            self.period_label.setText(
+                f"Период: {self.window_start.strftime('%d.%m.%Y')} – {self.window_end.strftime('%d.%m.%Y')}"
+            )
+            self.search_date_start_input.setDate(QDate(self.window_start))
+            self.search_date_end_input.setDate(QDate(self.window_end))
+            data = self.fetch_window(self.window_start, self.window_end)
             logging.debug(f"Получено {len(data)} записей о приемах")
-
-            self.table.setRowCount(len(data))
-            for row_idx, row in enumerate(data):
-                for col_idx, value in enumerate(row):
-                    if col_idx == 1:
-                        value = self.patient_dict.get(value, "Неизвестный пациент")
-                    elif col_idx == 3:
-                        value = self.doctor_dict.get(value, "Неизвестный врач")
-                    elif col_idx == 4 and value is not None:
-                        value = value.strftime("%d.%m.%Y")
-                    elif col_idx in (5, 6) and value is not None:
-                        value = value.strftime("%H:%M")
-                    elif col_idx == 8:
-                        value = self.diagnosis_dict.get(value, "Неизвестный диагноз")
-                    elif col_idx == 9 and value is not None:
-                        value = f"{value:.2f}"
-
-                    item = QTableWidgetItem(str(value) if value is not None else "")
-                    item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-
-                    if col_idx == 8:
-                        item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-                        self.table.resizeRowToContents(row_idx)
-                    else:
-                        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-
-                    if row_idx % 2 == 0:
-                        item.setForeground(QColor(53, 59, 72))
-                    else:
-                        item.setForeground(QColor(47, 53, 66))
-
-                    self.table.setItem(row_idx, col_idx, item)
-
-                self.table.resizeRowToContents(row_idx)
-
-            logging.debug(f"Таблица заполнена {len(data)} записями")
+            self.search_results = False
+            self.show_rows(data)
+            self.show_period_label()
+        except QueryBusy:
+            logging.debug("Загрузка приемов пропущена: окно занято другим запросом")
+        except QueryCancelled:
+            logging.debug("Загрузка приемов отменена")
+            self.period_label.setText(self.period_label.text() + " (загрузка отменена)")
         except Exception as e:
             logging.error(f"Ошибка при загрузке данных: {str(e)}")
             self.conn.rollback()
@@ -1653,27 +2244,35 @@ class AppointmentsApp(QMainWindow):
     def delete_appointment(self):
         logging.debug("Удаление приема")
         try:
-            selected_items = self.table.selectedItems()
-            if not selected_items:
+            rows = self.selected_rows()
+            if not rows:
                 QMessageBox.warning(self, "Ошибка", "Выберите прием для удаления")
                 return
+            if self.has_archived(rows):
+                return
 
-            row = selected_items[0].row()
-            appointment_id = int(self.table.item(row, 0).text())
-            appointment_date = self.table.item(row, 4).text()
-
+            appointment_ids = [int(self.model.text(row, 0)) for row in rows]
+            if len(rows) == 1:
+                question = f"Вы уверены, что хотите удалить прием от {self.model.text(rows[0], 4)}?"
+            else:
+                question = f"Вы уверены, что хотите удалить выбранные приемы ({len(rows)})?"
             reply = QMessageBox.question(
-                self, "Подтверждение",
-                f"Вы уверены, что хотите удалить прием от {appointment_date}?",
+                self, "Подтверждение", question,
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
 
             if reply == QMessageBox.StandardButton.Yes:
                 self.cursor.execute(
-                    "DELETE FROM appointment WHERE appointmentid = %s",
-                    (appointment_id,))
+                    "DELETE FROM appointment WHERE appointmentid = ANY(%s) RETURNING appointmentid",
+                    (appointment_ids,))
+                deleted_ids = {str(row[0]) for row in self.cursor.fetchall()}
                 self.conn.commit()
-                self.table.removeRow(row)
-                logging.debug("Прием успешно удален")
+                self.page_cache.clear()
+                self.model.remove_rows([row for row in rows if self.model.text(row, 0) in deleted_ids])
+                logging.debug(f"Удалено приемов: {len(deleted_ids)}")
+                if len(deleted_ids) < len(rows):
+                    QMessageBox.warning(self, "Ошибка",
+                                        f"Не удалось удалить приемов: {len(rows) - len(deleted_ids)} "
+                                        f"(они удалены ранее или перенесены в архив)")
         except Exception as e:
             self.conn.rollback()
             logging.error(f"Ошибка при удалении приема: {str(e)}")
@@ -1681,6 +2280,7 @@ class AppointmentsApp(QMainWindow):
 
     def closeEvent(self, event):
         logging.debug("Закрытие окна AppointmentsApp")
+        disconnect_global(self)
         try:
             if self.cursor:
                 self.cursor.close()
@@ -1693,7 +2293,9 @@ class AppointmentsApp(QMainWindow):
 
 
 if __name__ == "__main__":
+    setup_logging()
     app = QApplication(sys.argv)
+    apply_theme(app)
     app.setStyle("Fusion")
     window = AppointmentsApp()
     window.show()
@@ -0,0 +1,507 @@
+from array import array
+from decimal import Decimal
+from datetime import datetime
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt6.QtGui import QColor
+
+from PatientSearch import search_pattern
+from Formatting import format_date_ordinal, format_minutes, format_cents
+from Config import config
+
+HEADERS = [
+    "ID", "Пациент", "Номер мед. карты", "Врач", "Дата",
+    "Время начала", "Время окончания", "Статус", "Диагноз", "Цена"
+]
+COL_ID, COL_PATIENT, COL_CARD, COL_DOCTOR, COL_DATE, COL_START, COL_END, COL_STATUS, COL_DIAGNOSIS, COL_PRICE = range(10)
+
+SORT_ROLE = Qt.ItemDataRole.UserRole
+
+# До стольких строк за период фильтры и сортировка выполняются в клиенте (QSortFilterProxyModel);
+# если строк больше, они передаются в WHERE/ORDER BY и строки загружаются страницами такого размера
+CLIENT_SIDE_ROW_LIMIT = config.getint('fetch', 'client_side_row_limit', fallback=2000)
+
+PATIENT_NAME_SQL = "p.lastname || ' ' || p.firstname || ' ' || COALESCE(p.midname, '')"
+
+# Столбцы, сортировку по которым можно передать в ORDER BY. Имя врача берётся из справочника
+# в клиенте, поэтому по нему сортируются только загруженные строки. NULL заменён значением,
+# чтобы ключ последней строки можно было сравнить с ключами следующей страницы (page_keys).
+SERVER_SORT_COLUMNS = {
+    COL_ID: ("a.appointmentid",),
+    COL_PATIENT: (f"COALESCE({PATIENT_NAME_SQL}, '')",),
+    COL_CARD: ("COALESCE(a.medicalcardid, 0)",),
+    COL_DATE: ("a.appointmentdate", "a.starttime"),
+    COL_START: ("a.starttime",),
+    COL_END: ("a.endtime",),
+    COL_STATUS: ("COALESCE(a.status, '')",),
+    COL_DIAGNOSIS: ("COALESCE(dg.diagnosisname, '')",),
+    COL_PRICE: ("COALESCE(a.appointmentprice, 'NaN')",),
+}
+# Порядок строк периода по умолчанию; appointmentid делает ключ страницы уникальным
+DEFAULT_PAGE_KEYS = ("a.appointmentdate", "a.starttime", "a.appointmentid")
+
+
+def empty_filters():
+    return {'status': None, 'doctor_id': None, 'diagnosis': "", 'price_min': None, 'price_max': None}
+
+
+def filter_clauses(filters):
+    """Условия WHERE и параметры для фильтров таблицы приёмов"""
+    clauses = []
+    params = []
+    if filters['status']:
+        clauses.append("a.status = %s")
+        params.append(filters['status'])
+    if filters['doctor_id'] is not None:
+        clauses.append("a.doctorid = %s")
+        params.append(filters['doctor_id'])
+    if filters['diagnosis']:
+        clauses.append("dg.diagnosisname ILIKE %s")
+        params.append(search_pattern(filters['diagnosis']))
+    if filters['price_min'] is not None:
+        clauses.append("a.appointmentprice >= %s")
+        params.append(filters['price_min'])
+    if filters['price_max'] is not None:
+        clauses.append("a.appointmentprice <= %s")
+        params.append(filters['price_max'])
+    return clauses, params
+
+
+def page_keys(column, descending):
+    """Выражения ключа страницы и направление для сортировки по столбцу.
+
+    Все выражения сортируются в одном направлении, поэтому следующая страница выбирается
+    сравнением строк: (ключ) > (ключ последней строки) или < при сортировке по убыванию.
+    """
+    expressions = SERVER_SORT_COLUMNS.get(column)
+    if expressions is None:
+        return DEFAULT_PAGE_KEYS, "ASC"
+    keys = expressions + tuple(key for key in DEFAULT_PAGE_KEYS if key not in expressions)
+    return keys, "DESC" if descending else "ASC"
+
+
+def order_clause(keys, direction):
+    return ", ".join(f"{key} {direction}" for key in keys)
+
+
+def after_clause(keys, direction):
+    """Условие WHERE для строк после ключа последней загруженной строки"""
+    placeholders = ", ".join(["%s"] * len(keys))
+    return f"({', '.join(keys)}) {'<' if direction == 'DESC' else '>'} ({placeholders})"
+
+
+# Коды статусов; статусы не из списка добавляются в словарь по мере появления
+STATUSES = ["Назначен", "В процессе", "Завершён", "Отменён"]
+# Пустое значение для id, дат и времени: они не бывают отрицательными
+NO_VALUE = -1
+# Пустая цена: цена может быть отрицательной (возврат, скидка), поэтому берётся значение
+# вне диапазона numeric(10,2) в копейках
+NO_PRICE = -2 ** 63
+FETCH_BATCH = config.getint('fetch', 'appointment_batch', fallback=5000)
+
+# Строка запроса приёмов для AppointmentColumns.append_record. Пациент, врач и диагноз
+# приходят своими id; имена пациента и диагноза — для справочников имён, врача — из окна.
+RECORD_SELECT = f"""a.appointmentid, a.patientid, {PATIENT_NAME_SQL} AS patient_name, a.medicalcardid,
+       a.doctorid, a.appointmentdate, a.starttime, a.endtime, a.status,
+       a.diagnosisid, dg.diagnosisname, a.appointmentprice"""
+RECORD_WIDTH = 12
+
+# Столбцы, в которых хранится id, и имя для id, которого нет в справочнике
+ID_COLUMNS = {COL_PATIENT: "patient_ids", COL_DOCTOR: "doctor_ids", COL_DIAGNOSIS: "diagnosis_ids"}
+UNKNOWN_NAMES = {
+    COL_PATIENT: "Неизвестный пациент",
+    COL_DOCTOR: "Неизвестный врач",
+    COL_DIAGNOSIS: "Неизвестный диагноз",
+}
+NUMBER_COLUMNS = ("ids", "patient_ids", "cards", "doctor_ids", "dates", "starts", "ends", "diagnosis_ids", "prices")
+
+
+def parse_date(text):
+    return datetime.strptime(text, "%d.%m.%Y").date().toordinal() if text else NO_VALUE
+
+
+def parse_minutes(text):
+    if not text:
+        return NO_VALUE
+    hours, minutes = text.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_cents(text):
+    return int(Decimal(text) * 100) if text else NO_PRICE
+
+
+class DictionaryColumn:
+    """Строковый столбец: в строках хранятся номера значений в словаре, каждое значение — один раз"""
+
+    def __init__(self, typecode='i', values=()):
+        self.typecode = typecode
+        self.values = []
+        self.positions = {}
+        self.codes = array(typecode)
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value):
+        code = self.positions.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.positions[value] = code
+        return code
+
+    def append(self, value):
+        self.codes.append(self.encode(value))
+
+    def get(self, row):
+        return self.values[self.codes[row]]
+
+    def set(self, row, value):
+        self.codes[row] = self.encode(value)
+
+    def copy(self):
+        column = DictionaryColumn(self.typecode)
+        column.values = list(self.values)
+        column.positions = dict(self.positions)
+        column.codes = array(self.typecode, self.codes)
+        return column
+
+
+class AppointmentColumns:
+    """Загруженные приёмы по столбцам в типизированных массивах.
+
+    Даты хранятся порядковыми номерами дня, время — минутами от полуночи, цена — в копейках;
+    статус закодирован номером в словаре. Пациент, врач и диагноз хранятся своими id, а имена
+    берутся из справочников names: имена пациентов и диагнозов приходят вместе со строками,
+    имена врачей — из справочника окна. Строки для таблицы формируются только при отрисовке.
+    """
+
+    def __init__(self):
+        self.ids = array('i')
+        self.patient_ids = array('i')
+        self.cards = array('i')
+        self.doctor_ids = array('i')
+        self.dates = array('i')
+        self.starts = array('h')
+        self.ends = array('h')
+        self.diagnosis_ids = array('i')
+        self.prices = array('q')
+        self.statuses = DictionaryColumn('b', STATUSES)
+        self.names = {col: {} for col in ID_COLUMNS}
+        # Когда строки прочитаны из базы (для отчёта); у нескольких страниц — самое раннее время
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows):
+        columns = cls()
+        columns.loaded_at = datetime.now()
+        for row in rows:
+            columns.append_record(row)
+        return columns
+
+    @classmethod
+    def from_cursor(cls, cursor):
+        """Результат запроса приёмов, прочитанный порциями, без промежуточного списка кортежей"""
+        columns = cls()
+        columns.loaded_at = datetime.now()
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH)
+            if not rows:
+                return columns
+            for row in rows:
+                columns.append_record(row)
+
+    def append_record(self, row):
+        """Строка запроса RECORD_SELECT"""
+        (appointment_id, patient_id, patient_name, card, doctor_id, day, start, end, status,
+         diagnosis_id, diagnosis_name, price) = row
+        self.ids.append(appointment_id)
+        self.patient_ids.append(patient_id if patient_id is not None else NO_VALUE)
+        self.cards.append(card if card is not None else NO_VALUE)
+        self.doctor_ids.append(doctor_id if doctor_id is not None else NO_VALUE)
+        self.dates.append(day.toordinal() if day is not None else NO_VALUE)
+        self.starts.append(start.hour * 60 + start.minute if start is not None else NO_VALUE)
+        self.ends.append(end.hour * 60 + end.minute if end is not None else NO_VALUE)
+        self.statuses.append(status or "")
+        self.diagnosis_ids.append(diagnosis_id if diagnosis_id is not None else NO_VALUE)
+        # Копейки из Decimal без округления через float
+        self.prices.append(int(price * 100) if price is not None else NO_PRICE)
+        if patient_id is not None and patient_name is not None:
+            self.names[COL_PATIENT][patient_id] = patient_name
+        if diagnosis_id is not None and diagnosis_name is not None:
+            self.names[COL_DIAGNOSIS][diagnosis_id] = diagnosis_name
+
+    def append_text(self, values):
+        """Строка в том виде, в каком она показывается в таблице; вместо имён пациента,
+        врача и диагноза — их id (имена задаются через update_names)"""
+        self.ids.append(int(values[COL_ID]))
+        for col, value in enumerate(values):
+            if col == COL_ID:
+                continue
+            self.store(col, value, append=True)
+
+    def store(self, col, text, row=None, append=False):
+        if col in ID_COLUMNS:
+            target, value = getattr(self, ID_COLUMNS[col]), text if text is not None else NO_VALUE
+        elif col == COL_STATUS:
+            target, value = self.statuses, text
+        elif col == COL_CARD:
+            target, value = self.cards, int(text) if text and text != "None" else NO_VALUE
+        elif col == COL_DATE:
+            target, value = self.dates, parse_date(text)
+        elif col == COL_START:
+            target, value = self.starts, parse_minutes(text)
+        elif col == COL_END:
+            target, value = self.ends, parse_minutes(text)
+        elif col == COL_PRICE:
+            target, value = self.prices, parse_cents(text)
+        else:
+            raise ValueError(f"Столбец {col} нельзя изменить")
+        if isinstance(target, DictionaryColumn):
+            if append:
+                target.append(value)
+            else:
+                target.set(row, value)
+        elif append:
+            target.append(value)
+        else:
+            target[row] = value
+
+    def text(self, row, col):
+        if col == COL_ID:
+            return str(self.ids[row])
+        if col in ID_COLUMNS:
+            return self.names[col].get(getattr(self, ID_COLUMNS[col])[row], UNKNOWN_NAMES[col])
+        if col == COL_CARD:
+            return str(self.cards[row]) if self.cards[row] != NO_VALUE else ""
+        if col == COL_DATE:
+            return format_date_ordinal(self.dates[row]) if self.dates[row] != NO_VALUE else ""
+        if col == COL_START:
+            return format_minutes(self.starts[row]) if self.starts[row] != NO_VALUE else ""
+        if col == COL_END:
+            return format_minutes(self.ends[row]) if self.ends[row] != NO_VALUE else ""
+        if col == COL_STATUS:
+            return self.statuses.get(row)
+        return format_cents(self.prices[row]) if self.prices[row] != NO_PRICE else ""
+
+    def sort_value(self, row, col):
+        """Ключ сортировки: числа, даты и время сравниваются по значению, а не как строки"""
+        if col == COL_ID:
+            return self.ids[row]
+        if col == COL_CARD:
+            return self.cards[row]
+        if col == COL_DATE:
+            return self.dates[row]
+        if col == COL_START:
+            return self.starts[row]
+        if col == COL_END:
+            return self.ends[row]
+        if col == COL_PRICE:
+            return self.prices[row]
+        return self.text(row, col).lower()
+
+    def item_id(self, row, col):
+        """id пациента, врача или диагноза в строке; None, если не задан"""
+        value = getattr(self, ID_COLUMNS[col])[row]
+        return value if value != NO_VALUE else None
+
+    def price_cents(self, row):
+        return self.prices[row] if self.prices[row] != NO_PRICE else None
+
+    def assign(self, row, other, source_row):
+        """Строка row заменяется строкой source_row из other"""
+        for name in NUMBER_COLUMNS:
+            getattr(self, name)[row] = getattr(other, name)[source_row]
+        self.statuses.set(row, other.statuses.get(source_row))
+        for col in (COL_PATIENT, COL_DIAGNOSIS):
+            item_id = other.item_id(source_row, col)
+            if item_id in other.names[col]:
+                self.names[col][item_id] = other.names[col][item_id]
+
+    def find(self, appointment_id):
+        try:
+            return self.ids.index(int(appointment_id))
+        except ValueError:
+            return None
+
+    def delete(self, start, count):
+        for name in NUMBER_COLUMNS:
+            del getattr(self, name)[start:start + count]
+        del self.statuses.codes[start:start + count]
+
+    def copy(self):
+        columns = AppointmentColumns()
+        for name in NUMBER_COLUMNS:
+            setattr(columns, name, array(getattr(self, name).typecode, getattr(self, name)))
+        columns.statuses = self.statuses.copy()
+        columns.names = {col: dict(names) for col, names in self.names.items()}
+        columns.loaded_at = self.loaded_at
+        return columns
+
+    def extend(self, other):
+        """Строки следующей страницы в конец; статусы перекодируются, справочники имён дополняются"""
+        for name in NUMBER_COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+        for code in other.statuses.codes:
+            self.statuses.append(other.statuses.values[code])
+        for col in (COL_PATIENT, COL_DIAGNOSIS):
+            self.names[col].update(other.names[col])
+        if self.loaded_at is None or (other.loaded_at is not None and other.loaded_at < self.loaded_at):
+            self.loaded_at = other.loaded_at
+
+
+class AppointmentTableModel(QAbstractTableModel):
+    """Таблица приёмов поверх AppointmentColumns"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.columns = AppointmentColumns()
+        self.doctor_names = {}
+
+    def set_columns(self, columns):
+        """Новые данные таблицы; берётся копия, чтобы правки строк не меняли кэш периодов"""
+        self.beginResetModel()
+        self.columns = columns.copy()
+        self.columns.names[COL_DOCTOR] = self.doctor_names
+        self.endResetModel()
+
+    def append_columns(self, columns):
+        """Следующая страница строк периода"""
+        if not len(columns):
+            return
+        row = len(self.columns)
+        self.beginInsertRows(QModelIndex(), row, row + len(columns) - 1)
+        self.columns.extend(columns)
+        self.endInsertRows()
+
+    def set_doctor_names(self, doctor_names):
+        """Справочник имён врачей {doctorid: ФИО}"""
+        self.doctor_names = doctor_names
+        self.columns.names[COL_DOCTOR] = doctor_names
+        self.emit_column_changed(COL_DOCTOR)
+
+    def update_names(self, col, names):
+        """Новые имена пациентов или диагнозов {id: имя}: после правки в другом окне
+        меняется одна запись справочника, а не каждая строка с этим id"""
+        self.columns.names[col].update(names)
+        self.emit_column_changed(col)
+
+    def emit_column_changed(self, col):
+        if len(self.columns):
+            self.dataChanged.emit(self.index(0, col), self.index(len(self.columns) - 1, col))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.columns.text(index.row(), index.column())
+        if role == SORT_ROLE:
+            return self.columns.sort_value(index.row(), index.column())
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if index.column() == COL_DIAGNOSIS:
+                return Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+            return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return QColor(53, 59, 72) if index.row() % 2 == 0 else QColor(47, 53, 66)
+        return None
+
+    def flags(self, index):
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def text(self, row, col):
+        return self.columns.text(row, col)
+
+    def price_cents(self, row):
+        return self.columns.price_cents(row)
+
+    def item_id(self, row, col):
+        return self.columns.item_id(row, col)
+
+    def loaded_at(self):
+        return self.columns.loaded_at
+
+    def set_loaded_at(self, moment):
+        """Все строки проверены на изменения на момент moment"""
+        self.columns.loaded_at = moment
+
+    def names(self, col):
+        """Справочник имён столбца пациента, врача или диагноза {id: имя}"""
+        return self.columns.names[col]
+
+    def set_text(self, row, col, value):
+        self.columns.store(col, value, row=row)
+        self.dataChanged.emit(self.index(row, col), self.index(row, col))
+
+    def find_row(self, appointment_id):
+        return self.columns.find(appointment_id)
+
+    def set_record(self, row, record):
+        """Строка row по строке запроса приёмов (см. AppointmentColumns.append_record)"""
+        self.columns.assign(row, AppointmentColumns.from_rows([record]), 0)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(HEADERS) - 1))
+
+    def append_row(self, values):
+        row = len(self.columns)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.columns.append_text(values)
+        self.endInsertRows()
+        return row
+
+    def remove_rows(self, rows):
+        """Удаление строк непрерывными диапазонами, снизу вверх"""
+        ranges = []
+        for row in sorted(rows):
+            if ranges and ranges[-1][0] + ranges[-1][1] == row:
+                ranges[-1][1] += 1
+            else:
+                ranges.append([row, 1])
+        for start, count in reversed(ranges):
+            self.beginRemoveRows(QModelIndex(), start, start + count - 1)
+            self.columns.delete(start, count)
+            self.endRemoveRows()
+
+
+class AppointmentFilterProxy(QSortFilterProxyModel):
+    """Сортировка и фильтры по столбцам для загруженных строк"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.filters = empty_filters()
+        self.setSortRole(SORT_ROLE)
+
+    def set_filters(self, filters):
+        self.filters = dict(filters)
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        model = self.sourceModel()
+        filters = self.filters
+        if filters['status'] and model.text(source_row, COL_STATUS) != filters['status']:
+            return False
+        if filters['doctor_id'] is not None and model.item_id(source_row, COL_DOCTOR) != filters['doctor_id']:
+            return False
+        if filters['diagnosis'] and filters['diagnosis'].lower() not in model.text(source_row, COL_DIAGNOSIS).lower():
+            return False
+        if filters['price_min'] is not None or filters['price_max'] is not None:
+            cents = model.price_cents(source_row)
+            if cents is None:
+                return False
+            if filters['price_min'] is not None and cents < round(filters['price_min'] * 100):
+                return False
+            if filters['price_max'] is not None and cents > round(filters['price_max'] * 100):
+                return False
+        return True
@@ -0,0 +1,260 @@
+import sys
+import json
+import logging
+from Database import connect
+from PyQt6.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout,
+    QHBoxLayout, QLabel, QPushButton, QTableWidget,
+    QTableWidgetItem, QMessageBox, QLineEdit, QHeaderView,
+    QComboBox, QDateEdit, QTextEdit, QSplitter
+)
+from PyQt6.QtCore import Qt, QDate
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme
+from LogConfig import setup_logging
+
+from Config import config
+from Migrations import AUDITED_TABLES
+from Formatting import format_datetime
+
+# Журнал читается страницами от новых записей к старым (по auditid, см. индексы миграции 007_audit_log)
+AUDIT_PAGE_SIZE = config.getint('fetch', 'audit_page_size', fallback=200)
+
+OPERATION_TITLES = {
+    'INSERT': "Добавление",
+    'UPDATE': "Изменение",
+    'DELETE': "Удаление",
+}
+
+
+def changed_columns(old_data, new_data):
+    """Столбцы, значения которых различаются в старой и новой версии строки"""
+    if old_data is None or new_data is None:
+        return ""
+    keys = sorted(set(old_data) | set(new_data))
+    return ", ".join(key for key in keys if old_data.get(key) != new_data.get(key))
+
+
+class AuditApp(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Медицинская информационная система - Журнал аудита")
+        self.setGeometry(100, 100, 1100, 700)
+
+        self.setWindowIcon(QIcon("icon.jpg"))
+
+        # Медицинская цветовая схема
+        self.med_blue = QColor(0, 109, 176)  # Основной синий цвет
+        self.med_light = QColor(229, 243, 255)  # Светлый фон
+        self.med_white = QColor(255, 255, 255)  # Белый
+        self.med_red = QColor(200, 16, 46)  # Для предупреждений
+
+        self.conn = None
+        self.cursor = None
+        # Записи текущей выборки: auditid -> (olddata, newdata) для панели подробностей
+        self.details = {}
+        self.last_audit_id = None
+
+        self.connect_to_db()
+        self.setup_ui()
+        self.load_data()
+
+    def connect_to_db(self):
+        """Подключение к базе данных"""
+        try:
+            self.conn = connect()
+            self.cursor = self.conn.cursor()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {str(e)}")
+            sys.exit(1)
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса"""
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout(central_widget)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        title_label = QLabel("Журнал аудита")
+        title_label.setObjectName("title")
+        layout.addWidget(title_label)
+
+        # Фильтры
+        filter_layout = QHBoxLayout()
+        filter_layout.setSpacing(10)
+
+        self.table_combo = QComboBox()
+        self.table_combo.addItem("Все таблицы", None)
+        for table, _, _ in AUDITED_TABLES:
+            self.table_combo.addItem(table, table)
+
+        self.row_id_input = QLineEdit()
+        self.row_id_input.setPlaceholderText("ID записи")
+
+        self.user_id_input = QLineEdit()
+        self.user_id_input.setPlaceholderText("ID пользователя")
+
+        self.date_start_input = QDateEdit()
+        self.date_start_input.setCalendarPopup(True)
+        self.date_start_input.setDate(QDate.currentDate().addDays(-7))
+        self.date_end_input = QDateEdit()
+        self.date_end_input.setCalendarPopup(True)
+        self.date_end_input.setDate(QDate.currentDate())
+
+        self.search_btn = QPushButton("Найти")
+        self.more_btn = QPushButton("Ещё")
+        for btn in [self.search_btn, self.more_btn]:
+            btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.search_btn.clicked.connect(self.load_data)
+        self.more_btn.clicked.connect(self.load_more)
+
+        filter_layout.addWidget(QLabel("Таблица:"))
+        filter_layout.addWidget(self.table_combo)
+        filter_layout.addWidget(self.row_id_input)
+        filter_layout.addWidget(self.user_id_input)
+        filter_layout.addWidget(QLabel("С:"))
+        filter_layout.addWidget(self.date_start_input)
+        filter_layout.addWidget(QLabel("По:"))
+        filter_layout.addWidget(self.date_end_input)
+        filter_layout.addWidget(self.search_btn)
+        filter_layout.addWidget(self.more_btn)
+
+        # Таблица записей журнала
+        self.table = QTableWidget()
+        self.table.setColumnCount(8)
+        self.table.setHorizontalHeaderLabels(
+            ["ID", "Время", "Пользователь", "Роль", "Таблица", "Операция", "ID записи", "Изменённые поля"]
+        )
+        self.table.setColumnHidden(0, True)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setAlternatingRowColors(True)
+        self.table.horizontalHeader().setSectionResizeMode(7, QHeaderView.ResizeMode.Stretch)
+        self.table.itemSelectionChanged.connect(self.show_details)
+
+        # Старая и новая версия строки выбранной записи
+        self.details_view = QTextEdit()
+        self.details_view.setReadOnly(True)
+
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.details_view)
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 1)
+
+        layout.addLayout(filter_layout)
+        layout.addWidget(splitter)
+
+    def build_query(self):
+        """Условия фильтров; None, если введены некорректные значения"""
+        where = ["a.changedat >= %s", "a.changedat < %s"]
+        params = [
+            self.date_start_input.date().toPyDate(),
+            self.date_end_input.date().addDays(1).toPyDate(),
+        ]
+        table = self.table_combo.currentData()
+        if table is not None:
+            where.append("a.tablename = %s")
+            params.append(table)
+        row_id = self.row_id_input.text().strip()
+        if row_id:
+            where.append("a.rowid = %s")
+            params.append(row_id)
+        user_id = self.user_id_input.text().strip()
+        if user_id:
+            if not user_id.isdigit():
+                QMessageBox.warning(self, "Ошибка", "ID пользователя должен быть числом")
+                return None
+            where.append("a.userid = %s")
+            params.append(int(user_id))
+        return where, params
+
+    def load_data(self):
+        """Первая страница журнала по фильтрам"""
+        self.table.setRowCount(0)
+        self.details.clear()
+        self.details_view.clear()
+        self.last_audit_id = None
+        self.load_page()
+
+    def load_more(self):
+        """Следующая страница: записи старше последней показанной"""
+        if self.last_audit_id is None:
+            return
+        self.load_page()
+
+    def load_page(self):
+        if not self.cursor:
+            logging.error("Курсор не инициализирован")
+            return
+        query = self.build_query()
+        if query is None:
+            return
+        where, params = query
+        if self.last_audit_id is not None:
+            where.append("a.auditid < %s")
+            params.append(self.last_audit_id)
+        try:
+            self.cursor.execute(f"""
+                SELECT a.auditid, a.changedat, u.login, a.role, a.tablename, a.operation, a.rowid,
+                       a.olddata, a.newdata
+                FROM audit_log a
+                LEFT JOIN users u ON u.userid = a.userid
+                WHERE {' AND '.join(where)}
+                ORDER BY a.auditid DESC
+                LIMIT %s
+            """, params + [AUDIT_PAGE_SIZE])
+            rows = self.cursor.fetchall()
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Ошибка при загрузке журнала аудита: {str(e)}")
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить журнал аудита:\n{str(e)}")
+            return
+
+        start = self.table.rowCount()
+        self.table.setRowCount(start + len(rows))
+        for offset, (audit_id, changed_at, login, role, table, operation, row_id, old_data, new_data) in enumerate(rows):
+            self.details[audit_id] = (old_data, new_data)
+            values = [
+                str(audit_id), format_datetime(changed_at), login or "—", role or "—", table,
+                OPERATION_TITLES.get(operation, operation), row_id or "", changed_columns(old_data, new_data)
+            ]
+            for col_idx, value in enumerate(values):
+                self.table.setItem(start + offset, col_idx, QTableWidgetItem(value))
+        if rows:
+            self.last_audit_id = rows[-1][0]
+        self.more_btn.setEnabled(len(rows) == AUDIT_PAGE_SIZE)
+        logging.debug(f"Загружено {len(rows)} записей журнала аудита")
+
+    def show_details(self):
+        row = self.table.currentRow()
+        if row < 0:
+            self.details_view.clear()
+            return
+        old_data, new_data = self.details.get(int(self.table.item(row, 0).text()), (None, None))
+        parts = []
+        if old_data is not None:
+            parts.append("До изменения:\n" + json.dumps(old_data, ensure_ascii=False, indent=2, sort_keys=True))
+        if new_data is not None:
+            parts.append("После изменения:\n" + json.dumps(new_data, ensure_ascii=False, indent=2, sort_keys=True))
+        self.details_view.setPlainText("\n\n".join(parts))
+
+    def closeEvent(self, event):
+        """Обработчик закрытия окна"""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.close()
+        event.accept()
+
+if __name__ == "__main__":
+    setup_logging()
+    app = QApplication(sys.argv)
+    apply_theme(app)
+    app.setStyle("Fusion")
+    window = AuditApp()
+    window.show()
+    sys.exit(app.exec())
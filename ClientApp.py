@@ -1,7 +1,6 @@
 import sys
-import psycopg2
+from Database import connect
 import logging
-import os
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout,
     QLabel, QPushButton, QMessageBox, QDialog, QFormLayout,
@@ -9,18 +8,16 @@ from PyQt6.QtWidgets import (
     QTableWidgetItem, QLineEdit
 )
 from PyQt6.QtCore import Qt, QDate, QTime, QDateTime
-from PyQt6.QtGui import QColor, QPalette, QIcon
+from datetime import datetime
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme, set_variant, VARIANT_CLIENT
+from LogConfig import setup_logging
 from MedicalCard import MedicalCardApp
-
-# Настройка логирования
-log_dir = 'logs'
-log_file = os.path.join(log_dir, 'ClientApp.log')
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename=log_file
-)
+from WindowManager import WindowManager
+from LocalReplica import get_replica
+from Scheduling import count_overlaps, find_next_free_slot
+from Formatting import format_time
+from OfflineQueue import get_offline_queue, OFFLINE_QUEUE_ENABLED, CONNECTION_ERRORS, OP_INSERT
 
 class ClientApp(QMainWindow):
     def __init__(self, user_id=None, role=None):
@@ -42,67 +39,11 @@ class ClientApp(QMainWindow):
         self.med_white = QColor(255, 255, 255)
         self.med_red = QColor(200, 16, 46)
 
-        # Установка стиля приложения
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {self.med_light.name()};
-            }}
-            QPushButton {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 15px 20px;
-                font-size: 16px;
-                min-width: 150px;
-            }}
-            QPushButton:hover {{
-                background-color: {self.med_blue.darker(110).name()};
-            }}
-            QPushButton:pressed {{
-                background-color: {self.med_blue.darker(120).name()};
-            }}
-            QPushButton:disabled {{
-                background-color: #cccccc;
-            }}
-            QDialog {{
-                background-color: {self.med_light.name()};
-            }}
-            QComboBox, QDateEdit, QLineEdit {{
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-                max-width: 300px;
-            }}
-            QLineEdit[readOnly="true"] {{
-                background-color: #f0f0f0;
-            }}
-            QTableWidget {{
-                background-color: {self.med_white.name()};
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                gridline-color: #d1d8e0;
-                font-size: 14px;
-            }}
-            QTableWidget::item {{
-                padding: 8px;
-            }}
-            QHeaderView::section {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                padding: 8px;
-                border: none;
-                font-weight: bold;
-            }}
-        """)
-
-        # Настройка цветовой палитры
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Window, self.med_light)
-        palette.setColor(QPalette.ColorRole.Base, self.med_white)
-        palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-        self.setPalette(palette)
+        # Оформление задаётся темой приложения (Theme.py)
+        set_variant(self, VARIANT_CLIENT)
+
+        # Окно мед. карты переиспользуется при повторном открытии
+        self.windows = WindowManager(self)
 
         self.conn = None
         self.cursor = None
@@ -112,18 +53,14 @@ class ClientApp(QMainWindow):
         self.connect_to_db()
         self.load_doctors()
         self.load_doctor_prices()
+        self.load_specializations()
         self.load_patient_id()
         self.setup_ui()
 
     def connect_to_db(self):
         logging.debug("Попытка подключения к базе данных")
         try:
-            self.conn = psycopg2.connect(
-                dbname='Practice',
-                user='postgres',
-                password='123',
-                host='localhost'
-            )
+            self.conn = connect()
             self.cursor = self.conn.cursor()
             logging.debug("Подключение к базе данных успешно")
         except Exception as e:
@@ -134,13 +71,17 @@ class ClientApp(QMainWindow):
     def load_doctors(self):
         logging.debug("Загрузка списка врачей")
         try:
-            self.cursor.execute("""
-                SELECT d.doctorid, 
-                       d.secondname || ' ' || d.firstname || ' ' || COALESCE(d.midname, '') as doctor_name
-                FROM doctor d
-                ORDER BY d.secondname, d.firstname
-            """)
-            self.doctors = self.cursor.fetchall()
+            replica_rows = get_replica().doctors()
+            if replica_rows is not None:
+                self.doctors = replica_rows
+            else:
+                self.cursor.execute("""
+                    SELECT d.doctorid, 
+                           d.secondname || ' ' || d.firstname || ' ' || COALESCE(d.midname, '') as doctor_name
+                    FROM doctor d
+                    ORDER BY d.secondname, d.firstname
+                """)
+                self.doctors = self.cursor.fetchall()
             logging.debug(f"Загружено {len(self.doctors)} врачей")
         except Exception as e:
             logging.error(f"Ошибка при загрузке врачей: {str(e)}")
@@ -150,18 +91,36 @@ class ClientApp(QMainWindow):
     def load_doctor_prices(self):
         logging.debug("Загрузка цен врачей")
         try:
-            self.cursor.execute("""
-                SELECT d.doctorid, p.price
-                FROM doctor d
-                LEFT JOIN price p ON d.priceid = p.priceid
-            """)
-            self.doctor_prices = dict(self.cursor.fetchall())
+            replica_prices = get_replica().doctor_prices()
+            if replica_prices is not None:
+                self.doctor_prices = replica_prices
+            else:
+                self.cursor.execute("""
+                    SELECT d.doctorid, p.price
+                    FROM doctor d
+                    LEFT JOIN price p ON d.priceid = p.priceid
+                """)
+                self.doctor_prices = dict(self.cursor.fetchall())
             logging.debug(f"Загружены цены для {len(self.doctor_prices)} врачей")
         except Exception as e:
             logging.error(f"Ошибка при загрузке цен врачей: {str(e)}")
             self.doctor_prices = {}
             QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить цены врачей: {str(e)}")
 
+    def load_specializations(self):
+        logging.debug("Загрузка списка специализаций")
+        try:
+            replica_rows = get_replica().specializations()
+            if replica_rows is not None:
+                self.specializations = replica_rows
+            else:
+                self.cursor.execute("SELECT specializationid, specializationname FROM specialization ORDER BY specializationname")
+                self.specializations = self.cursor.fetchall()
+            logging.debug(f"Загружено {len(self.specializations)} специализаций")
+        except Exception as e:
+            logging.error(f"Ошибка при загрузке специализаций: {str(e)}")
+            self.specializations = []
+
     def load_patient_id(self):
         logging.debug("Загрузка ID пациента")
         try:
@@ -194,14 +153,7 @@ class ClientApp(QMainWindow):
 
         # Заголовок
         title_label = QLabel("Главное меню")
-        title_label.setStyleSheet(f"""
-            QLabel {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {self.med_blue.name()};
-                padding: 10px;
-            }}
-        """)
+        title_label.setObjectName("title")
         layout.addWidget(title_label)
 
         # Контейнер для кнопок
@@ -242,7 +194,7 @@ class ClientApp(QMainWindow):
 
         dialog = QDialog(self)
         dialog.setWindowTitle("Записаться на прием")
-        dialog.setFixedSize(600, 650)  # Increased height to accommodate price field
+        dialog.setFixedSize(600, 760)  # Increased height to accommodate price field and slot search
 
         layout = QFormLayout(dialog)
         layout.setContentsMargins(20, 20, 20, 20)
@@ -364,6 +316,55 @@ class ClientApp(QMainWindow):
             if selected_items:
                 selected_time[0] = QTime.fromString(selected_items[0].text(), "HH:mm")
 
+        # Поиск ближайшего свободного времени по специализации и/или цене
+        specialization_combo = QComboBox()
+        specialization_combo.addItem("Любая специализация", None)
+        for specialization_id, specialization_name in self.specializations:
+            specialization_combo.addItem(specialization_name, specialization_id)
+        max_price_input = QLineEdit()
+        max_price_input.setPlaceholderText("Цена до (необязательно)")
+        find_slot_btn = QPushButton("Найти ближайшее время")
+
+        def find_slot():
+            max_price_text = max_price_input.text().strip().replace(",", ".")
+            try:
+                max_price = float(max_price_text) if max_price_text else None
+            except ValueError:
+                QMessageBox.warning(dialog, "Ошибка", "Цена должна быть числом")
+                return
+            after = datetime.combine(date_input.date().toPyDate(), datetime.min.time())
+            after = max(after, datetime.now())
+            try:
+                slot = find_next_free_slot(self.cursor, after, specialization_combo.currentData(), max_price)
+            except Exception as e:
+                self.conn.rollback()
+                logging.error(f"Ошибка при поиске свободного времени: {str(e)}")
+                QMessageBox.warning(dialog, "Ошибка", f"Не удалось найти свободное время: {str(e)}")
+                return
+            if slot is None:
+                QMessageBox.information(dialog, "Нет свободного времени",
+                                        "Подходящих свободных слотов в ближайшие два месяца нет")
+                return
+            doctor_id, doctor_name, slot_date, slot_time, _ = slot
+            index = doctor_combo.findData(doctor_id)
+            if index < 0:
+                doctor_combo.addItem(doctor_name, doctor_id)
+                index = doctor_combo.count() - 1
+            doctor_combo.setCurrentIndex(index)
+            date_input.setDate(QDate(slot_date.year, slot_date.month, slot_date.day))
+            update_time_table()
+            slot_text = format_time(slot_time)
+            for row in range(time_table.rowCount()):
+                if time_table.item(row, 0).text() == slot_text:
+                    time_table.selectRow(row)
+                    selected_time[0] = QTime.fromString(slot_text, "HH:mm")
+                    break
+
+        find_slot_btn.clicked.connect(find_slot)
+        slot_search_layout = QHBoxLayout()
+        slot_search_layout.addWidget(specialization_combo)
+        slot_search_layout.addWidget(max_price_input)
+
         doctor_combo.currentIndexChanged.connect(update_time_table)
         doctor_combo.currentIndexChanged.connect(update_price)
         date_input.dateChanged.connect(update_time_table)
@@ -376,6 +377,8 @@ class ClientApp(QMainWindow):
         btn_box.addWidget(ok_btn)
         btn_box.addWidget(cancel_btn)
 
+        layout.addRow("Подбор времени:", slot_search_layout)
+        layout.addRow("", find_slot_btn)
         layout.addRow("Врач:", doctor_combo)
         layout.addRow("Медицинская карта:", medical_card_combo)
         layout.addRow("Дата:", date_input)
@@ -410,25 +413,31 @@ class ClientApp(QMainWindow):
                     QMessageBox.warning(dialog, "Ошибка", "Заполните все обязательные поля, включая врача для установки цены")
                     return
 
+                price_value = float(price) if price else None
+
                 # Check for overlapping appointments
-                self.cursor.execute("""
-                    SELECT COUNT(*) 
-                    FROM appointment 
-                    WHERE doctorid = %s 
-                    AND appointmentdate = %s 
-                    AND (
-                        (starttime <= %s AND endtime > %s) OR
-                        (starttime < %s AND endtime >= %s) OR
-                        (starttime >= %s AND endtime <= %s)
+                try:
+                    overlap_count = count_overlaps(self.cursor, doctor_id, appointment_date_str, start_time, end_time)
+                except CONNECTION_ERRORS as e:
+                    logging.error(f"Нет связи с БД при записи на прием: {str(e)}")
+                    if not OFFLINE_QUEUE_ENABLED:
+                        raise
+                    get_offline_queue().enqueue(OP_INSERT, {
+                        'patientid': self.patient_id, 'medicalcardid': medical_card_id, 'doctorid': doctor_id,
+                        'diagnosisid': None, 'appointmentdate': appointment_date_str,
+                        'starttime': start_time, 'endtime': end_time, 'status': "В процессе",
+                        'appointmentprice': price_value,
+                    })
+                    QMessageBox.information(
+                        dialog, "Нет связи с сервером",
+                        "Запись сохранена локально и будет отправлена после восстановления соединения"
                     )
-                """, (doctor_id, appointment_date_str, start_time, start_time, end_time, end_time, start_time, end_time))
-                overlap_count = self.cursor.fetchone()[0]
+                    dialog.close()
+                    return
                 if overlap_count > 0:
                     QMessageBox.warning(dialog, "Ошибка", "В это время врач уже занят")
                     return
 
-                price_value = float(price) if price else None
-
                 self.cursor.execute(
                     """INSERT INTO appointment 
                     (patientid, medicalcardid, doctorid, appointmentdate, starttime, endtime, status, appointmentprice) 
@@ -455,8 +464,7 @@ class ClientApp(QMainWindow):
         if MedicalCardApp is None:
             QMessageBox.critical(self, "Ошибка", "Модуль 'Мед. карты' не найден.")
             return
-        self.medicalcard_window = MedicalCardApp(user_id=self.user_id, role=self.role)
-        self.medicalcard_window.show()
+        self.windows.open("medicalcard", lambda: MedicalCardApp(user_id=self.user_id, role=self.role))
 
     def open_login(self):
         """Закрывает текущее окно и открывает окно авторизации"""
@@ -471,6 +479,7 @@ class ClientApp(QMainWindow):
 
     def closeEvent(self, event):
         logging.debug("Закрытие окна ClientApp")
+        self.windows.close_all()
         if self.cursor:
             self.cursor.close()
         if self.conn:
@@ -478,7 +487,9 @@ class ClientApp(QMainWindow):
         event.accept()
 
 if __name__ == "__main__":
+    setup_logging()
     app = QApplication(sys.argv)
+    apply_theme(app)
     app.setStyle("Fusion")
     window = ClientApp(user_id=1, role="Пользователь")
     window.show()
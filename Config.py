@@ -0,0 +1,37 @@
+import os
+import logging
+import configparser
+
+# Настройки приложения читаются один раз при импорте: сначала config.ini (путь можно
+# переопределить переменной MEDSYS_CONFIG), затем переменные окружения вида
+# MEDSYS_<РАЗДЕЛ>_<КЛЮЧ>, например MEDSYS_DATABASE_HOST=db.clinic.local.
+# Значения по умолчанию указываются там, где настройка используется (fallback=...),
+# поэтому без файла приложение работает как прежде. Пример файла — config.ini.example.
+CONFIG_PATH = os.environ.get('MEDSYS_CONFIG', 'config.ini')
+ENV_PREFIX = 'MEDSYS_'
+
+
+def load_config(path=CONFIG_PATH, environ=None):
+    environ = os.environ if environ is None else environ
+    config = configparser.ConfigParser(interpolation=None)
+    try:
+        loaded = config.read(path, encoding='utf-8')
+    except configparser.Error as e:
+        logging.error(f"Ошибка в файле настроек {path}: {str(e)}")
+        loaded = []
+    if loaded:
+        logging.debug(f"Настройки прочитаны из {path}")
+
+    for name, value in environ.items():
+        if not name.startswith(ENV_PREFIX) or name == 'MEDSYS_CONFIG':
+            continue
+        section, _, key = name[len(ENV_PREFIX):].lower().partition('_')
+        if not section or not key:
+            continue
+        if not config.has_section(section):
+            config.add_section(section)
+        config.set(section, key, value)
+    return config
+
+
+config = load_config()
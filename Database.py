@@ -0,0 +1,391 @@
+import re
+import time
+import logging
+import threading
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+
+from Config import config
+
+
+def connection_params():
+    """Параметры psycopg2.connect из раздела [database]; dsn, если задан, заменяет отдельные поля"""
+    section = 'database'
+    dsn = config.get(section, 'dsn', fallback='')
+    params = {} if dsn else {
+        'dbname': config.get(section, 'dbname', fallback='Practice'),
+        'user': config.get(section, 'user', fallback='postgres'),
+        'password': config.get(section, 'password', fallback='123'),
+        'host': config.get(section, 'host', fallback='localhost'),
+        'port': config.getint(section, 'port', fallback=5432),
+    }
+    if dsn:
+        params['dsn'] = dsn
+    # Без таймаутов медленный запрос или недоступный сервер подвешивают окно навсегда
+    params.update({
+        'connect_timeout': config.getint(section, 'connect_timeout', fallback=5),
+        'keepalives': 1,
+        'keepalives_idle': config.getint(section, 'keepalives_idle', fallback=30),
+        'keepalives_interval': config.getint(section, 'keepalives_interval', fallback=10),
+        'keepalives_count': config.getint(section, 'keepalives_count', fallback=3),
+        'application_name': config.get(section, 'application_name', fallback='medsys'),
+        'options': (
+            f"-c statement_timeout={config.get(section, 'statement_timeout', fallback='60s')} "
+            f"-c lock_timeout={config.get(section, 'lock_timeout', fallback='5s')}"
+        ),
+    })
+    return params
+
+
+DB_PARAMS = connection_params()
+
+# Пул соединений окон: закрытое окно возвращает соединение, следующее окно берёт его без
+# нового подключения. POOL_MIN_CONNECTIONS — сколько свободных соединений держать открытыми.
+POOL_MIN_CONNECTIONS = config.getint('pool', 'minconn', fallback=2)
+POOL_MAX_CONNECTIONS = config.getint('pool', 'maxconn', fallback=20)
+
+# Ошибки psycopg2, означающие потерю соединения, а не ошибку в данных
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+# Переподключение: несколько попыток подряд с удвоением паузы. Если сервер так и не ответил,
+# следующие запросы сразу получают ошибку, пока не пройдёт пауза (она тоже растёт),
+# чтобы окно не подвисало на каждом запросе. В GUI-потоке попытка одна (не дольше connect_timeout):
+# повторы с паузами остаются фоновым потокам (QueryRunner, офлайн-очередь).
+RECONNECT_ATTEMPTS = config.getint('reconnect', 'attempts', fallback=4)
+RECONNECT_BASE_DELAY = config.getfloat('reconnect', 'base_delay', fallback=0.25)
+RECONNECT_MAX_DELAY = config.getfloat('reconnect', 'max_delay', fallback=30.0)
+
+# Повторяются только чтения: запрос без изменения данных в транзакции, где ещё ничего не изменено.
+# SET меняет только параметры сеанса (например, statement_timeout в QueryRunner.py)
+READ_QUERY = re.compile(r"^\s*(SELECT|WITH|SHOW|VALUES|SET)\b", re.IGNORECASE)
+WRITE_KEYWORDS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|nextval|setval)\b"
+    # SELECT функции (например, appointment_ensure_partition) может менять данные
+    r"|^\s*SELECT\s+(?!(COUNT|MAX|MIN|SUM|AVG|COALESCE|EXISTS|ARRAY_AGG)\b)\w+\s*\(",
+    re.IGNORECASE
+)
+
+
+def is_read_query(query):
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    return bool(READ_QUERY.match(query)) and not WRITE_KEYWORDS.search(query)
+
+
+class ConnectionMetrics:
+    """Счётчики обрывов и переподключений всех соединений приложения"""
+
+    def __init__(self):
+        self.disconnects = 0
+        self.reconnects = 0
+        self.failed_attempts = 0
+        self.retried_queries = 0
+        self.downtime = 0.0
+        self.last_error = None
+
+    def snapshot(self):
+        return {
+            'disconnects': self.disconnects,
+            'reconnects': self.reconnects,
+            'failed_attempts': self.failed_attempts,
+            'retried_queries': self.retried_queries,
+            'downtime_seconds': round(self.downtime, 3),
+            'last_error': self.last_error,
+        }
+
+
+METRICS = ConnectionMetrics()
+
+
+def connection_metrics():
+    return METRICS.snapshot()
+
+
+def open_connection():
+    """Обычное соединение psycopg2 (для фоновых задач со своим циклом повторов)"""
+    return psycopg2.connect(**DB_PARAMS)
+
+
+_pool = None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadedConnectionPool(POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS, **DB_PARAMS)
+    return _pool
+
+
+# Пользователь, от имени которого работают окна; триггеры аудита (миграция 007_audit_log)
+# читают его из параметров сеанса medsys.user_id и medsys.role
+session_actor = {'user_id': None, 'role': None}
+
+
+def set_session_actor(user_id, role):
+    """Вызывается после входа; действует на соединения, которые окна получат после вызова"""
+    session_actor['user_id'] = user_id
+    session_actor['role'] = role
+
+
+def apply_session_actor(raw):
+    # Один запрос при выдаче соединения окну, а не при каждом изменении данных
+    cursor = raw.cursor()
+    try:
+        cursor.execute(
+            "SELECT set_config('medsys.user_id', %s, false), set_config('medsys.role', %s, false)",
+            ('' if session_actor['user_id'] is None else str(session_actor['user_id']),
+             session_actor['role'] or '')
+        )
+    finally:
+        cursor.close()
+    # Параметры уровня сеанса сохраняются только после завершения транзакции
+    raw.commit()
+
+
+def checkout():
+    """Соединение из пула; (соединение, взято ли оно из пула)"""
+    try:
+        pool = get_pool()
+        while True:
+            raw = pool.getconn()
+            if not raw.closed:
+                pooled = True
+                break
+            pool.putconn(raw, close=True)
+    except PoolError as e:
+        # Все соединения пула заняты: окно работает на отдельном соединении
+        logging.warning(f"Пул соединений исчерпан: {str(e)}")
+        raw, pooled = open_connection(), False
+    try:
+        apply_session_actor(raw)
+    except psycopg2.Error as e:
+        logging.error(f"Не удалось передать серверу пользователя сеанса: {str(e)}")
+        raw.rollback()
+    return raw, pooled
+
+
+def release(raw, pooled):
+    if not pooled:
+        raw.close()
+        return
+    try:
+        # Пул откатывает незавершённую транзакцию и закрывает сломанное соединение
+        get_pool().putconn(raw, close=bool(raw.closed))
+    except PoolError as e:
+        logging.warning(f"Не удалось вернуть соединение в пул: {str(e)}")
+        raw.close()
+
+
+def connect():
+    """Соединение для окон: берётся из пула и после обрыва переподключается само"""
+    return ResilientConnection(*checkout())
+
+
+class ResilientConnection:
+    """Обёртка над соединением psycopg2 с переподключением после обрыва.
+
+    Курсоры, выданные cursor(), после переподключения сами переходят на новое
+    соединение, поэтому окна могут держать self.cursor всё время работы.
+    """
+
+    def __init__(self, raw, pooled=False):
+        self.raw = raw
+        self.pooled = pooled
+        self.released = False
+        # Номер соединения: курсоры сравнивают его со своим и при расхождении пересоздаются
+        self.generation = 0
+        # В текущей транзакции были изменения — после обрыва её нельзя повторить
+        self.dirty = False
+        self.down_since = None
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def __getattr__(self, name):
+        self.check_open()
+        return getattr(self.raw, name)
+
+    def check_open(self):
+        if self.released:
+            raise psycopg2.InterfaceError("connection already closed")
+
+    @property
+    def closed(self):
+        # Соединение, возвращённое в пул, для окна закрыто, хотя само остаётся открытым
+        return 1 if self.released else self.raw.closed
+
+    def cursor(self, *args, **kwargs):
+        self.check_open()
+        return ResilientCursor(self, args, kwargs)
+
+    def broken(self):
+        return self.raw.closed != 0
+
+    def mark_broken(self, error):
+        if self.down_since is None:
+            self.down_since = time.monotonic()
+            METRICS.disconnects += 1
+        METRICS.last_error = str(error)
+        logging.warning(f"Соединение с базой данных потеряно: {str(error)}")
+
+    def reconnect(self):
+        """Новое соединение с повторами и экспоненциальной паузой; при неудаче — исключение"""
+        self.check_open()
+        if self.down_since is None:
+            self.down_since = time.monotonic()
+        if time.monotonic() < self.retry_at:
+            raise psycopg2.OperationalError("Нет связи с сервером базы данных")
+
+        attempts = 1 if threading.current_thread() is threading.main_thread() else RECONNECT_ATTEMPTS
+        error = None
+        for attempt in range(attempts):
+            try:
+                raw, pooled = checkout()
+            except CONNECTION_ERRORS as e:
+                error = e
+                METRICS.failed_attempts += 1
+                if attempt + 1 < attempts:
+                    time.sleep(min(RECONNECT_BASE_DELAY * 2 ** attempt, RECONNECT_MAX_DELAY))
+                continue
+
+            try:
+                release(self.raw, self.pooled)
+            except Exception:
+                pass
+            self.raw = raw
+            self.pooled = pooled
+            self.generation += 1
+            self.dirty = False
+            self.failures = 0
+            self.retry_at = 0.0
+            downtime = time.monotonic() - self.down_since
+            self.down_since = None
+            METRICS.reconnects += 1
+            METRICS.downtime += downtime
+            logging.info(f"Соединение с базой данных восстановлено через {downtime:.1f} с; "
+                         f"метрики: {METRICS.snapshot()}")
+            return
+
+        self.failures += 1
+        self.retry_at = time.monotonic() + min(
+            RECONNECT_BASE_DELAY * 2 ** (attempts + self.failures - 1), RECONNECT_MAX_DELAY
+        )
+        METRICS.last_error = str(error)
+        logging.error(f"Не удалось переподключиться к базе данных: {str(error)}")
+        raise error
+
+    def commit(self):
+        self.check_open()
+        try:
+            self.raw.commit()
+        except CONNECTION_ERRORS as e:
+            if not self.broken():
+                raise
+            # Дошёл ли коммит до сервера, неизвестно: соединение восстанавливается, ошибка передаётся окну
+            self.mark_broken(e)
+            self.dirty = False
+            try:
+                self.reconnect()
+            except CONNECTION_ERRORS:
+                pass
+            raise
+        self.dirty = False
+
+    def rollback(self):
+        self.dirty = False
+        if self.released:
+            # Незавершённую транзакцию откатил пул при возврате соединения
+            return
+        if self.broken():
+            # Откатывать нечего: транзакция пропала вместе с соединением
+            try:
+                self.reconnect()
+            except CONNECTION_ERRORS:
+                pass
+            return
+        self.raw.rollback()
+
+    def close(self):
+        """Возврат соединения в пул; окна вызывают его в closeEvent"""
+        if self.released:
+            return
+        self.released = True
+        release(self.raw, self.pooled)
+        # Соединение уже принадлежит пулу и может быть выдано другому окну
+        self.raw = None
+
+
+class ResilientCursor:
+    """Курсор, который переживает переподключение ResilientConnection и повторяет чтения"""
+
+    def __init__(self, connection, args, kwargs):
+        self.connection_wrapper = connection
+        self.args = args
+        self.kwargs = kwargs
+        # На оборванном соединении курсор создаётся при первом запросе, после переподключения
+        self.generation = None
+        self.raw = None
+        # statement_timeout транзакции курсора (set_timeout); после переподключения задаётся заново
+        self.timeout = None
+        if not connection.broken():
+            self.generation = connection.generation
+            self.raw = connection.raw.cursor(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.raw if self.raw is not None else self.current(), name)
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def current(self):
+        conn = self.connection_wrapper
+        if conn.broken() and not conn.dirty:
+            conn.reconnect()
+        if self.generation != conn.generation:
+            self.raw = conn.raw.cursor(*self.args, **self.kwargs)
+            self.generation = conn.generation
+            if self.timeout is not None:
+                self.raw.execute("SET LOCAL statement_timeout = %s", (self.timeout,))
+        return self.raw
+
+    def set_timeout(self, timeout):
+        """statement_timeout до конца транзакции, в том числе для чтений, повторённых после переподключения"""
+        self.timeout = timeout
+        self.execute("SET LOCAL statement_timeout = %s", (timeout,))
+
+    def execute(self, query, vars=None):
+        conn = self.connection_wrapper
+        conn.check_open()
+        read = is_read_query(query)
+        retry = read and not conn.dirty
+        try:
+            result = self.current().execute(query, vars)
+        except CONNECTION_ERRORS as e:
+            if not conn.broken():
+                raise
+            conn.mark_broken(e)
+            conn.dirty = False
+            conn.reconnect()
+            if not retry:
+                # Изменения транзакции потеряны; окно откатывает их и сообщает об ошибке
+                raise
+            METRICS.retried_queries += 1
+            logging.debug("Повтор чтения после переподключения")
+            result = self.current().execute(query, vars)
+        if not read:
+            conn.dirty = True
+        return result
+
+    def close(self):
+        if self.raw is None:
+            return
+        try:
+            self.raw.close()
+        except CONNECTION_ERRORS:
+            pass
@@ -1,15 +1,26 @@
 import sys
-import psycopg2
+import logging
+from Database import connect
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout,
     QHBoxLayout, QLabel, QPushButton, QTableWidget,
     QTableWidgetItem, QMessageBox, QLineEdit,
     QHeaderView, QDialog, QFormLayout
 )
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor, QPalette, QIcon  # Added QIcon for the window icon
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QColor, QIcon  # Added QIcon for the window icon
+from Theme import apply_theme, set_variant, VARIANT_GRID
+from LogConfig import setup_logging
+from DiagnosisSearch import search_diagnoses, diagnosis_cache
+from Config import config
+
+# Справочник МКБ большой, поэтому в таблице показывается не больше LIST_LIMIT записей;
+# остальные находятся через строку поиска
+LIST_LIMIT = config.getint('fetch', 'diagnosis_list_limit', fallback=500)
 
 class DiagnosisApp(QMainWindow):
+    CHANGE_TABLES = ("diagnosis",)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Медицинская информационная система - Диагнозы")
@@ -24,65 +35,6 @@ class DiagnosisApp(QMainWindow):
         self.med_white = QColor(255, 255, 255)  # Белый
         self.med_red = QColor(200, 16, 46)  # Для предупреждений
 
-        # Установка стиля приложения
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {self.med_light.name()};
-            }}
-            QTableWidget {{
-                background-color: {self.med_white.name()};
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                gridline-color: #d1d8e0;
-                font-size: 14px;
-            }}
-            QTableWidget::item {{
-                padding: 8px;
-            }}
-            QHeaderView::section {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                padding: 8px;
-                border: none;
-                font-weight: bold;
-            }}
-            QPushButton {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px 15px;
-                font-size: 14px;
-                min-width: 100px;
-            }}
-            QPushButton:hover {{
-                background-color: {self.med_blue.darker(110).name()};
-            }}
-            QPushButton:pressed {{
-                background-color: {self.med_blue.darker(120).name()};
-            }}
-            QPushButton:disabled {{
-                background-color: #cccccc;
-            }}
-            QLineEdit {{
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-                max-width: 300px;
-            }}
-            QDialog {{
-                background-color: {self.med_light.name()};
-            }}
-        """)
-
-        # Настройка цветовой палитры
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Window, self.med_light)
-        palette.setColor(QPalette.ColorRole.Base, self.med_white)
-        palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-        self.setPalette(palette)
-
         self.conn = None
         self.cursor = None
         self.connect_to_db()
@@ -92,12 +44,7 @@ class DiagnosisApp(QMainWindow):
     def connect_to_db(self):
         """Подключение к базе данных"""
         try:
-            self.conn = psycopg2.connect(
-                dbname='Practice',
-                user='postgres',
-                password='123',
-                host='localhost'
-            )
+            self.conn = connect()
             self.cursor = self.conn.cursor()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {str(e)}")
@@ -113,14 +60,7 @@ class DiagnosisApp(QMainWindow):
 
         # Заголовок
         title_label = QLabel("Управление диагнозами")
-        title_label.setStyleSheet(f"""
-            QLabel {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {self.med_blue.name()};
-                padding: 10px;
-            }}
-        """)
+        title_label.setObjectName("title")
         layout.addWidget(title_label)
 
         # Кнопки управления
@@ -146,6 +86,17 @@ class DiagnosisApp(QMainWindow):
         btn_layout.addWidget(self.delete_btn)
         btn_layout.addWidget(self.refresh_btn)
 
+        # Поиск по названию на сервере (с задержкой, чтобы не отправлять запрос на каждую букву)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск по названию или коду МКБ")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.load_data)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.search_input)
+
         # Таблица с данными
         self.table = QTableWidget()
         self.table.setColumnCount(2)
@@ -153,24 +104,7 @@ class DiagnosisApp(QMainWindow):
         self.table.setColumnHidden(0, True)  # Скрываем столбец ID
 
         # Настройка границ и внешнего вида таблицы
-        self.table.setStyleSheet("""
-                    QTableWidget {
-                        border: 1px solid #c0c0c0;
-                        gridline-color: #c0c0c0;
-                    }
-                    QHeaderView::section {
-                        background-color: #006DB0;
-                        color: white;
-                        padding: 8px;
-                        border: 1px solid #c0c0c0;
-                        font-weight: bold;
-                    }
-                    QTableWidget::item {
-                        border-right: 1px solid #c0c0c0;
-                        border-bottom: 1px solid #c0c0c0;
-                        padding: 8px;
-                    }
-                """)
+        set_variant(self.table, VARIANT_GRID)
 
         # Настройка размеров столбцов
         header = self.table.horizontalHeader()
@@ -186,11 +120,6 @@ class DiagnosisApp(QMainWindow):
 
         # Альтернативные цвета строк
         self.table.setAlternatingRowColors(True)
-        self.table.setStyleSheet("""
-                    QTableWidget {
-                        alternate-background-color: #f5f5f5;
-                    }
-                """)
 
         layout.addLayout(btn_layout)
         layout.addWidget(self.table)
@@ -198,12 +127,18 @@ class DiagnosisApp(QMainWindow):
     def load_data(self):
         """Загрузка данных из таблицы diagnosis"""
         if not hasattr(self, 'cursor') or not self.cursor:
-            print("Курсор не инициализирован")
+            logging.error("Курсор не инициализирован")
             return
 
         try:
-            self.cursor.execute("SELECT diagnosisid, diagnosisname FROM diagnosis ORDER BY diagnosisid")
-            data = self.cursor.fetchall()
+            search_text = self.search_input.text().strip()
+            if search_text:
+                data = [row[:2] for row in search_diagnoses(self.cursor, search_text, limit=LIST_LIMIT)]
+            else:
+                self.cursor.execute(
+                    "SELECT diagnosisid, diagnosisname FROM diagnosis ORDER BY diagnosisid LIMIT %s",
+                    (LIST_LIMIT,))
+                data = self.cursor.fetchall()
 
             self.table.setRowCount(len(data))
             for row_idx, row in enumerate(data):
@@ -220,10 +155,11 @@ class DiagnosisApp(QMainWindow):
 
                     self.table.setItem(row_idx, col_idx, item)
 
-            print(f"Загружено {len(data)} записей")
+            logging.debug(f"Загружено {len(data)} записей")
 
         except Exception as e:
-            print(f"Ошибка при загрузке данных: {e}")
+            self.conn.rollback()
+            logging.error(f"Ошибка при загрузке данных: {str(e)}")
             QMessageBox.critical(
                 self,
                 "Ошибка загрузки",
@@ -268,6 +204,7 @@ class DiagnosisApp(QMainWindow):
                     (name,))
                 new_id = self.cursor.fetchone()[0]
                 self.conn.commit()
+                diagnosis_cache.clear()
 
                 row_pos = self.table.rowCount()
                 self.table.insertRow(row_pos)
@@ -340,6 +277,7 @@ class DiagnosisApp(QMainWindow):
                     "UPDATE diagnosis SET diagnosisname = %s WHERE diagnosisid = %s",
                     (new_name, diagnosis_id))
                 self.conn.commit()
+                diagnosis_cache.clear()
 
                 # Обновляем таблицу
                 self.table.item(row, 1).setText(new_name)
@@ -376,6 +314,7 @@ class DiagnosisApp(QMainWindow):
                     "DELETE FROM diagnosis WHERE diagnosisid = %s",
                     (diagnosis_id,))
                 self.conn.commit()
+                diagnosis_cache.clear()
                 self.table.removeRow(row)
             except Exception as e:
                 self.conn.rollback()
@@ -390,7 +329,9 @@ class DiagnosisApp(QMainWindow):
         event.accept()
 
 if __name__ == "__main__":
+    setup_logging()
     app = QApplication(sys.argv)
+    apply_theme(app)
     app.setStyle("Fusion")
     window = DiagnosisApp()
     window.show()
@@ -0,0 +1,66 @@
+import re
+import logging
+
+from SearchPicker import SearchPicker, LRUCache
+from PatientSearch import search_pattern
+from Config import config
+
+# Выражение совпадает с индексом diagnosis_name_fts_idx (см. Migrations.py)
+DIAGNOSIS_TSVECTOR = "to_tsvector('russian', d.diagnosisname)"
+SEARCH_LIMIT = config.getint('fetch', 'diagnosis_search_limit', fallback=20)
+
+# Недавние результаты поиска диагнозов
+diagnosis_cache = LRUCache(
+    maxsize=config.getint('cache', 'diagnosis_search', fallback=256),
+    ttl=config.getint('cache', 'diagnosis_search_ttl', fallback=300)
+)
+
+
+def prefix_tsquery(text):
+    """Запрос для to_tsquery: каждое слово ищется как префикс ("остр бронх" -> "остр:* & бронх:*")"""
+    words = re.findall(r"\w+", text.lower())
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def search_diagnoses(cursor, text, limit=SEARCH_LIMIT):
+    """Диагнозы для выпадающего списка: [(diagnosisid, название, None)].
+
+    Полнотекстовый поиск по словам (с учётом морфологии) и по началу слов;
+    при опечатках и для кодов МКБ срабатывает триграммный поиск по подстроке.
+    """
+    key = (text.strip().lower(), limit)
+    cached = diagnosis_cache.get(key)
+    if cached is not None:
+        return cached
+
+    term = text.strip()
+    tsquery = prefix_tsquery(term)
+    if not tsquery:
+        return []
+    query = f"""
+        SELECT d.diagnosisid, d.diagnosisname, NULL
+        FROM diagnosis d
+        WHERE {DIAGNOSIS_TSVECTOR} @@ to_tsquery('russian', %s)
+           OR d.diagnosisname ILIKE %s
+           OR d.diagnosisname %% %s
+        ORDER BY ts_rank({DIAGNOSIS_TSVECTOR}, to_tsquery('russian', %s)) DESC,
+                 similarity(d.diagnosisname, %s) DESC,
+                 d.diagnosisname
+        LIMIT %s
+    """
+    cursor.execute(query, (tsquery, search_pattern(term), term, tsquery, term, limit))
+    results = cursor.fetchall()
+    diagnosis_cache.put(key, results)
+    logging.debug(f"Поиск диагнозов '{text}': найдено {len(results)}")
+    return results
+
+
+class DiagnosisPicker(SearchPicker):
+    """Выбор диагноза с поиском на сервере; пустой текст означает «диагноз не выбран»"""
+
+    def __init__(self, cursor, parent=None):
+        super().__init__(
+            lambda text: search_diagnoses(cursor, text),
+            placeholder="Начните вводить название или код МКБ",
+            parent=parent
+        )
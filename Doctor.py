@@ -1,5 +1,6 @@
 import sys
-import psycopg2
+import logging
+from Database import connect
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout,
     QHBoxLayout, QLabel, QPushButton, QTableWidget,
@@ -7,10 +8,15 @@ from PyQt6.QtWidgets import (
     QHeaderView, QDialog, QFormLayout, QComboBox
 )
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor, QPalette,QIcon
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme, set_variant, VARIANT_GRID_COMPACT
+from LogConfig import setup_logging
+from LocalReplica import get_replica
 
 
 class DoctorsApp(QMainWindow):
+    CHANGE_TABLES = ("doctor", "specialization", "jobtitle")
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Медицинская информационная система - Врачи")
@@ -24,65 +30,6 @@ class DoctorsApp(QMainWindow):
         self.med_white = QColor(255, 255, 255)  # Белый
         self.med_red = QColor(200, 16, 46)  # Для предупреждений
 
-        # Установка стиля приложения
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {self.med_light.name()};
-            }}
-            QTableWidget {{
-                background-color: {self.med_white.name()};
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                gridline-color: #d1d8e0;
-                font-size: 14px;
-            }}
-            QTableWidget::item {{
-                padding: 8px;
-            }}
-            QHeaderView::section {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                padding: 8px;
-                border: none;
-                font-weight: bold;
-            }}
-            QPushButton {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px 15px;
-                font-size: 14px;
-                min-width: 100px;
-            }}
-            QPushButton:hover {{
-                background-color: {self.med_blue.darker(110).name()};
-            }}
-            QPushButton:pressed {{
-                background-color: {self.med_blue.darker(120).name()};
-            }}
-            QPushButton:disabled {{
-                background-color: #cccccc;
-            }}
-            QLineEdit, QComboBox {{
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-                max-width: 300px;
-            }}
-            QDialog {{
-                background-color: {self.med_light.name()};
-            }}
-        """)
-
-        # Настройка цветовой палитры
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Window, self.med_light)
-        palette.setColor(QPalette.ColorRole.Base, self.med_white)
-        palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-        self.setPalette(palette)
-
         self.conn = None
         self.cursor = None
         self.connect_to_db()
@@ -94,12 +41,7 @@ class DoctorsApp(QMainWindow):
     def connect_to_db(self):
         """Подключение к базе данных"""
         try:
-            self.conn = psycopg2.connect(
-                dbname='Practice',
-                user='postgres',
-                password='123',
-                host='localhost'
-            )
+            self.conn = connect()
             self.cursor = self.conn.cursor()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {str(e)}")
@@ -108,20 +50,24 @@ class DoctorsApp(QMainWindow):
     def load_specializations(self):
         """Загрузка списка специализаций для комбобокса"""
         try:
-            self.cursor.execute(
-                "SELECT specializationid, specializationname FROM specialization ORDER BY specializationname")
-            self.specializations = self.cursor.fetchall()
+            self.specializations = get_replica().specializations()
+            if self.specializations is None:
+                self.cursor.execute(
+                    "SELECT specializationid, specializationname FROM specialization ORDER BY specializationname")
+                self.specializations = self.cursor.fetchall()
         except Exception as e:
-            print(f"Ошибка при загрузке специализаций: {e}")
+            logging.error(f"Ошибка при загрузке специализаций: {str(e)}")
             self.specializations = []
 
     def load_job_titles(self):
         """Загрузка списка должностей для комбобокса"""
         try:
-            self.cursor.execute("SELECT jobtitleid, jobtitlename FROM jobtitle ORDER BY jobtitlename")
-            self.job_titles = self.cursor.fetchall()
+            self.job_titles = get_replica().job_titles()
+            if self.job_titles is None:
+                self.cursor.execute("SELECT jobtitleid, jobtitlename FROM jobtitle ORDER BY jobtitlename")
+                self.job_titles = self.cursor.fetchall()
         except Exception as e:
-            print(f"Ошибка при загрузке должностей: {e}")
+            logging.error(f"Ошибка при загрузке должностей: {str(e)}")
             self.job_titles = []
 
     def setup_ui(self):
@@ -134,14 +80,7 @@ class DoctorsApp(QMainWindow):
 
         # Заголовок
         title_label = QLabel("Управление врачами")
-        title_label.setStyleSheet(f"""
-            QLabel {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {self.med_blue.name()};
-                padding: 10px;
-            }}
-        """)
+        title_label.setObjectName("title")
         layout.addWidget(title_label)
 
         # Кнопки управления
@@ -178,21 +117,7 @@ class DoctorsApp(QMainWindow):
 
         # Настройка разделителей столбцов
         self.table.setShowGrid(True)  # Включаем отображение сетки
-        self.table.setStyleSheet("""
-                    QTableWidget {
-                        gridline-color: #c0c0c0;  /* Серый цвет линий сетки */
-                        border: 1px solid #c0c0c0;
-                    }
-                    QHeaderView::section {
-                        border: 1px solid #c0c0c0;
-                        padding: 5px;
-                    }
-                    QTableWidget::item {
-                        border-right: 1px solid #c0c0c0;
-                        border-bottom: 1px solid #c0c0c0;
-                        padding: 5px;
-                    }
-                """)
+        set_variant(self.table, VARIANT_GRID_COMPACT)
 
         # Настройка размеров столбцов
         header = self.table.horizontalHeader()
@@ -213,11 +138,6 @@ class DoctorsApp(QMainWindow):
         # Альтернативные цвета строк
         self.table.setAlternatingRowColors(True)
         self.table.setAlternatingRowColors(True)
-        self.table.setStyleSheet("""
-                    QTableWidget {
-                        alternate-background-color: #f5f5f5;
-                    }
-                """)
 
         layout.addLayout(btn_layout)
         layout.addWidget(self.table)
@@ -225,7 +145,7 @@ class DoctorsApp(QMainWindow):
     def load_data(self):
         """Загрузка данных о врачах с объединением таблиц"""
         if not hasattr(self, 'cursor') or not self.cursor:
-            print("Курсор не инициализирован")
+            logging.error("Курсор не инициализирован")
             return
 
         try:
@@ -258,10 +178,10 @@ class DoctorsApp(QMainWindow):
 
                     self.table.setItem(row_idx, col_idx, item)
 
-            print(f"Загружено {len(data)} записей")
+            logging.debug(f"Загружено {len(data)} записей")
 
         except Exception as e:
-            print(f"Ошибка при загрузке данных: {e}")
+            logging.error(f"Ошибка при загрузке данных: {str(e)}")
             QMessageBox.critical(
                 self,
                 "Ошибка загрузки",
@@ -552,7 +472,9 @@ class DoctorsApp(QMainWindow):
 
 
 if __name__ == "__main__":
+    setup_logging()
     app = QApplication(sys.argv)
+    apply_theme(app)
     app.setStyle("Fusion")
     window = DoctorsApp()
     window.show()
@@ -5,14 +5,14 @@ from PyQt6.QtWidgets import (
     QLabel, QPushButton, QMessageBox
 )
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor, QPalette, QIcon
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme, set_variant, VARIANT_MENU
+from LogConfig import setup_logging
 
 from MedicalCard import MedicalCardApp
 from Doctor import DoctorsApp
 from Appointment import AppointmentsApp
-
-# Настройка логирования
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+from WindowManager import WindowManager
 
 
 class MainApp(QMainWindow):
@@ -34,37 +34,11 @@ class MainApp(QMainWindow):
         self.med_white = QColor(255, 255, 255)
         self.med_red = QColor(200, 16, 46)
 
-        # Установка стиля приложения
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {self.med_light.name()};
-            }}
-            QPushButton {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 15px 20px;
-                font-size: 16px;
-                min-width: 200px;
-            }}
-            QPushButton:hover {{
-                background-color: {self.med_blue.darker(110).name()};
-            }}
-            QPushButton:pressed {{
-                background-color: {self.med_blue.darker(120).name()};
-            }}
-            QPushButton:disabled {{
-                background-color: #cccccc;
-            }}
-        """)
-
-        # Настройка цветовой палитры
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Window, self.med_light)
-        palette.setColor(QPalette.ColorRole.Base, self.med_white)
-        palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-        self.setPalette(palette)
+        # Оформление задаётся темой приложения (Theme.py)
+        set_variant(self, VARIANT_MENU)
+
+        # Открытые из меню окна переиспользуются, а не создаются заново
+        self.windows = WindowManager(self)
 
         logging.debug("Настройка UI EmployeeApp")
         self.setup_ui()
@@ -80,14 +54,7 @@ class MainApp(QMainWindow):
 
         # Заголовок
         title_label = QLabel("Главное меню сотрудника")
-        title_label.setStyleSheet(f"""
-            QLabel {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {self.med_blue.name()};
-                padding: 10px;
-            }}
-        """)
+        title_label.setObjectName("title")
         layout.addWidget(title_label)
 
         # Контейнер для кнопок
@@ -128,8 +95,7 @@ class MainApp(QMainWindow):
     def open_medicalcard(self):
         logging.debug("Открытие MedicalCardApp")
         try:
-            self.medicalcard_window = MedicalCardApp(user_id=self.user_id, role=self.role)
-            self.medicalcard_window.show()
+            self.windows.open("medicalcard", lambda: MedicalCardApp(user_id=self.user_id, role=self.role))
             logging.debug("MedicalCardApp открыт успешно")
         except Exception as e:
             logging.error(f"Ошибка при открытии MedicalCardApp: {str(e)}")
@@ -138,8 +104,7 @@ class MainApp(QMainWindow):
     def open_doctors(self):
         logging.debug("Открытие DoctorsApp")
         try:
-            self.doctors_window = DoctorsApp()
-            self.doctors_window.show()
+            self.windows.open("doctors", DoctorsApp)
             logging.debug("DoctorsApp открыт успешно")
         except Exception as e:
             logging.error(f"Ошибка при открытии DoctorsApp: {str(e)}")
@@ -148,8 +113,7 @@ class MainApp(QMainWindow):
     def open_services(self):
         logging.debug("Открытие AppointmentsApp")
         try:
-            self.services_window = AppointmentsApp()
-            self.services_window.show()
+            self.windows.open("services", AppointmentsApp)
             logging.debug("AppointmentsApp открыт успешно")
         except Exception as e:
             logging.error(f"Ошибка при открытии AppointmentsApp: {str(e)}")
@@ -168,9 +132,16 @@ class MainApp(QMainWindow):
             logging.error(f"Ошибка при открытии окна авторизации: {str(e)}")
             QMessageBox.critical(self, "Ошибка", f"Не удалось открыть окно авторизации:\n{str(e)}")
 
+    def closeEvent(self, event):
+        logging.debug("Закрытие окна EmployeeApp")
+        self.windows.close_all()
+        event.accept()
+
 
 if __name__ == "__main__":
+    setup_logging()
     app = QApplication(sys.argv)
+    apply_theme(app)
     app.setStyle("Fusion")
     window = MainApp(user_id=1, role="Сотрудник")  # Тестовый запуск
     window.show()
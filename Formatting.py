@@ -0,0 +1,52 @@
+from datetime import date
+from functools import lru_cache
+
+# Общие форматы отображения дат, времени и цен во всех таблицах и в PDF-отчётах.
+# Различных дат в таблицах сотни, времён приёма — 16 слотов, цен — единицы, поэтому
+# строки запоминаются и strftime/format вызываются один раз на значение.
+DATE_FORMAT = "%d.%m.%Y"
+TIME_FORMAT = "%H:%M"
+DATETIME_FORMAT = "%d.%m.%Y %H:%M"
+
+
+@lru_cache(maxsize=4096)
+def format_date(value):
+    """date -> "дд.мм.гггг"; None -> пустая строка"""
+    return value.strftime(DATE_FORMAT) if value is not None else ""
+
+
+@lru_cache(maxsize=4096)
+def format_date_ordinal(ordinal):
+    """Дата по порядковому номеру дня (date.toordinal())"""
+    return date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+
+@lru_cache(maxsize=256)
+def format_time(value):
+    """time -> "чч:мм"; None -> пустая строка"""
+    return value.strftime(TIME_FORMAT) if value is not None else ""
+
+
+@lru_cache(maxsize=1440)
+def format_minutes(minutes):
+    """Время по числу минут от полуночи"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def format_datetime(value):
+    # Метки времени почти не повторяются, запоминать их нет смысла
+    return value.strftime(DATETIME_FORMAT) if value is not None else ""
+
+
+@lru_cache(maxsize=4096)
+def format_price(value):
+    """Цена с двумя знаками после запятой; None -> пустая строка"""
+    return f"{value:.2f}" if value is not None else ""
+
+
+@lru_cache(maxsize=4096)
+def format_cents(cents):
+    """Цена по целому числу копеек"""
+    # Деление и остаток берутся от модуля: -150 // 100 == -2 дало бы "-2.50"
+    sign = "-" if cents < 0 else ""
+    return f"{sign}{abs(cents) // 100}.{abs(cents) % 100:02d}"
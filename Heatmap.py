@@ -0,0 +1,229 @@
+import logging
+from datetime import date, timedelta
+
+from PyQt6.QtWidgets import QWidget, QToolTip
+from PyQt6.QtCore import Qt, QRect, QSize
+from PyQt6.QtGui import QColor, QPainter
+
+from Scheduling import WORKDAY_START_HOUR, SLOT_MINUTES, SLOTS_PER_DAY
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Та же сетка, что и в update_time_table: 08:00–16:00 по 30 минут
+SLOT_LABELS = [
+    f"{WORKDAY_START_HOUR + (i * SLOT_MINUTES) // 60:02d}:{(i * SLOT_MINUTES) % 60:02d}"
+    for i in range(SLOTS_PER_DAY)
+]
+
+STATUS_COMPLETED = 0
+STATUS_SCHEDULED = 1
+STATUS_CANCELLED = 2
+STATUS_OTHER = 3
+
+# Номера слотов считаются в SQL, чтобы в Python приходили только целые числа
+SLOT_QUERY = f"""
+    SELECT a.doctorid,
+           a.appointmentdate - %s::date,
+           FLOOR((EXTRACT(HOUR FROM a.starttime) * 60 + EXTRACT(MINUTE FROM a.starttime)
+                  - {WORKDAY_START_HOUR * 60}) / {SLOT_MINUTES})::int,
+           CEIL((EXTRACT(HOUR FROM a.endtime) * 60 + EXTRACT(MINUTE FROM a.endtime)
+                 - {WORKDAY_START_HOUR * 60}) / {SLOT_MINUTES})::int,
+           CASE a.status
+               WHEN 'Завершён' THEN {STATUS_COMPLETED}
+               WHEN 'Назначен' THEN {STATUS_SCHEDULED}
+               WHEN 'Отменён' THEN {STATUS_CANCELLED}
+               ELSE {STATUS_OTHER}
+           END
+    FROM appointment_all a
+    WHERE a.appointmentdate BETWEEN %s AND %s
+      AND a.doctorid IS NOT NULL
+"""
+
+
+class SlotMatrix:
+    """Занятость слотов: массив врачи × дни × слоты и показатели, посчитанные над ним.
+
+    booked[d, t, s] — число неотменённых приёмов врача d в слоте s дня t
+    (больше 1 — двойная запись).
+    """
+
+    def __init__(self, doctor_ids, start_date, days, rows, today=None):
+        self.doctor_ids = np.asarray(doctor_ids, dtype=np.int64)
+        self.start_date = start_date
+        self.days = days
+        self.booked = np.zeros((len(self.doctor_ids), days, SLOTS_PER_DAY), dtype=np.int16)
+
+        data = np.asarray(rows, dtype=np.int64).reshape(-1, 5)
+        # Индекс врача в строках матрицы; приёмы врачей не из списка отбрасываются
+        order = np.argsort(self.doctor_ids)
+        if len(order):
+            positions = np.minimum(np.searchsorted(self.doctor_ids, data[:, 0], sorter=order), len(order) - 1)
+            known = self.doctor_ids[order[positions]] == data[:, 0]
+        else:
+            positions = np.zeros(len(data), dtype=np.int64)
+            known = np.zeros(len(data), dtype=bool)
+        data = data[known]
+        doctor_index = order[positions[known]]
+
+        day_index = data[:, 1]
+        start_slot = np.clip(data[:, 2], 0, SLOTS_PER_DAY)
+        end_slot = np.clip(data[:, 3], 0, SLOTS_PER_DAY)
+        status = data[:, 4]
+
+        # Развёртка каждого приёма на все занятые им слоты без цикла по приёмам
+        active = status != STATUS_CANCELLED
+        lengths = np.where(active, np.maximum(end_slot - start_slot, 0), 0)
+        total = int(lengths.sum())
+        if total:
+            owners = np.repeat(np.arange(len(lengths)), lengths)
+            offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            np.add.at(self.booked, (doctor_index[owners], day_index[owners], start_slot[owners] + offsets), 1)
+
+        # Счётчики по статусам на уровне приёмов
+        doctors = len(self.doctor_ids)
+        today = today or date.today()
+        past = day_index < (today - start_date).days
+        self.appointment_count = np.bincount(doctor_index, minlength=doctors)
+        self.cancelled_count = np.bincount(doctor_index[status == STATUS_CANCELLED], minlength=doctors)
+        # Неявка: приём в прошлом так и остался в статусе «Назначен»
+        self.no_show_count = np.bincount(doctor_index[(status == STATUS_SCHEDULED) & past], minlength=doctors)
+
+    @classmethod
+    def load(cls, cursor, doctor_ids, start_date, end_date):
+        days = (end_date - start_date).days + 1
+        cursor.execute(SLOT_QUERY, (start_date, start_date, end_date))
+        rows = cursor.fetchall()
+        logging.debug(f"Загружено {len(rows)} приёмов для тепловой карты за {days} дней")
+        return cls(doctor_ids, start_date, days, rows)
+
+    def working_days(self):
+        """Число дней, в которые у врача были приёмы"""
+        return (self.booked.sum(axis=2) > 0).sum(axis=1)
+
+    def utilisation(self):
+        """Доля занятых слотов в дни приёма, по врачам"""
+        working = self.working_days()
+        occupied = np.minimum(self.booked, 1).sum(axis=(1, 2))
+        return np.divide(occupied, working * SLOTS_PER_DAY,
+                         out=np.zeros(len(working), dtype=float), where=working > 0)
+
+    def slot_utilisation(self):
+        """Врачи × слоты: как часто слот занят в дни приёма"""
+        working = self.working_days()[:, None]
+        occupied = np.minimum(self.booked, 1).sum(axis=1)
+        return np.divide(occupied, working, out=np.zeros(occupied.shape, dtype=float), where=working > 0)
+
+    def day_utilisation(self):
+        """Врачи × дни: доля занятых слотов дня"""
+        return np.minimum(self.booked, 1).sum(axis=2) / SLOTS_PER_DAY
+
+    def peak_slots(self):
+        """Самый загруженный слот каждого врача"""
+        return self.booked.sum(axis=1).argmax(axis=1)
+
+    def clinic_peak_slot(self):
+        return int(self.booked.sum(axis=(0, 1)).argmax())
+
+    def double_booked_slots(self):
+        """Число слотов с двумя и более приёмами, по врачам"""
+        return (self.booked > 1).sum(axis=(1, 2))
+
+    def cancel_rate(self):
+        return np.divide(self.cancelled_count, self.appointment_count,
+                         out=np.zeros(len(self.appointment_count), dtype=float),
+                         where=self.appointment_count > 0)
+
+    def no_show_rate(self):
+        return np.divide(self.no_show_count, self.appointment_count,
+                         out=np.zeros(len(self.appointment_count), dtype=float),
+                         where=self.appointment_count > 0)
+
+    def day_labels(self):
+        return [(self.start_date + timedelta(days=i)).strftime("%d.%m") for i in range(self.days)]
+
+
+class HeatmapWidget(QWidget):
+    """Тепловая карта: строки — врачи, столбцы — слоты или дни; цвет — загрузка от 0 до 1"""
+
+    CELL_WIDTH = 28
+    CELL_HEIGHT = 22
+    LABEL_WIDTH = 220
+    HEADER_HEIGHT = 50
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.values = None
+        self.row_labels = []
+        self.column_labels = []
+        self.setMouseTracking(True)
+
+    def set_data(self, values, row_labels, column_labels):
+        self.values = values
+        self.row_labels = row_labels
+        self.column_labels = column_labels
+        self.setMinimumSize(self.sizeHint())
+        self.update()
+
+    def sizeHint(self):
+        if self.values is None:
+            return QSize(400, 200)
+        rows, columns = self.values.shape
+        return QSize(self.LABEL_WIDTH + columns * self.CELL_WIDTH, self.HEADER_HEIGHT + rows * self.CELL_HEIGHT)
+
+    @staticmethod
+    def cell_color(value):
+        """От белого (свободно) к красному (полностью занято)"""
+        value = min(max(float(value), 0.0), 1.0)
+        return QColor(255, int(255 - 239 * value), int(255 - 209 * value))
+
+    def paintEvent(self, event):
+        if self.values is None:
+            return
+        painter = QPainter(self)
+        rows, columns = self.values.shape
+
+        painter.setPen(QColor(53, 59, 72))
+        for col in range(columns):
+            x = self.LABEL_WIDTH + col * self.CELL_WIDTH
+            painter.save()
+            painter.translate(x + self.CELL_WIDTH // 2, self.HEADER_HEIGHT - 4)
+            painter.rotate(-60)
+            painter.drawText(0, 0, self.column_labels[col])
+            painter.restore()
+
+        # Рисуются только видимые ячейки: за год по 100 врачам их десятки тысяч
+        exposed = event.rect()
+        first_row = max((exposed.top() - self.HEADER_HEIGHT) // self.CELL_HEIGHT, 0)
+        last_row = min((exposed.bottom() - self.HEADER_HEIGHT) // self.CELL_HEIGHT + 1, rows)
+        first_col = max((exposed.left() - self.LABEL_WIDTH) // self.CELL_WIDTH, 0)
+        last_col = min((exposed.right() - self.LABEL_WIDTH) // self.CELL_WIDTH + 1, columns)
+        for row in range(first_row, last_row):
+            y = self.HEADER_HEIGHT + row * self.CELL_HEIGHT
+            painter.setPen(QColor(53, 59, 72))
+            painter.drawText(QRect(4, y, self.LABEL_WIDTH - 8, self.CELL_HEIGHT),
+                             Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, self.row_labels[row])
+            painter.setPen(QColor(209, 216, 224))
+            for col in range(first_col, last_col):
+                rect = QRect(self.LABEL_WIDTH + col * self.CELL_WIDTH, y, self.CELL_WIDTH, self.CELL_HEIGHT)
+                painter.fillRect(rect, self.cell_color(self.values[row, col]))
+                painter.drawRect(rect)
+        painter.end()
+
+    def mouseMoveEvent(self, event):
+        if self.values is None:
+            return
+        pos = event.position().toPoint()
+        col = (pos.x() - self.LABEL_WIDTH) // self.CELL_WIDTH
+        row = (pos.y() - self.HEADER_HEIGHT) // self.CELL_HEIGHT
+        rows, columns = self.values.shape
+        if pos.x() >= self.LABEL_WIDTH and pos.y() >= self.HEADER_HEIGHT and row < rows and col < columns:
+            QToolTip.showText(
+                event.globalPosition().toPoint(),
+                f"{self.row_labels[row]}, {self.column_labels[col]}: {self.values[row, col] * 100:.0f}%",
+                self
+            )
+        else:
+            QToolTip.hideText()
@@ -0,0 +1,283 @@
+import time
+import sqlite3
+import logging
+import threading
+from decimal import Decimal
+
+from Database import open_connection
+from Config import config
+from WindowManager import fetch_changes
+from PyQt6.QtCore import QThread, pyqtSignal
+
+# Локальная реплика справочных таблиц (врачи, специализации, должности, цены).
+# Диагнозы не реплицируются: справочник МКБ большой, поиск по нему идёт на сервере (DiagnosisSearch.py).
+# Чтение идёт из SQLite-файла, запись по-прежнему только в основную базу PostgreSQL.
+REPLICA_PATH = 'replica.db'
+REFRESH_INTERVAL_SEC = config.getint('cache', 'replica_refresh_interval', fallback=60)
+# После первой полной копии таблицы дочитываются по журналу audit_log (миграция 007_audit_log):
+# копируются только строки, записи о которых новее сохранённого номера. Запись транзакции,
+# зафиксированной позже следующей, может получить меньший номер и не попасть в выборку, поэтому
+# таблицы время от времени копируются заново целиком (и всегда — по кнопке "Обновить").
+FULL_SYNC_INTERVAL_SEC = config.getint('cache', 'replica_full_sync_interval', fallback=60 * 60)
+# Версия схемы файла реплики (PRAGMA user_version): файл другой версии создаётся заново.
+# 2 — цены хранятся текстом, номер записи журнала вместо отпечатка таблицы.
+REPLICA_VERSION = 2
+
+# Таблица -> (первичный ключ, список столбцов)
+REPLICATED_TABLES = {
+    'doctor': ('doctorid', ['doctorid', 'specializationid', 'jobtitleid', 'priceid',
+                            'secondname', 'firstname', 'midname', 'phonenumber']),
+    'specialization': ('specializationid', ['specializationid', 'specializationname']),
+    'jobtitle': ('jobtitleid', ['jobtitleid', 'jobtitlename']),
+    'price': ('priceid', ['priceid', 'price']),
+}
+
+
+def replica_value(value):
+    """Значение для SQLite: numeric хранится текстом, чтобы цена читалась тем же Decimal без float"""
+    return str(value) if isinstance(value, Decimal) else value
+
+
+class LocalReplica:
+    def __init__(self, path=REPLICA_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.refresher = None
+        # Заполненная реплика пустой уже не станет: признак проверяется по файлу один раз,
+        # дальше его выставляет refresh
+        self.populated = False
+        self.create_schema()
+
+    def connect(self):
+        """Открытие соединения с локальной базой (отдельное для каждого потока)"""
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def create_schema(self):
+        """Создание таблиц реплики, если их ещё нет; файл прежней версии создаётся заново"""
+        try:
+            conn = self.connect()
+            with conn:
+                if conn.execute("PRAGMA user_version").fetchone()[0] != REPLICA_VERSION:
+                    for table in list(REPLICATED_TABLES) + ['replica_meta']:
+                        conn.execute(f"DROP TABLE IF EXISTS {table}")
+                    conn.execute(f"PRAGMA user_version = {REPLICA_VERSION}")
+                for table, (pk, columns) in REPLICATED_TABLES.items():
+                    column_defs = ", ".join(
+                        f"{column} INTEGER PRIMARY KEY" if column == pk else column for column in columns
+                    )
+                    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({column_defs})")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS replica_meta (
+                        tablename TEXT PRIMARY KEY,
+                        watermark INTEGER,
+                        full_sync_at REAL
+                    )
+                """)
+                count = conn.execute("SELECT COUNT(*) FROM replica_meta").fetchone()[0]
+            conn.close()
+            self.populated = count == len(REPLICATED_TABLES)
+        except Exception as e:
+            logging.error(f"Ошибка при создании локальной реплики: {str(e)}")
+
+    def is_populated(self):
+        """Реплика заполнена, если все таблицы хотя бы раз синхронизированы"""
+        return self.populated
+
+    def refresh(self, pg_conn, blocking=True, full=False):
+        """Синхронизация реплики по журналу изменений.
+
+        Таблица копируется целиком при первой синхронизации, раз в FULL_SYNC_INTERVAL_SEC,
+        с full=True и если изменений в журнале больше CHANGE_LIMIT; иначе заменяются только
+        строки, записанные в audit_log после сохранённого номера. Возвращает список обновлённых
+        таблиц. С blocking=False (вызов из окна) обновление пропускается, если реплику уже
+        обновляет фоновый поток.
+        """
+        changed = []
+        if not self.lock.acquire(blocking=blocking):
+            logging.debug("Локальная реплика уже обновляется, обновление пропущено")
+            return changed
+        try:
+            cursor = pg_conn.cursor()
+            conn = self.connect()
+            try:
+                meta = {table: (watermark, full_sync_at) for table, watermark, full_sync_at in conn.execute(
+                    "SELECT tablename, watermark, full_sync_at FROM replica_meta").fetchall()}
+                # Номер читается до строк: изменение, записанное после, попадёт в следующую синхронизацию
+                cursor.execute("SELECT COALESCE(MAX(auditid), 0) FROM audit_log")
+                latest = cursor.fetchone()[0]
+                now = time.time()
+                copy_tables = [
+                    table for table in REPLICATED_TABLES
+                    if full or table not in meta or now - meta[table][1] >= FULL_SYNC_INTERVAL_SEC
+                ]
+                behind = {table: meta[table][0] for table in REPLICATED_TABLES
+                          if table not in copy_tables and meta[table][0] < latest}
+                changes = {}
+                if behind:
+                    changes = fetch_changes(cursor, min(behind.values()), list(behind))
+                    if changes is None:
+                        copy_tables.extend(behind)
+                        changes = {}
+
+                for table in copy_tables:
+                    pk, columns = REPLICATED_TABLES[table]
+                    cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+                    self.store_rows(conn, table, cursor.fetchall(), latest, now)
+                    changed.append(table)
+                for table, watermark in behind.items():
+                    if table in copy_tables:
+                        continue
+                    row_ids = [int(row_id) for row_id in changes.get(table, ())]
+                    rows = None
+                    if row_ids:
+                        pk, columns = REPLICATED_TABLES[table]
+                        cursor.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE {pk} = ANY(%s)", (row_ids,))
+                        rows = cursor.fetchall()
+                        changed.append(table)
+                    self.store_rows(conn, table, rows, latest, row_ids=row_ids)
+                pg_conn.rollback()
+            except Exception:
+                # Соединение может принадлежать окну: оно не должно остаться в прерванной транзакции
+                try:
+                    pg_conn.rollback()
+                except Exception as e:
+                    logging.error(f"Не удалось откатить транзакцию после ошибки обновления реплики: {str(e)}")
+                raise
+            finally:
+                cursor.close()
+                conn.close()
+        finally:
+            self.lock.release()
+        # После успешной синхронизации в replica_meta есть все таблицы
+        self.populated = True
+        if changed:
+            logging.debug(f"Локальная реплика обновлена: {', '.join(changed)}")
+        return changed
+
+    @staticmethod
+    def store_rows(conn, table, rows, watermark, full_sync_at=None, row_ids=None):
+        """Запись строк таблицы в реплику одной транзакцией вместе с номером записи журнала.
+
+        С row_ids заменяются только эти строки (удалённые на сервере удаляются), иначе rows —
+        вся таблица; full_sync_at — время полной копии.
+        """
+        pk, columns = REPLICATED_TABLES[table]
+        placeholders = ", ".join("?" for _ in columns)
+        with conn:
+            if row_ids is None:
+                conn.execute(f"DELETE FROM {table}")
+            elif row_ids:
+                conn.execute(f"DELETE FROM {table} WHERE {pk} IN ({', '.join('?' for _ in row_ids)})", row_ids)
+            if rows:
+                conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                    [tuple(replica_value(value) for value in row) for row in rows]
+                )
+            if full_sync_at is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO replica_meta (tablename, watermark, full_sync_at) VALUES (?, ?, ?)",
+                    (table, watermark, full_sync_at)
+                )
+            else:
+                conn.execute("UPDATE replica_meta SET watermark = ? WHERE tablename = ?", (watermark, table))
+
+    def query(self, sql, params=()):
+        """Чтение из реплики; None, если реплика ещё не заполнена"""
+        if not self.is_populated():
+            return None
+        try:
+            conn = self.connect()
+            rows = conn.execute(sql, params).fetchall()
+            conn.close()
+            return rows
+        except Exception as e:
+            logging.error(f"Ошибка чтения локальной реплики: {str(e)}")
+            return None
+
+    def doctors(self):
+        return self.query("""
+            SELECT doctorid, secondname || ' ' || firstname || ' ' || COALESCE(midname, '') AS doctor_name
+            FROM doctor
+            ORDER BY secondname, firstname
+        """)
+
+    def doctor_prices(self):
+        rows = self.query("""
+            SELECT d.doctorid, p.price
+            FROM doctor d
+            LEFT JOIN price p ON d.priceid = p.priceid
+        """)
+        if rows is None:
+            return None
+        return {doctor_id: Decimal(price) if price is not None else None for doctor_id, price in rows}
+
+    def specializations(self):
+        return self.query("SELECT specializationid, specializationname FROM specialization ORDER BY specializationname")
+
+    def job_titles(self):
+        return self.query("SELECT jobtitleid, jobtitlename FROM jobtitle ORDER BY jobtitlename")
+
+    def start_background_refresh(self):
+        """Запуск фонового обновления реплики (повторный вызов ничего не делает)"""
+        if self.refresher is not None and self.refresher.isRunning():
+            return self.refresher
+        self.refresher = ReplicaRefresher(self)
+        self.refresher.start()
+        return self.refresher
+
+    def stop_background_refresh(self):
+        if self.refresher is not None:
+            self.refresher.stop()
+            self.refresher.wait()
+            self.refresher = None
+
+
+class ReplicaRefresher(QThread):
+    refreshed = pyqtSignal(list)
+
+    def __init__(self, replica, interval=REFRESH_INTERVAL_SEC):
+        super().__init__()
+        self.replica = replica
+        self.interval = interval
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+    def run(self):
+        pg_conn = None
+        while not self.stopped:
+            try:
+                if pg_conn is None or pg_conn.closed:
+                    pg_conn = open_connection()
+                changed = self.replica.refresh(pg_conn)
+                if changed:
+                    self.refreshed.emit(changed)
+            except Exception as e:
+                logging.warning(f"Не удалось обновить локальную реплику: {str(e)}")
+                if pg_conn is not None:
+                    try:
+                        pg_conn.close()
+                    except Exception:
+                        pass
+                    pg_conn = None
+            # Ожидание небольшими шагами, чтобы поток быстро останавливался
+            for _ in range(self.interval * 10):
+                if self.stopped:
+                    break
+                self.msleep(100)
+        if pg_conn is not None:
+            pg_conn.close()
+
+
+_replica = None
+
+
+def get_replica():
+    """Общий экземпляр реплики для всех окон приложения"""
+    global _replica
+    if _replica is None:
+        _replica = LocalReplica()
+    return _replica
@@ -0,0 +1,136 @@
+import os
+import copy
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from PyQt6.QtWidgets import QApplication
+
+from Config import config
+
+# Журнал приложения: записи из всех модулей (и из GUI-потока, и из фоновых) кладутся в очередь,
+# а в файл их пишет отдельный поток QueueListener, поэтому запись журнала не стоит GUI-времени.
+# Файл — JSON по строке на запись, с ротацией по размеру.
+LOG_FILE = config.get('logging', 'file', fallback=os.path.join('logs', 'medsys.log'))
+LOG_MAX_BYTES = config.getint('logging', 'max_bytes', fallback=5 * 1024 * 1024)
+LOG_BACKUP_COUNT = config.getint('logging', 'backup_count', fallback=5)
+LOG_LEVEL = config.get('logging', 'level', fallback='INFO')
+CONSOLE_LEVEL = config.get('logging', 'console_level', fallback='WARNING')
+# Уровень отдельного модуля: level_<модуль> = DEBUG (например, level_appointment)
+MODULE_LEVEL_PREFIX = 'level_'
+
+# Кто работает с приложением; задаётся после входа (set_log_context)
+log_context = {'user_id': None, 'role': None}
+
+_listener = None
+
+
+def set_log_context(**values):
+    log_context.update(values)
+
+
+def module_levels():
+    levels = {}
+    if config.has_section('logging'):
+        for key, value in config.items('logging'):
+            if key.startswith(MODULE_LEVEL_PREFIX):
+                levels[key[len(MODULE_LEVEL_PREFIX):]] = logging.getLevelName(value.upper())
+    return levels
+
+
+class ContextFilter(logging.Filter):
+    """Уровни по модулям и поля user_id/role/window в каждой записи.
+
+    Модули пишут через корневой логгер (logging.debug(...)), поэтому модуль
+    определяется по имени файла (record.module).
+    """
+
+    def __init__(self, default_level, levels):
+        super().__init__()
+        self.default_level = default_level
+        self.levels = levels
+
+    def filter(self, record):
+        if record.levelno < self.levels.get(record.module.lower(), self.default_level):
+            return False
+        record.user_id = log_context['user_id']
+        record.role = log_context['role']
+        record.window = None
+        if threading.current_thread() is threading.main_thread():
+            window = QApplication.activeWindow()
+            if window is not None:
+                record.window = type(window).__name__
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """В очередь попадает готовый текст сообщения; трассировка исключения — отдельным полем"""
+
+    def prepare(self, record):
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+            'user_id': getattr(record, 'user_id', None),
+            'role': getattr(record, 'role', None),
+            'window': getattr(record, 'window', None),
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging():
+    """Настройка журнала; вызывается один раз в точке входа, до создания окон"""
+    global _listener
+    if _listener is not None:
+        return
+
+    default_level = logging.getLevelName(LOG_LEVEL.upper())
+    levels = module_levels()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    # Корневой уровень — самый подробный из настроенных: более подробные вызовы
+    # отбрасываются сразу в logging.debug(), не создавая записи
+    root.setLevel(min([default_level] + list(levels.values())))
+
+    log_dir = os.path.dirname(LOG_FILE)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES,
+                                       backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.getLevelName(CONSOLE_LEVEL.upper()))
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(module)s - %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter(default_level, levels))
+    root.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    # Записи, оставшиеся в очереди, дописываются при выходе
+    atexit.register(_listener.stop)
@@ -6,16 +6,18 @@ from PyQt6.QtWidgets import (
     QDateEdit, QComboBox
 )
 from PyQt6.QtCore import Qt, QDate
-from PyQt6.QtGui import QColor, QPalette, QIcon
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme, set_variant, VARIANT_FORM
+from LogConfig import setup_logging, set_log_context
 import psycopg2
+from Database import connect, set_session_actor
 import uuid
 
 from Admin import MainApp as AdminApp
 from ClientApp import ClientApp
 from EmployeeApp import MainApp as EmployeeApp
-
-# Настройка логирования
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+from LocalReplica import get_replica
+from OfflineQueue import stop_offline_queue
 
 class ChangePasswordDialog(QDialog):
     def __init__(self, parent=None):
@@ -29,38 +31,8 @@ class ChangePasswordDialog(QDialog):
         self.med_light = QColor(229, 243, 255)
         self.med_white = QColor(255, 255, 255)
 
-        # Стили
-        self.setStyleSheet(f"""
-            QDialog {{
-                background-color: {self.med_light.name()};
-            }}
-            QLineEdit {{
-                border: 1px solid #006DB0;
-                border-radius: 4px;
-                padding: 8px;
-                font-size: 14px;
-                min-width: 200px;
-                background-color: white;
-            }}
-            QPushButton {{
-                background-color: #006DB0;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 10px;
-                font-size: 14px;
-            }}
-            QPushButton:hover {{
-                background-color: #005A9C;
-            }}
-            QPushButton:pressed {{
-                background-color: #004080;
-            }}
-            QLabel {{
-                font-size: 14px;
-                color: #006DB0;
-            }}
-        """)
+        # Оформление задаётся темой приложения (Theme.py)
+        set_variant(self, VARIANT_FORM)
 
         # Основной layout
         layout = QFormLayout(self)
@@ -166,38 +138,8 @@ class MedicalCardDialog(QDialog):
         self.med_light = QColor(229, 243, 255)
         self.med_white = QColor(255, 255, 255)
 
-        # Стили
-        self.setStyleSheet(f"""
-            QDialog {{
-                background-color: {self.med_light.name()};
-            }}
-            QLineEdit, QDateEdit, QComboBox {{
-                border: 1px solid #006DB0;
-                border-radius: 4px;
-                padding: 8px;
-                font-size: 14px;
-                min-width: 200px;
-                background-color: white;
-            }}
-            QPushButton {{
-                background-color: #006DB0;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 10px;
-                font-size: 14px;
-            }}
-            QPushButton:hover {{
-                background-color: #005A9C;
-            }}
-            QPushButton:pressed {{
-                background-color: #004080;
-            }}
-            QLabel {{
-                font-size: 14px;
-                color: #006DB0;
-            }}
-        """)
+        # Оформление задаётся темой приложения (Theme.py)
+        set_variant(self, VARIANT_FORM)
 
         # Основной layout
         layout = QFormLayout(self)
@@ -291,38 +233,8 @@ class FirstLoginDialog(QDialog):
         self.med_light = QColor(229, 243, 255)
         self.med_white = QColor(255, 255, 255)
 
-        # Стили
-        self.setStyleSheet(f"""
-            QDialog {{
-                background-color: {self.med_light.name()};
-            }}
-            QLineEdit, QDateEdit, QComboBox {{
-                border: 1px solid #006DB0;
-                border-radius: 4px;
-                padding: 8px;
-                font-size: 14px;
-                min-width: 200px;
-                background-color: white;
-            }}
-            QPushButton {{
-                background-color: #006DB0;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 10px;
-                font-size: 14px;
-            }}
-            QPushButton:hover {{
-                background-color: #005A9C;
-            }}
-            QPushButton:pressed {{
-                background-color: #004080;
-            }}
-            QLabel {{
-                font-size: 14px;
-                color: #006DB0;
-            }}
-        """)
+        # Оформление задаётся темой приложения (Theme.py)
+        set_variant(self, VARIANT_FORM)
 
         # Основной layout
         layout = QFormLayout(self)
@@ -449,20 +361,6 @@ class RegisterWindow(QDialog):
         self.med_light = QColor(229, 243, 255)
         self.med_white = QColor(255, 255, 255)
 
-        # Установка стиля окна
-        self.setStyleSheet(f"""
-            QDialog {{
-                background-color: {self.med_light.name()};
-            }}
-        """)
-
-        # Настройка цветовой палитры
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Window, self.med_light)
-        palette.setColor(QPalette.ColorRole.Base, self.med_white)
-        palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-        self.setPalette(palette)
-
         # Основной layout
         layout = QFormLayout(self)
         layout.setContentsMargins(40, 40, 40, 40)
@@ -569,6 +467,10 @@ class RegisterWindow(QDialog):
             QMessageBox.warning(self, "Ошибка", "Пожалуйста, введите логин и пароль")
             return
 
+        # Соединение окна входа проверяется и при необходимости восстанавливается перед каждым запросом
+        if not self.parent().ensure_connection():
+            return
+
         try:
             # Проверка, существует ли пользователь с таким логином
             cursor = self.parent().cursor
@@ -594,6 +496,9 @@ class LoginWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         logging.debug("Инициализация LoginWindow")
+        # Окно входа открывается и при выходе из системы: журнал больше не относится к пользователю
+        set_log_context(user_id=None, role=None)
+        set_session_actor(None, None)
         self.setWindowTitle("Медицинская информационная система - Авторизация")
         self.setFixedSize(400, 350)
         self.setWindowIcon(QIcon("icon.jpg"))
@@ -603,20 +508,6 @@ class LoginWindow(QMainWindow):
         self.med_light = QColor(229, 243, 255)
         self.med_white = QColor(255, 255, 255)
 
-        # Установка стиля окна
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {self.med_light.name()};
-            }}
-        """)
-
-        # Настройка цветовой палитры
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Window, self.med_light)
-        palette.setColor(QPalette.ColorRole.Base, self.med_white)
-        palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-        self.setPalette(palette)
-
         # Центральный виджет
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -753,22 +644,31 @@ class LoginWindow(QMainWindow):
         self.cursor = None
         self.connect_to_db()
 
+        # Фоновое обновление локальной реплики справочников
+        get_replica().start_background_refresh()
+
         # Установка фокуса на поле логина
         self.login_input.setFocus()
 
     def connect_to_db(self):
         logging.debug("Попытка подключения к базе данных в LoginWindow")
         try:
-            self.conn = psycopg2.connect(
-                dbname='Practice',
-                user='postgres',
-                password='123',
-                host='localhost'
-            )
+            self.conn = connect()
             self.cursor = self.conn.cursor()
             logging.debug("Подключение к базе данных успешно")
         except psycopg2.Error as e:
             logging.error(f"Ошибка подключения к БД: {str(e)}")
+            if get_replica().is_populated():
+                # Справочники доступны из локальной реплики, окно не закрываем
+                self.conn = None
+                self.cursor = None
+                QMessageBox.warning(
+                    self,
+                    "Нет связи с сервером",
+                    f"Не удалось подключиться к БД: {str(e)}\n"
+                    "Вход станет доступен после восстановления соединения."
+                )
+                return
             QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {str(e)}")
             sys.exit(1)
         except Exception as e:
@@ -776,8 +676,16 @@ class LoginWindow(QMainWindow):
             QMessageBox.critical(self, "Критическая ошибка", f"Неожиданная ошибка: {str(e)}")
             sys.exit(1)
 
+    def ensure_connection(self):
+        """Повторное подключение, если окно было открыто без связи с сервером"""
+        if self.conn is None or self.conn.closed:
+            self.connect_to_db()
+        return self.conn is not None
+
     def open_register_window(self):
         logging.debug("Открытие окна регистрации")
+        if not self.ensure_connection():
+            return
         register_dialog = RegisterWindow(self)
         if register_dialog.exec():
             self.login_input.clear()
@@ -790,6 +698,8 @@ class LoginWindow(QMainWindow):
         if not self.login_input.text().strip():
             QMessageBox.warning(self, "Ошибка", "Введите логин перед сменой пароля")
             return
+        if not self.ensure_connection():
+            return
         change_password_dialog = ChangePasswordDialog(self)
         if change_password_dialog.exec():
             self.login_input.clear()
@@ -805,6 +715,9 @@ class LoginWindow(QMainWindow):
             QMessageBox.warning(self, "Ошибка", "Пожалуйста, введите логин и пароль")
             return
 
+        if not self.ensure_connection():
+            return
+
         try:
             # Проверяем, существует ли пользователь
             self.cursor.execute(
@@ -907,7 +820,9 @@ class LoginWindow(QMainWindow):
                             self.password_input.setFocus()
                             return  # Пользователь отменил создание медицинской карты
 
-            logging.debug(f"Авторизация успешна: user_id={user_id}, role={role}")
+            set_log_context(user_id=user_id, role=role)
+            set_session_actor(user_id, role)
+            logging.info(f"Авторизация успешна: user_id={user_id}, role={role}")
             QMessageBox.information(self, "Успех", f"Авторизация прошла успешно!")
             self.close()
 
@@ -944,8 +859,12 @@ class LoginWindow(QMainWindow):
         event.accept()
 
 if __name__ == "__main__":
+    setup_logging()
     app = QApplication(sys.argv)
+    apply_theme(app)
     app.setStyle("Fusion")
+    app.aboutToQuit.connect(get_replica().stop_background_refresh)
+    app.aboutToQuit.connect(stop_offline_queue)
     window = LoginWindow()
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
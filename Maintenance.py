@@ -0,0 +1,77 @@
+import sys
+import logging
+import argparse
+
+from Database import open_connection
+from LogConfig import setup_logging
+from Migrations import apply_migrations
+from Partitions import maintain_partitions
+
+# Обслуживание базы вне клиентских окон: миграции схемы, секции приёмов, показатели аналитики.
+# Миграции переписывают таблицы под блокировкой, поэтому запускаются администратором
+# один раз в окно обслуживания (python Maintenance.py migrate), а секции и показатели — регулярно
+# по расписанию (cron, планировщик заданий): python Maintenance.py partitions stats.
+
+# Материализованные представления из миграции 003_appointment_stats_views (окно Analytics.py)
+STATS_VIEWS = ['appointment_daily_stats', 'appointment_monthly_stats']
+
+
+def run_migrate(conn):
+    failed = apply_migrations(conn)
+    if failed:
+        logging.error(f"Миграции не применены: {', '.join(failed)}")
+    return not failed
+
+
+def run_partitions(conn):
+    return maintain_partitions(conn)
+
+
+def run_stats(conn):
+    """Пересчёт представлений аналитики без блокировки чтения"""
+    cursor = conn.cursor()
+    try:
+        # Пересчёт по всем приёмам дольше обычного statement_timeout (см. Config.py)
+        cursor.execute("SET LOCAL statement_timeout = 0")
+        for view in STATS_VIEWS:
+            cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+        conn.commit()
+        logging.info("Представления аналитики пересчитаны")
+        return True
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Ошибка при пересчёте аналитики: {str(e)}")
+        return False
+    finally:
+        cursor.close()
+
+
+COMMANDS = {
+    'migrate': run_migrate,
+    'partitions': run_partitions,
+    'stats': run_stats,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обслуживание базы данных медсистемы")
+    parser.add_argument('commands', nargs='+', choices=sorted(COMMANDS) + ['all'],
+                        help="migrate — миграции схемы, partitions — секции приёмов, stats — показатели аналитики, "
+                             "all — всё по порядку")
+    args = parser.parse_args(argv)
+    commands = list(COMMANDS) if 'all' in args.commands else args.commands
+
+    conn = open_connection()
+    ok = True
+    try:
+        for command in commands:
+            logging.info(f"Обслуживание: {command}")
+            ok = COMMANDS[command](conn) and ok
+    finally:
+        conn.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(main())
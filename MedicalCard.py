@@ -1,5 +1,5 @@
 import sys
-import psycopg2
+from Database import connect
 import logging
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout,
@@ -9,7 +9,10 @@ from PyQt6.QtWidgets import (
     QDateEdit, QCheckBox
 )
 from PyQt6.QtCore import Qt, QDate
-from PyQt6.QtGui import QColor, QPalette, QIcon
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme, set_variant, VARIANT_GRID_COMPACT
+from LogConfig import setup_logging
+from Formatting import format_date
 try:
     from Appointment import AppointmentsApp
 except ImportError as e:
@@ -17,10 +20,9 @@ except ImportError as e:
     QMessageBox.critical(None, "Ошибка импорта", f"Не удалось импортировать AppointmentsApp: {str(e)}")
     sys.exit(1)
 
-# Настройка логирования
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filename='medical_card_app.log')
-
 class MedicalCardApp(QMainWindow):
+    CHANGE_TABLES = ("medicalcard", "patient")
+
     def __init__(self, user_id=None, role=None):
         super().__init__()
         self.user_id = user_id
@@ -42,64 +44,6 @@ class MedicalCardApp(QMainWindow):
         self.med_white = QColor(255, 255, 255)
         self.med_red = QColor(200, 16, 46)
 
-        # Установка стиля приложения
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {self.med_light.name()};
-            }}
-            QTableWidget {{
-                background-color: {self.med_white.name()};
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                gridline-color: #d1d8e0;
-                font-size: 14px;
-            }}
-            QTableWidget::item {{
-                padding: 8px;
-            }}
-            QHeaderView::section {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                padding: 8px;
-                border: none;
-                font-weight: bold;
-            }}
-            QPushButton {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px 15px;
-                font-size: 14px;
-                min-width: 100px;
-            }}
-            QPushButton:hover {{
-                background-color: {self.med_blue.darker(110).name()};
-            }}
-            QPushButton:pressed {{
-                background-color: {self.med_blue.darker(120).name()};
-            }}
-            QPushButton:disabled {{
-                background-color: #cccccc;
-            }}
-            QLineEdit, QComboBox, QDateEdit {{
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-                max-width: 300px;
-            }}
-            QDialog {{
-                background-color: {self.med_light.name()};
-            }}
-        """)
-
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Window, self.med_light)
-        palette.setColor(QPalette.ColorRole.Base, self.med_white)
-        palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-        self.setPalette(palette)
-
         self.conn = None
         self.cursor = None
         self.patient_id = None
@@ -111,12 +55,7 @@ class MedicalCardApp(QMainWindow):
     def connect_to_db(self):
         logging.debug("Попытка подключения к базе данных")
         try:
-            self.conn = psycopg2.connect(
-                dbname='Practice',
-                user='postgres',
-                password='123',
-                host='localhost'
-            )
+            self.conn = connect()
             self.cursor = self.conn.cursor()
             logging.debug("Подключение к базе данных успешно")
         except Exception as e:
@@ -162,14 +101,7 @@ class MedicalCardApp(QMainWindow):
         layout.setSpacing(15)
 
         title_label = QLabel("Медицинские карты пациентов" if self.role != "Пользователь" else "Мои медицинские карты")
-        title_label.setStyleSheet(f"""
-            QLabel {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {self.med_blue.name()};
-                padding: 10px;
-            }}
-        """)
+        title_label.setObjectName("title")
         layout.addWidget(title_label)
 
         btn_layout = QHBoxLayout()
@@ -206,21 +138,7 @@ class MedicalCardApp(QMainWindow):
         self.table.setColumnHidden(4, True)
 
         self.table.setShowGrid(True)
-        self.table.setStyleSheet("""
-            QTableWidget {
-                gridline-color: #c0c0c0;
-                border: 1px solid #c0c0c0;
-            }
-            QHeaderView::section {
-                border: 1px solid #c0c0c0;
-                padding: 5px;
-            }
-            QTableWidget::item {
-                border-right: 1px solid #c0c0c0;
-                border-bottom: 1px solid #c0c0c0;
-                padding: 5px;
-            }
-        """)
+        set_variant(self.table, VARIANT_GRID_COMPACT)
 
         header = self.table.horizontalHeader()
         header.setDefaultSectionSize(200)
@@ -232,11 +150,6 @@ class MedicalCardApp(QMainWindow):
 
         self.table.verticalHeader().setVisible(False)
         self.table.setAlternatingRowColors(True)
-        self.table.setStyleSheet("""
-            QTableWidget {
-                alternate-background-color: #f5f5f5;
-            }
-        """)
 
         layout.addLayout(btn_layout)
         layout.addWidget(self.table)
@@ -289,7 +202,7 @@ class MedicalCardApp(QMainWindow):
             for row_idx, row in enumerate(data):
                 for col_idx, value in enumerate(row):
                     if (col_idx == 1 or col_idx == 2) and value is not None:
-                        formatted_value = value.strftime("%d.%m.%Y")
+                        formatted_value = format_date(value)
                     else:
                         formatted_value = str(value) if value is not None else ""
                     item = QTableWidgetItem(formatted_value)
@@ -582,7 +495,9 @@ class MedicalCardApp(QMainWindow):
         event.accept()
 
 if __name__ == "__main__":
+    setup_logging()
     app = QApplication(sys.argv)
+    apply_theme(app)
     app.setStyle("Fusion")
     window = MedicalCardApp(user_id=None, role="Администратор")
     window.show()
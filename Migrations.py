@@ -0,0 +1,495 @@
+import logging
+
+
+def stats_view_statements(source):
+    """Материализованные представления для окна аналитики (Analytics.py) над таблицей или представлением source"""
+    return [
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS appointment_daily_stats AS
+        SELECT a.appointmentdate AS day,
+               COALESCE(a.doctorid, 0) AS doctorid,
+               COUNT(*) AS total_count,
+               COUNT(*) FILTER (WHERE a.status = 'Завершён') AS completed_count,
+               COUNT(*) FILTER (WHERE a.status = 'Отменён') AS cancelled_count,
+               COALESCE(SUM(a.appointmentprice) FILTER (WHERE a.status = 'Завершён'), 0) AS revenue,
+               COALESCE(SUM(a.appointmentprice) FILTER (WHERE a.status = 'Назначен'), 0) AS expected_revenue,
+               COALESCE(SUM(EXTRACT(EPOCH FROM (a.endtime - a.starttime)) / 60)
+                        FILTER (WHERE a.status != 'Отменён'), 0) AS booked_minutes
+        FROM {source} a
+        GROUP BY a.appointmentdate, COALESCE(a.doctorid, 0)
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS appointment_daily_stats_key
+            ON appointment_daily_stats (day, doctorid)
+        """,
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS appointment_monthly_stats AS
+        SELECT date_trunc('month', a.appointmentdate)::date AS month,
+               COALESCE(a.doctorid, 0) AS doctorid,
+               COUNT(*) AS total_count,
+               COUNT(*) FILTER (WHERE a.status = 'Завершён') AS completed_count,
+               COUNT(*) FILTER (WHERE a.status = 'Отменён') AS cancelled_count,
+               COALESCE(SUM(a.appointmentprice) FILTER (WHERE a.status = 'Завершён'), 0) AS revenue,
+               COALESCE(SUM(a.appointmentprice) FILTER (WHERE a.status = 'Назначен'), 0) AS expected_revenue,
+               COALESCE(SUM(EXTRACT(EPOCH FROM (a.endtime - a.starttime)) / 60)
+                        FILTER (WHERE a.status != 'Отменён'), 0) AS booked_minutes,
+               COUNT(DISTINCT a.appointmentdate) FILTER (WHERE a.status != 'Отменён') AS working_days
+        FROM {source} a
+        GROUP BY date_trunc('month', a.appointmentdate)::date, COALESCE(a.doctorid, 0)
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS appointment_monthly_stats_key
+            ON appointment_monthly_stats (month, doctorid)
+        """,
+    ]
+
+
+def waitlist_appointment_fk_statements():
+    """Ссылка листа ожидания на секционированную appointment: составной ключ (appointmentid, appointmentdate)"""
+    return [
+        "ALTER TABLE waitlist ADD COLUMN IF NOT EXISTS appointmentdate DATE",
+        """
+        UPDATE waitlist w SET appointmentdate = a.appointmentdate
+        FROM appointment a
+        WHERE a.appointmentid = w.appointmentid AND w.appointmentdate IS NULL
+        """,
+        # Приёмы, удалённые, пока ключа не было, — ссылка на них снимается, как сделал бы ON DELETE SET NULL
+        "UPDATE waitlist SET appointmentid = NULL WHERE appointmentid IS NOT NULL AND appointmentdate IS NULL",
+        """
+        DO $$
+        BEGIN
+            IF (SELECT relkind FROM pg_class WHERE oid = 'appointment'::regclass) = 'p'
+               AND NOT EXISTS (SELECT 1 FROM pg_constraint
+                               WHERE conrelid = 'waitlist'::regclass AND conname = 'waitlist_appointment_fkey') THEN
+                ALTER TABLE waitlist ADD CONSTRAINT waitlist_appointment_fkey
+                    FOREIGN KEY (appointmentid, appointmentdate)
+                    REFERENCES appointment (appointmentid, appointmentdate) ON DELETE SET NULL;
+            END IF;
+        END
+        $$
+        """,
+    ]
+
+
+# Таблицы под аудитом: (таблица, первичный ключ, столбцы, которые не пишутся в журнал).
+# Изменение только скрытых столбцов (например, счётчика неудачных входов) не записывается.
+AUDITED_TABLES = [
+    ("appointment", "appointmentid", []),
+    ("patient", "patientid", []),
+    ("medicalcard", "medicalcardid", []),
+    ("users", "userid", ["password", "failedattempts"]),
+    ("price", "priceid", []),
+    ("doctor", "doctorid", []),
+    ("diagnosis", "diagnosisid", []),
+    ("jobtitle", "jobtitleid", []),
+    ("specialization", "specializationid", []),
+    ("waitlist", "waitlistid", []),
+]
+
+
+def audit_trigger_statements():
+    """Триггеры audit_row на таблицах AUDITED_TABLES (см. миграцию 007_audit_log)"""
+    statements = []
+    for table, key, hidden in AUDITED_TABLES:
+        args = ", ".join(f"'{value}'" for value in [table, key] + hidden)
+        statements.append(f"DROP TRIGGER IF EXISTS {table}_audit ON {table}")
+        statements.append(f"""
+        CREATE TRIGGER {table}_audit
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION audit_row({args})
+        """)
+    return statements
+
+
+# Изменения схемы базы данных, которые нужны приложению (индексы, служебные таблицы).
+# Каждая миграция применяется один раз; применённые записываются в schema_migrations.
+# Новые миграции добавляются только в конец списка.
+MIGRATIONS = [
+    ("001_patient_trigram_search", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        """
+        CREATE INDEX IF NOT EXISTS patient_search_trgm_idx ON patient USING gin (
+            (lastname || ' ' || firstname || ' ' || COALESCE(midname, '') || ' ' || COALESCE(phonenumber::text, ''))
+            gin_trgm_ops
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS patient_name_order_idx
+            ON patient (lastname, firstname, COALESCE(midname, ''), patientid)
+        """,
+    ]),
+    ("002_diagnosis_fulltext_search", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        """
+        CREATE INDEX IF NOT EXISTS diagnosis_name_fts_idx
+            ON diagnosis USING gin (to_tsvector('russian', diagnosisname))
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS diagnosis_name_trgm_idx
+            ON diagnosis USING gin (diagnosisname gin_trgm_ops)
+        """,
+    ]),
+    # Предрасчитанные показатели для окна аналитики (Analytics.py). Врач без id попадает в группу 0,
+    # чтобы уникальный индекс покрывал все строки — он нужен для REFRESH ... CONCURRENTLY.
+    ("003_appointment_stats_views", stats_view_statements("appointment")),
+    # Поиск свободных слотов и проверка пересечений идут по врачу и дате
+    ("004_appointment_doctor_date_index", [
+        """
+        CREATE INDEX IF NOT EXISTS appointment_doctor_date_idx
+            ON appointment (doctorid, appointmentdate)
+        """,
+    ]),
+    # Лист ожидания (Waitlist.py): пациент ждёт приёма у конкретного врача или у любого врача специализации
+    ("005_waitlist", [
+        """
+        CREATE TABLE IF NOT EXISTS waitlist (
+            waitlistid SERIAL PRIMARY KEY,
+            patientid INTEGER NOT NULL REFERENCES patient (patientid) ON DELETE CASCADE,
+            doctorid INTEGER REFERENCES doctor (doctorid) ON DELETE CASCADE,
+            specializationid INTEGER REFERENCES specialization (specializationid) ON DELETE CASCADE,
+            datefrom DATE NOT NULL,
+            dateto DATE NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            status VARCHAR(20) NOT NULL DEFAULT 'Ожидает',
+            appointmentid INTEGER REFERENCES appointment (appointmentid) ON DELETE SET NULL,
+            createdat TIMESTAMP NOT NULL DEFAULT now(),
+            CHECK (doctorid IS NOT NULL OR specializationid IS NOT NULL),
+            CHECK (datefrom <= dateto)
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS waitlist_doctor_match_idx
+            ON waitlist (doctorid, priority DESC, createdat)
+            WHERE status = 'Ожидает' AND doctorid IS NOT NULL
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS waitlist_specialization_match_idx
+            ON waitlist (specializationid, priority DESC, createdat)
+            WHERE status = 'Ожидает' AND doctorid IS NULL
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS appointment_patient_date_idx
+            ON appointment (patientid, appointmentdate)
+        """,
+    ]),
+    # Помесячное секционирование приёмов (см. Partitions.py). Старые секции переносятся
+    # в appointment_archive; appointment_all объединяет рабочую таблицу и архив.
+    # Первичный ключ секционированной таблицы обязан включать appointmentdate, поэтому ссылка
+    # листа ожидания переводится на (appointmentid, appointmentdate). Другие внешние ключи на appointment,
+    # уникальные индексы без appointmentdate и appointmentid как identity не переносятся:
+    # миграция останавливается с ошибкой, и схему нужно подготовить вручную.
+    # Миграции применяются командой Maintenance.py в окно обслуживания (таблица переписывается под блокировкой).
+    ("006_appointment_partitioning", [
+        """
+        CREATE OR REPLACE FUNCTION appointment_ensure_partition(month_start date) RETURNS void AS $$
+        DECLARE
+            part text := format('appointment_p%s', to_char(month_start, 'YYYY_MM'));
+            month_end date := (month_start + interval '1 month')::date;
+        BEGIN
+            IF to_regclass(part) IS NOT NULL THEN
+                RETURN;
+            END IF;
+            EXECUTE format('CREATE TABLE %I (LIKE appointment INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part);
+            -- Приёмы этого месяца, попавшие в секцию по умолчанию, переезжают в новую секцию
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM appointment_default '
+                'WHERE appointmentdate >= %L AND appointmentdate < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                month_start, month_end, part
+            );
+            EXECUTE format('ALTER TABLE appointment ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                           part, month_start, month_end);
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        # Представления статистики зависят от appointment и мешают удалить старую таблицу
+        "DROP MATERIALIZED VIEW IF EXISTS appointment_daily_stats",
+        "DROP MATERIALIZED VIEW IF EXISTS appointment_monthly_stats",
+        """
+        DO $$
+        DECLARE
+            seq text := pg_get_serial_sequence('appointment', 'appointmentid');
+            pkey text;
+            fk record;
+            indexes text[];
+            idx text;
+            part_month date;
+        BEGIN
+            IF (SELECT relkind FROM pg_class WHERE oid = 'appointment'::regclass) = 'p' THEN
+                RETURN;
+            END IF;
+
+            IF EXISTS (SELECT 1 FROM pg_attribute WHERE attrelid = 'appointment'::regclass
+                       AND attname = 'appointmentid' AND attidentity <> '') THEN
+                RAISE EXCEPTION 'appointment.appointmentid — identity-столбец; секционирование рассчитано на SERIAL';
+            END IF;
+            SELECT string_agg(format('%s.%s', conrelid::regclass, conname), ', ') INTO idx
+            FROM pg_constraint
+            WHERE confrelid = 'appointment'::regclass AND contype = 'f' AND conrelid <> 'waitlist'::regclass;
+            IF idx IS NOT NULL THEN
+                RAISE EXCEPTION 'На appointment ссылаются внешние ключи (%), их нужно перевести на (appointmentid, appointmentdate)', idx;
+            END IF;
+            SELECT string_agg(c.relname, ', ') INTO idx
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = 'appointment'::regclass AND i.indisunique AND NOT i.indisprimary
+              AND NOT EXISTS (SELECT 1 FROM pg_attribute a WHERE a.attrelid = i.indrelid
+                              AND a.attnum = ANY (i.indkey) AND a.attname = 'appointmentdate');
+            IF idx IS NOT NULL THEN
+                RAISE EXCEPTION 'Уникальные индексы appointment без appointmentdate (%) нельзя перенести на секции', idx;
+            END IF;
+
+            -- Ссылка листа ожидания восстанавливается составным ключом (waitlist_appointment_fk_statements)
+            FOR fk IN SELECT conname, conrelid::regclass AS tbl FROM pg_constraint
+                      WHERE confrelid = 'appointment'::regclass AND contype = 'f' LOOP
+                EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', fk.tbl, fk.conname);
+            END LOOP;
+
+            -- Индексы (уникальные — только с appointmentdate) пересоздаются на новой таблице и наследуются секциями
+            SELECT array_agg(pg_get_indexdef(i.indexrelid)) INTO indexes
+            FROM pg_index i
+            WHERE i.indrelid = 'appointment'::regclass AND NOT i.indisprimary;
+
+            IF seq IS NOT NULL THEN
+                EXECUTE format('ALTER SEQUENCE %s OWNED BY NONE', seq);
+            END IF;
+            ALTER TABLE appointment RENAME TO appointment_legacy;
+            SELECT conname INTO pkey FROM pg_constraint
+            WHERE conrelid = 'appointment_legacy'::regclass AND contype = 'p';
+            IF pkey IS NOT NULL THEN
+                EXECUTE format('ALTER TABLE appointment_legacy RENAME CONSTRAINT %I TO appointment_legacy_pkey', pkey);
+            END IF;
+
+            CREATE TABLE appointment (
+                LIKE appointment_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+                PRIMARY KEY (appointmentid, appointmentdate)
+            ) PARTITION BY RANGE (appointmentdate);
+
+            FOR fk IN SELECT conname, pg_get_constraintdef(oid) AS def FROM pg_constraint
+                      WHERE conrelid = 'appointment_legacy'::regclass AND contype = 'f' LOOP
+                EXECUTE format('ALTER TABLE appointment ADD CONSTRAINT %I %s', fk.conname, fk.def);
+            END LOOP;
+
+            CREATE TABLE appointment_default PARTITION OF appointment DEFAULT;
+            part_month := COALESCE(
+                (SELECT date_trunc('month', min(appointmentdate))::date FROM appointment_legacy),
+                date_trunc('month', current_date)::date
+            );
+            WHILE part_month <= date_trunc('month', current_date) + interval '3 months' LOOP
+                PERFORM appointment_ensure_partition(part_month);
+                part_month := (part_month + interval '1 month')::date;
+            END LOOP;
+
+            INSERT INTO appointment SELECT * FROM appointment_legacy;
+            IF seq IS NOT NULL THEN
+                EXECUTE format('ALTER SEQUENCE %s OWNED BY appointment.appointmentid', seq);
+            END IF;
+            DROP TABLE appointment_legacy;
+
+            FOREACH idx IN ARRAY COALESCE(indexes, ARRAY[]::text[]) LOOP
+                EXECUTE idx;
+            END LOOP;
+        END
+        $$
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS appointment_archive (LIKE appointment INCLUDING CONSTRAINTS)
+            PARTITION BY RANGE (appointmentdate)
+        """,
+        """
+        CREATE OR REPLACE VIEW appointment_all AS
+        SELECT * FROM appointment
+        UNION ALL
+        SELECT * FROM appointment_archive
+        """,
+    ] + waitlist_appointment_fk_statements() + stats_view_statements("appointment_all")),
+    # Журнал аудита (Audit.py): каждое изменение строк пишется триггером в той же транзакции,
+    # поэтому аудит не добавляет запросов от клиента. Кто изменил — параметры сеанса
+    # medsys.user_id и medsys.role (Database.set_session_actor); medsys.audit = 'off' отключает запись
+    # для служебных операций (перенос строк между секциями в Partitions.py, см. 010_audit_off_privilege).
+    ("007_audit_log", [
+        """
+        CREATE TABLE IF NOT EXISTS audit_log (
+            auditid BIGSERIAL PRIMARY KEY,
+            changedat TIMESTAMPTZ NOT NULL DEFAULT now(),
+            userid INTEGER,
+            role VARCHAR(50),
+            tablename VARCHAR(50) NOT NULL,
+            operation VARCHAR(10) NOT NULL,
+            rowid TEXT,
+            olddata JSONB,
+            newdata JSONB
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS audit_log_changed_idx ON audit_log (changedat)",
+        "CREATE INDEX IF NOT EXISTS audit_log_row_idx ON audit_log (tablename, rowid, auditid)",
+        "CREATE INDEX IF NOT EXISTS audit_log_user_idx ON audit_log (userid, auditid)",
+        """
+        CREATE OR REPLACE FUNCTION audit_log_append_only() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'Записи журнала аудита нельзя изменять или удалять';
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS audit_log_append_only ON audit_log",
+        """
+        CREATE TRIGGER audit_log_append_only
+            BEFORE UPDATE OR DELETE OR TRUNCATE ON audit_log
+            FOR EACH STATEMENT EXECUTE FUNCTION audit_log_append_only()
+        """,
+        """
+        CREATE OR REPLACE FUNCTION audit_row() RETURNS trigger AS $$
+        DECLARE
+            -- TG_ARGV: имя таблицы, первичный ключ, затем скрытые столбцы
+            hidden text[] := COALESCE(TG_ARGV[2:TG_NARGS - 1], ARRAY[]::text[]);
+            old_row jsonb;
+            new_row jsonb;
+        BEGIN
+            IF current_setting('medsys.audit', true) = 'off' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP <> 'INSERT' THEN
+                old_row := to_jsonb(OLD) - hidden;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                new_row := to_jsonb(NEW) - hidden;
+            END IF;
+            IF TG_OP = 'UPDATE' AND old_row = new_row THEN
+                RETURN NULL;
+            END IF;
+            INSERT INTO audit_log (userid, role, tablename, operation, rowid, olddata, newdata)
+            VALUES (
+                NULLIF(current_setting('medsys.user_id', true), '')::integer,
+                NULLIF(current_setting('medsys.role', true), ''),
+                TG_ARGV[0], TG_OP, COALESCE(new_row, old_row) ->> TG_ARGV[1], old_row, new_row
+            );
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+    ] + audit_trigger_statements()),
+    # Ключи операций офлайн-очереди (OfflineQueue.py), уже применённых на сервере. Ключ пишется
+    # в той же транзакции, что и сама операция, поэтому повторное воспроизведение после сбоя
+    # между коммитом и очисткой локальной очереди её пропускает.
+    ("008_offline_applied", [
+        """
+        CREATE TABLE IF NOT EXISTS offline_applied (
+            operationkey UUID PRIMARY KEY,
+            appliedat TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+    ]),
+    # Базы, секционированные прежней версией 006: ссылка листа ожидания на приём восстанавливается.
+    # Месяцы, перенесённые в архив, не принимают новых приёмов: иначе строка попала бы в секцию
+    # по умолчанию, а следующая архивация этого месяца уже не произошла бы.
+    ("009_partition_integrity", waitlist_appointment_fk_statements() + [
+        """
+        CREATE OR REPLACE FUNCTION appointment_reject_archived() RETURNS trigger AS $$
+        BEGIN
+            IF to_regclass(format('appointment_p%s', to_char(NEW.appointmentdate, 'YYYY_MM'))) IS NOT NULL THEN
+                RAISE EXCEPTION 'Приёмы за % перенесены в архив, изменение невозможно',
+                    to_char(NEW.appointmentdate, 'MM.YYYY');
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('appointment_default') IS NOT NULL THEN
+                DROP TRIGGER IF EXISTS appointment_reject_archived ON appointment_default;
+                CREATE TRIGGER appointment_reject_archived
+                    BEFORE INSERT OR UPDATE ON appointment_default
+                    FOR EACH ROW EXECUTE FUNCTION appointment_reject_archived();
+            END IF;
+        END
+        $$
+        """,
+    ]),
+    # medsys.audit = 'off' учитывается только для членов роли medsys_maintenance (и суперпользователей):
+    # иначе любой сеанс мог бы изменять данные мимо журнала. Роль выдаётся пользователю,
+    # от имени которого запускается Maintenance.py.
+    ("010_audit_off_privilege", [
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'medsys_maintenance') THEN
+                CREATE ROLE medsys_maintenance NOLOGIN;
+            END IF;
+        END
+        $$
+        """,
+        """
+        CREATE OR REPLACE FUNCTION audit_row() RETURNS trigger AS $$
+        DECLARE
+            -- TG_ARGV: имя таблицы, первичный ключ, затем скрытые столбцы
+            hidden text[] := COALESCE(TG_ARGV[2:TG_NARGS - 1], ARRAY[]::text[]);
+            old_row jsonb;
+            new_row jsonb;
+        BEGIN
+            -- Отключить запись может только служебная роль (задание обслуживания), не любой клиент
+            IF current_setting('medsys.audit', true) = 'off'
+               AND pg_has_role(current_user, 'medsys_maintenance', 'MEMBER') THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP <> 'INSERT' THEN
+                old_row := to_jsonb(OLD) - hidden;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                new_row := to_jsonb(NEW) - hidden;
+            END IF;
+            IF TG_OP = 'UPDATE' AND old_row = new_row THEN
+                RETURN NULL;
+            END IF;
+            INSERT INTO audit_log (userid, role, tablename, operation, rowid, olddata, newdata)
+            VALUES (
+                NULLIF(current_setting('medsys.user_id', true), '')::integer,
+                NULLIF(current_setting('medsys.role', true), ''),
+                TG_ARGV[0], TG_OP, COALESCE(new_row, old_row) ->> TG_ARGV[1], old_row, new_row
+            );
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+    ]),
+]
+
+
+def apply_migrations(conn):
+    """Применение ещё не выполненных миграций (Maintenance.py); возвращает имена миграций с ошибкой"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        """)
+        conn.commit()
+        cursor.execute("SELECT name FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Не удалось прочитать список миграций: {str(e)}")
+        cursor.close()
+        return ["schema_migrations"]
+
+    failed = []
+    for name, statements in MIGRATIONS:
+        if name in applied:
+            continue
+        try:
+            # Перестройка больших таблиц дольше обычного statement_timeout (см. Config.py)
+            cursor.execute("SET LOCAL statement_timeout = 0")
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+            conn.commit()
+            logging.info(f"Миграция {name} применена")
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Ошибка при применении миграции {name}: {str(e)}")
+            failed.append(name)
+    cursor.close()
+    return failed
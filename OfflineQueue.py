@@ -0,0 +1,455 @@
+import json
+import uuid
+import sqlite3
+import logging
+
+import psycopg2
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+    QTableWidgetItem, QMessageBox, QHeaderView, QDateEdit, QTimeEdit
+)
+from PyQt6.QtCore import Qt, QObject, QThread, QTimer, QDate, QTime, pyqtSignal
+
+from Scheduling import count_overlaps
+from Database import open_connection, session_actor, CONNECTION_ERRORS
+from Config import config
+
+# Очередь операций с приёмами, выполненных без связи с сервером.
+# Операции сохраняются в локальный SQLite-файл и воспроизводятся по порядку
+# после восстановления соединения. Проверка связи и воспроизведение идут в фоновом потоке
+# (ReplayThread): подключение к недоступному серверу не останавливает окна.
+OFFLINE_QUEUE_ENABLED = config.getboolean('offline', 'enabled', fallback=True)
+QUEUE_PATH = config.get('offline', 'queue_path', fallback='offline_queue.db')
+RECONNECT_INTERVAL_MS = config.getint('offline', 'reconnect_interval', fallback=10) * 1000
+
+OP_INSERT = 'insert'
+OP_CANCEL = 'cancel'
+OP_UPDATE = 'update'
+
+OP_TITLES = {
+    OP_INSERT: "Запись на приём",
+    OP_CANCEL: "Отмена приёма",
+    OP_UPDATE: "Изменение приёма",
+}
+
+
+class ReplayThread(QThread):
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+        self.result = None
+
+    def run(self):
+        # Исключение, вышедшее из потока, завершило бы приложение: все ошибки только журналируются
+        try:
+            pg_conn = open_connection()
+        except CONNECTION_ERRORS as e:
+            logging.debug(f"Сервер по-прежнему недоступен: {str(e)}")
+            return
+        except Exception as e:
+            logging.error(f"Не удалось подключиться для воспроизведения очереди: {str(e)}")
+            return
+
+        try:
+            self.result = self.queue.replay(pg_conn)
+        except CONNECTION_ERRORS as e:
+            logging.warning(f"Связь прервалась во время воспроизведения очереди: {str(e)}")
+        except Exception:
+            logging.exception("Ошибка при воспроизведении офлайн-очереди")
+        finally:
+            pg_conn.close()
+
+
+class OfflineQueue(QObject):
+    # (число применённых операций, число конфликтов)
+    replayed = pyqtSignal(int, int)
+
+    def __init__(self, path=QUEUE_PATH):
+        super().__init__()
+        self.path = path
+        self.resolving = False
+        self.thread = None
+        self.show_conflicts = True
+        self.create_schema()
+        self.timer = QTimer(self)
+        self.timer.setInterval(RECONNECT_INTERVAL_MS)
+        self.timer.timeout.connect(self.try_replay)
+        if self.pending_count():
+            self.timer.start()
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def create_schema(self):
+        conn = self.connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS queued_operation (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    op TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    error TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS queued_operation_state ON queued_operation (state, id)")
+        conn.close()
+
+    def enqueue(self, op, payload):
+        """Сохранение операции в очередь; воспроизведение начнётся при появлении связи"""
+        # Ключ операции: по нему сервер узнаёт уже применённую операцию (см. replay).
+        # Кто выполнил операцию, запоминается сейчас: при воспроизведении его пишет журнал аудита
+        payload = dict(payload, operation_key=str(uuid.uuid4()),
+                       actor_user_id=session_actor['user_id'], actor_role=session_actor['role'])
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO queued_operation (op, payload) VALUES (?, ?)",
+                (op, json.dumps(payload, ensure_ascii=False))
+            )
+        conn.close()
+        logging.debug(f"Операция '{op}' поставлена в офлайн-очередь: {payload}")
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def operations(self, state):
+        conn = self.connect()
+        rows = conn.execute(
+            "SELECT id, op, payload, created_at, error FROM queued_operation WHERE state = ? ORDER BY id",
+            (state,)
+        ).fetchall()
+        conn.close()
+        return [(op_id, op, json.loads(payload), created_at, error)
+                for op_id, op, payload, created_at, error in rows]
+
+    def pending_count(self):
+        conn = self.connect()
+        count = conn.execute("SELECT COUNT(*) FROM queued_operation WHERE state = 'pending'").fetchone()[0]
+        conn.close()
+        return count
+
+    def try_replay(self, show_conflicts=True):
+        """Проверка связи с сервером и воспроизведение очереди в фоновом потоке"""
+        if self.thread is not None:
+            # Предыдущая попытка ещё идёт; следующую запустит таймер
+            return
+        self.show_conflicts = show_conflicts
+        self.thread = ReplayThread(self)
+        self.thread.finished.connect(self.on_replay_finished)
+        self.thread.start()
+
+    def on_replay_finished(self):
+        thread, self.thread = self.thread, None
+        thread.deleteLater()
+        if thread.result is None:
+            return
+        applied, conflicts = thread.result
+        try:
+            if not self.pending_count():
+                self.timer.stop()
+            self.replayed.emit(applied, conflicts)
+            if conflicts and self.show_conflicts and not self.resolving:
+                self.resolving = True
+                try:
+                    ConflictResolutionDialog(self).exec()
+                finally:
+                    self.resolving = False
+        except Exception:
+            logging.exception("Ошибка после воспроизведения офлайн-очереди")
+
+    def stop(self):
+        """Остановка попыток и ожидание фонового воспроизведения (перед выходом из приложения)"""
+        self.timer.stop()
+        if self.thread is not None:
+            self.thread.wait()
+
+    def replay(self, pg_conn):
+        """Воспроизведение ожидающих операций в порядке постановки.
+
+        Все операции выполняются в одной транзакции, каждая под своей точкой
+        сохранения: конфликт одной операции не откатывает остальные.
+        Вместе с операцией в offline_applied записывается её ключ, поэтому операция,
+        применённая до сбоя, но не удалённая из локальной очереди, повторно не выполняется.
+        """
+        operations = self.operations('pending')
+        if not operations:
+            return 0, 0
+
+        cursor = pg_conn.cursor()
+        done_ids = []
+        conflicts = []
+        for op_id, op, payload, _, _ in operations:
+            cursor.execute("SAVEPOINT queued_op")
+            try:
+                self.apply_actor(cursor, payload)
+                if self.already_applied(cursor, payload):
+                    logging.debug(f"Операция {op_id} уже применена на сервере, пропускается")
+                    cursor.execute("RELEASE SAVEPOINT queued_op")
+                    done_ids.append((op_id,))
+                    continue
+                error = self.apply(cursor, op, payload)
+            except CONNECTION_ERRORS:
+                raise
+            except psycopg2.Error as e:
+                error = str(e).strip()
+            if error:
+                cursor.execute("ROLLBACK TO SAVEPOINT queued_op")
+                conflicts.append((error, op_id))
+            else:
+                cursor.execute("RELEASE SAVEPOINT queued_op")
+                done_ids.append((op_id,))
+        pg_conn.commit()
+        cursor.close()
+
+        conn = self.connect()
+        with conn:
+            conn.executemany("DELETE FROM queued_operation WHERE id = ?", done_ids)
+            conn.executemany("UPDATE queued_operation SET state = 'conflict', error = ? WHERE id = ?", conflicts)
+        conn.close()
+        logging.debug(f"Офлайн-очередь воспроизведена: применено {len(done_ids)}, конфликтов {len(conflicts)}")
+        return len(done_ids), len(conflicts)
+
+    def apply_actor(self, cursor, payload):
+        """Пользователь операции для триггеров аудита — до конца транзакции воспроизведения"""
+        user_id = payload.get('actor_user_id')
+        cursor.execute(
+            "SELECT set_config('medsys.user_id', %s, true), set_config('medsys.role', %s, true)",
+            ('' if user_id is None else str(user_id), payload.get('actor_role') or '')
+        )
+
+    def already_applied(self, cursor, payload):
+        """Запись ключа операции; True, если ключ уже был записан прошлым воспроизведением"""
+        operation_key = payload.get('operation_key')
+        if operation_key is None:
+            # Операции, поставленные в очередь до появления ключей
+            return False
+        cursor.execute(
+            "INSERT INTO offline_applied (operationkey) VALUES (%s) ON CONFLICT DO NOTHING",
+            (operation_key,)
+        )
+        return cursor.rowcount == 0
+
+    def apply(self, cursor, op, payload):
+        """Выполнение одной операции; возвращает текст конфликта или None"""
+        if op in (OP_INSERT, OP_UPDATE) and payload.get('status') != 'Отменён':
+            overlap_count = count_overlaps(
+                cursor, payload['doctorid'], payload['appointmentdate'],
+                payload['starttime'], payload['endtime'],
+                exclude_appointment_id=payload.get('appointmentid')
+            )
+            if overlap_count > 0:
+                return "В это время врач уже занят"
+
+        if op == OP_INSERT:
+            cursor.execute(
+                """INSERT INTO appointment
+                (patientid, medicalcardid, doctorid, diagnosisid, appointmentdate,
+                starttime, endtime, status, appointmentprice)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                (payload['patientid'], payload['medicalcardid'], payload['doctorid'], payload.get('diagnosisid'),
+                 payload['appointmentdate'], payload['starttime'], payload['endtime'],
+                 payload['status'], payload['appointmentprice'])
+            )
+        elif op == OP_UPDATE:
+            cursor.execute(
+                """UPDATE appointment SET
+                patientid = %s,
+                medicalcardid = %s,
+                doctorid = %s,
+                diagnosisid = %s,
+                appointmentdate = %s,
+                starttime = %s,
+                endtime = %s,
+                status = %s,
+                appointmentprice = %s
+                WHERE appointmentid = %s""",
+                (payload['patientid'], payload['medicalcardid'], payload['doctorid'], payload.get('diagnosisid'),
+                 payload['appointmentdate'], payload['starttime'], payload['endtime'],
+                 payload['status'], payload['appointmentprice'], payload['appointmentid'])
+            )
+            if cursor.rowcount == 0:
+                return "Приём был удалён на сервере"
+        elif op == OP_CANCEL:
+            cursor.execute(
+                "UPDATE appointment SET status = %s WHERE appointmentid = %s AND status NOT IN ('Отменён', 'Завершён')",
+                ("Отменён", payload['appointmentid'])
+            )
+            if cursor.rowcount == 0:
+                return "Приём уже отменён, завершён или удалён"
+        else:
+            return f"Неизвестная операция: {op}"
+        return None
+
+    def requeue(self, op_id, appointment_date=None, start_time=None, end_time=None):
+        """Возврат конфликтной операции в очередь (при необходимости с новым временем)"""
+        conn = self.connect()
+        with conn:
+            op, payload = conn.execute(
+                "SELECT op, payload FROM queued_operation WHERE id = ?", (op_id,)
+            ).fetchone()
+            payload = json.loads(payload)
+            if appointment_date is not None:
+                payload['appointmentdate'] = appointment_date
+                payload['starttime'] = start_time
+                payload['endtime'] = end_time
+            # Новый id ставит операцию в конец очереди, после уже применённых
+            conn.execute("DELETE FROM queued_operation WHERE id = ?", (op_id,))
+            conn.execute(
+                "INSERT INTO queued_operation (op, payload) VALUES (?, ?)",
+                (op, json.dumps(payload, ensure_ascii=False))
+            )
+        conn.close()
+
+    def discard(self, op_id):
+        conn = self.connect()
+        with conn:
+            conn.execute("DELETE FROM queued_operation WHERE id = ?", (op_id,))
+        conn.close()
+
+
+class ConflictResolutionDialog(QDialog):
+    def __init__(self, queue, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self.setWindowTitle("Конфликты офлайн-очереди")
+        self.setMinimumSize(800, 450)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        layout.addWidget(QLabel(
+            "Эти операции не удалось применить после восстановления связи.\n"
+            "Выберите новое время и повторите операцию или удалите её из очереди."
+        ))
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(["ID", "Операция", "Врач", "Дата", "Время", "Причина"])
+        self.table.setColumnHidden(0, True)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        header = self.table.horizontalHeader()
+        for col in range(self.table.columnCount()):
+            header.setSectionResizeMode(col, QHeaderView.ResizeMode.Stretch)
+        self.table.itemSelectionChanged.connect(self.on_selection_changed)
+        layout.addWidget(self.table)
+
+        time_layout = QHBoxLayout()
+        self.date_input = QDateEdit()
+        self.date_input.setDisplayFormat("dd.MM.yyyy")
+        self.date_input.setCalendarPopup(True)
+        self.date_input.setMinimumDate(QDate.currentDate())
+        self.time_input = QTimeEdit()
+        self.time_input.setDisplayFormat("HH:mm")
+        time_layout.addWidget(QLabel("Новая дата:"))
+        time_layout.addWidget(self.date_input)
+        time_layout.addWidget(QLabel("Новое время:"))
+        time_layout.addWidget(self.time_input)
+        time_layout.addStretch()
+        layout.addLayout(time_layout)
+
+        btn_layout = QHBoxLayout()
+        retry_btn = QPushButton("Повторить с новым временем")
+        discard_btn = QPushButton("Удалить из очереди")
+        close_btn = QPushButton("Закрыть")
+        for btn in [retry_btn, discard_btn, close_btn]:
+            btn.setCursor(Qt.CursorShape.PointingHandCursor)
+            btn_layout.addWidget(btn)
+        retry_btn.clicked.connect(self.retry_selected)
+        discard_btn.clicked.connect(self.discard_selected)
+        close_btn.clicked.connect(self.accept)
+        layout.addLayout(btn_layout)
+
+        # Повтор операции воспроизводится в фоне; список обновляется по его завершении
+        self.queue.replayed.connect(self.on_replayed)
+        self.load_data()
+
+    def on_replayed(self, applied, conflicts):
+        self.load_data()
+
+    def done(self, result):
+        self.queue.replayed.disconnect(self.on_replayed)
+        super().done(result)
+
+    def load_data(self):
+        self.conflicts = self.queue.operations('conflict')
+        self.table.setRowCount(len(self.conflicts))
+        for row_idx, (op_id, op, payload, _, error) in enumerate(self.conflicts):
+            values = [
+                str(op_id),
+                OP_TITLES.get(op, op),
+                str(payload.get('doctorid', "")),
+                payload.get('appointmentdate', ""),
+                f"{payload.get('starttime', '')[:5]}-{payload.get('endtime', '')[:5]}",
+                error or "",
+            ]
+            for col_idx, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                self.table.setItem(row_idx, col_idx, item)
+
+    def selected_operation(self):
+        selected_items = self.table.selectedItems()
+        if not selected_items:
+            QMessageBox.warning(self, "Ошибка", "Выберите операцию")
+            return None
+        return self.conflicts[selected_items[0].row()]
+
+    def on_selection_changed(self):
+        selected_items = self.table.selectedItems()
+        if not selected_items:
+            return
+        payload = self.conflicts[selected_items[0].row()][2]
+        if payload.get('appointmentdate'):
+            self.date_input.setDate(QDate.fromString(payload['appointmentdate'], "yyyy-MM-dd"))
+        if payload.get('starttime'):
+            self.time_input.setTime(QTime.fromString(payload['starttime'], "HH:mm:ss"))
+
+    def retry_selected(self):
+        operation = self.selected_operation()
+        if operation is None:
+            return
+        op_id, op, _, _, _ = operation
+        if op == OP_CANCEL:
+            self.queue.requeue(op_id)
+        else:
+            start = self.time_input.time()
+            self.queue.requeue(
+                op_id,
+                self.date_input.date().toString("yyyy-MM-dd"),
+                start.toString("HH:mm:ss"),
+                start.addSecs(1800).toString("HH:mm:ss")
+            )
+        self.load_data()
+        self.queue.try_replay(show_conflicts=False)
+
+    def discard_selected(self):
+        operation = self.selected_operation()
+        if operation is None:
+            return
+        reply = QMessageBox.question(
+            self, "Подтверждение", "Удалить операцию из очереди без применения?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            self.queue.discard(operation[0])
+            self.load_data()
+
+
+_queue = None
+
+
+def get_offline_queue():
+    """Общая очередь для всех окон приложения"""
+    global _queue
+    if _queue is None:
+        _queue = OfflineQueue()
+    return _queue
+
+
+def stop_offline_queue():
+    if _queue is not None:
+        _queue.stop()
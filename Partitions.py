@@ -0,0 +1,106 @@
+import re
+import logging
+from datetime import date, timedelta
+
+from Config import config
+
+# Таблица appointment секционирована по месяцам (миграция 006_appointment_partitioning).
+# Окно приёмов всегда читает ограниченный период (default_window), поэтому запрос затрагивает
+# одну-две секции; старые секции переносятся в appointment_archive.
+WINDOW_DAYS_AHEAD = config.getint('partitions', 'window_days_ahead', fallback=30)
+PARTITIONS_AHEAD_MONTHS = config.getint('partitions', 'months_ahead', fallback=12)
+ARCHIVE_AFTER_MONTHS = config.getint('partitions', 'archive_after_months', fallback=24)
+# Отсоединение секции блокирует appointment; если таблица занята, архивация ждёт следующего запуска
+# обслуживания (Maintenance.py)
+MAINTENANCE_LOCK_TIMEOUT = config.get('partitions', 'lock_timeout', fallback='2s')
+
+PARTITION_NAME = re.compile(r"^appointment_p(\d{4})_(\d{2})$")
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    """Первое число месяца, отстоящего от day на months месяцев"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def default_window(today=None):
+    """Период окна приёмов по умолчанию: текущая неделя и ещё WINDOW_DAYS_AHEAD дней"""
+    today = today or date.today()
+    return today - timedelta(days=today.weekday()), today + timedelta(days=WINDOW_DAYS_AHEAD)
+
+
+def shift_window(start, end, steps):
+    """Соседний период той же длины: steps=-1 — предыдущий, steps=1 — следующий"""
+    length = timedelta(days=(end - start).days + 1) * steps
+    return start + length, end + length
+
+
+def is_partitioned(cursor):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('appointment')")
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def archive_partitions(cursor, before):
+    """Перенос секций месяцев раньше before из appointment в appointment_archive"""
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'appointment'::regclass
+        ORDER BY c.relname
+    """)
+    archived = []
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME.match(name)
+        if not match:
+            continue
+        start = date(int(match.group(1)), int(match.group(2)), 1)
+        if start >= before:
+            break
+        # Внешний ключ листа ожидания не даёт отсоединить секцию, на строки которой он ссылается;
+        # записи листа за этот месяц остаются со статусом, но без ссылки на приём
+        cursor.execute(
+            "UPDATE waitlist SET appointmentid = NULL, appointmentdate = NULL "
+            "WHERE appointmentdate >= %s AND appointmentdate < %s",
+            (start, add_months(start, 1))
+        )
+        # Имя проверено регулярным выражением, поэтому его можно подставить в запрос
+        cursor.execute(f"ALTER TABLE appointment DETACH PARTITION {name}")
+        cursor.execute(
+            f"ALTER TABLE appointment_archive ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+            (start, add_months(start, 1))
+        )
+        archived.append(name)
+    return archived
+
+
+def maintain_partitions(conn):
+    """Создание секций на текущий и будущие месяцы и архивация старых; возвращает True при успехе"""
+    cursor = conn.cursor()
+    try:
+        if not is_partitioned(cursor):
+            conn.rollback()
+            return True
+        cursor.execute(f"SET LOCAL lock_timeout = '{MAINTENANCE_LOCK_TIMEOUT}'")
+        # Перенос строк между секциями — не изменение данных, в журнал аудита он не пишется
+        # (если пользователь обслуживания входит в роль medsys_maintenance, см. 010_audit_off_privilege)
+        cursor.execute("SET LOCAL medsys.audit = 'off'")
+        current = month_start(date.today())
+        for offset in range(PARTITIONS_AHEAD_MONTHS + 1):
+            cursor.execute("SELECT appointment_ensure_partition(%s)", (add_months(current, offset),))
+        archived = archive_partitions(cursor, add_months(current, -ARCHIVE_AFTER_MONTHS))
+        conn.commit()
+        if archived:
+            logging.info(f"Перенесены в архив секции приёмов: {', '.join(archived)}")
+        return True
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Ошибка при обслуживании секций приёмов: {str(e)}")
+        return False
+    finally:
+        cursor.close()
@@ -1,15 +1,23 @@
 import sys
-import psycopg2
+import logging
+from Database import connect
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout,
-    QHBoxLayout, QLabel, QPushButton, QTableWidget,
-    QTableWidgetItem, QMessageBox, QLineEdit,
+    QHBoxLayout, QLabel, QPushButton, QTableView,
+    QMessageBox, QLineEdit, QAbstractItemView,
     QHeaderView, QDialog, QFormLayout, QDateEdit, QComboBox
 )
-from PyQt6.QtCore import Qt, QDate
-from PyQt6.QtGui import QColor, QPalette, QIcon
+from PyQt6.QtCore import Qt, QDate, QTimer
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme, set_variant, VARIANT_GRID_COMPACT
+from LogConfig import setup_logging
+from PatientSearch import PatientTableModel
+
+SEARCH_DEBOUNCE_MS = 300
 
 class PatientsApp(QMainWindow):
+    CHANGE_TABLES = ("patient",)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Медицинская информационная система - Пациенты")
@@ -22,65 +30,6 @@ class PatientsApp(QMainWindow):
         self.med_white = QColor(255, 255, 255)
         self.med_red = QColor(200, 16, 46)
 
-        # Установка стиля приложения
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {self.med_light.name()};
-            }}
-            QTableWidget {{
-                background-color: {self.med_white.name()};
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                gridline-color: #d1d8e0;
-                font-size: 14px;
-            }}
-            QTableWidget::item {{
-                padding: 8px;
-            }}
-            QHeaderView::section {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                padding: 8px;
-                border: none;
-                font-weight: bold;
-            }}
-            QPushButton {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px 15px;
-                font-size: 14px;
-                min-width: 100px;
-            }}
-            QPushButton:hover {{
-                background-color: {self.med_blue.darker(110).name()};
-            }}
-            QPushButton:pressed {{
-                background-color: {self.med_blue.darker(120).name()};
-            }}
-            QPushButton:disabled {{
-                background-color: #cccccc;
-            }}
-            QLineEdit, QDateEdit, QComboBox {{
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-                max-width: 300px;
-            }}
-            QDialog {{
-                background-color: {self.med_light.name()};
-            }}
-        """)
-
-        # Настройка цветовой палитры
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Window, self.med_light)
-        palette.setColor(QPalette.ColorRole.Base, self.med_white)
-        palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-        self.setPalette(palette)
-
         self.conn = None
         self.cursor = None
         self.connect_to_db()
@@ -90,12 +39,7 @@ class PatientsApp(QMainWindow):
 
     def connect_to_db(self):
         try:
-            self.conn = psycopg2.connect(
-                dbname='Practice',
-                user='postgres',
-                password='123',
-                host='localhost'
-            )
+            self.conn = connect()
             self.cursor = self.conn.cursor()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {str(e)}")
@@ -111,7 +55,7 @@ class PatientsApp(QMainWindow):
             """)
             self.medical_cards = self.cursor.fetchall()
         except Exception as e:
-            print(f"Ошибка при загрузке медицинских карт: {e}")
+            logging.error(f"Ошибка при загрузке медицинских карт: {str(e)}")
             self.medical_cards = []
 
     def setup_ui(self):
@@ -122,14 +66,7 @@ class PatientsApp(QMainWindow):
         layout.setSpacing(15)
 
         title_label = QLabel("Управление пациентами")
-        title_label.setStyleSheet(f"""
-            QLabel {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {self.med_blue.name()};
-                padding: 10px;
-            }}
-        """)
+        title_label.setObjectName("title")
         layout.addWidget(title_label)
 
         btn_layout = QHBoxLayout()
@@ -153,44 +90,41 @@ class PatientsApp(QMainWindow):
         btn_layout.addWidget(self.delete_btn)
         btn_layout.addWidget(self.refresh_btn)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "Номер мед. карты", "Фамилия", "Имя", "Отчество", "Дата рождения", "Телефон", "ID пользователя"
-        ])
+        # Поиск по ФИО и телефону выполняется на сервере с задержкой после ввода
+        search_layout = QHBoxLayout()
+        search_layout.setSpacing(10)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск по ФИО или телефону")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        search_layout.addWidget(QLabel("Поиск:"))
+        search_layout.addWidget(self.search_input)
+        search_layout.addStretch()
+
+        self.model = PatientTableModel(self.cursor, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setColumnHidden(0, True)
         self.table.setColumnHidden(7, True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
 
         self.table.setShowGrid(True)
-        self.table.setStyleSheet("""
-            QTableWidget {
-                gridline-color: #c0c0c0;
-                border: 1px solid #c0c0c0;
-            }
-            QHeaderView::section {
-                border: 1px solid #c0c0c0;
-                padding: 5px;
-            }
-            QTableWidget::item {
-                border-right: 1px solid #c0c0c0;
-                border-bottom: 1px solid #c0c0c0;
-                padding: 5px;
-            }
-        """)
+        set_variant(self.table, VARIANT_GRID_COMPACT)
 
         header = self.table.horizontalHeader()
-        for i in range(self.table.columnCount()):
+        for i in range(self.model.columnCount()):
             header.setSectionResizeMode(i, QHeaderView.ResizeMode.Stretch)
 
         self.table.verticalHeader().setVisible(False)
         self.table.setAlternatingRowColors(True)
-        self.table.setStyleSheet("""
-            QTableWidget {
-                alternate-background-color: #f5f5f5;
-            }
-        """)
 
         layout.addLayout(btn_layout)
+        layout.addLayout(search_layout)
         layout.addWidget(self.table)
 
     def refresh_all(self):
@@ -199,38 +133,23 @@ class PatientsApp(QMainWindow):
 
     def load_data(self):
         if not hasattr(self, 'cursor') or not self.cursor:
-            print("Курсор не инициализирован")
+            logging.error("Курсор не инициализирован")
             return
 
         try:
-            query = """
-                SELECT p.patientid, p.medicalcardid, p.lastname, p.firstname, p.midname, 
-                       p.birthdate, p.phonenumber, p.userid
-                FROM patient p
-                ORDER BY p.lastname, p.firstname, p.midname
-            """
-            self.cursor.execute(query)
-            data = self.cursor.fetchall()
-
-            self.table.setRowCount(len(data))
-            for row_idx, row in enumerate(data):
-                for col_idx, value in enumerate(row):
-                    if col_idx == 5 and value is not None:
-                        value = value.strftime("%d.%m.%Y")
-                    elif col_idx == 6 and value is not None:
-                        value = f"+7{value}"
-                    item = QTableWidgetItem(str(value) if value is not None else "")
-                    item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    if row_idx % 2 == 0:
-                        item.setForeground(QColor(53, 59, 72))
-                    else:
-                        item.setForeground(QColor(47, 53, 66))
-                    self.table.setItem(row_idx, col_idx, item)
-            print(f"Загружено {len(data)} записей")
+            self.model.reload()
+            logging.debug(f"Загружено {self.model.rowCount()} записей")
         except Exception as e:
-            print(f"Ошибка при загрузке данных: {e}")
+            logging.error(f"Ошибка при загрузке данных: {str(e)}")
             QMessageBox.critical(self, "Ошибка загрузки", f"Не удалось загрузить данные из базы:\n{str(e)}")
 
+    def apply_search(self):
+        self.model.set_filter(self.search_input.text())
+
+    def selected_row(self):
+        rows = self.table.selectionModel().selectedRows()
+        return rows[0].row() if rows else None
+
     def show_add_dialog(self):
         dialog = QDialog(self)
         dialog.setWindowTitle("Добавить пациента")
@@ -339,25 +258,10 @@ class PatientsApp(QMainWindow):
                 new_id = self.cursor.fetchone()[0]
                 self.conn.commit()
 
-                row_pos = self.table.rowCount()
-                self.table.insertRow(row_pos)
-                formatted_birthdate = birthdate_input.date().toString("dd.MM.yyyy")
-                card_number = str(medical_card_combo.currentData()) if medical_card_id else ""
-                columns = [
-                    str(new_id),
-                    card_number,
-                    lastname,
-                    firstname,
-                    midname or "",
-                    formatted_birthdate,
-                    phone_input.text() if phone else "",
-                    str(user_id) if user_id else ""
-                ]
-
-                for col_idx, value in enumerate(columns):
-                    item = QTableWidgetItem(value)
-                    item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    self.table.setItem(row_pos, col_idx, item)
+                # Новый пациент встаёт на своё место в порядке ФИО (и только если подходит под поиск),
+                # поэтому загруженные страницы перечитываются
+                self.model.reload()
+                logging.debug(f"Добавлен пациент {new_id}")
 
                 dialog.close()
             except Exception as e:
@@ -369,20 +273,20 @@ class PatientsApp(QMainWindow):
         dialog.exec()
 
     def show_edit_dialog(self):
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        row = self.selected_row()
+        if row is None:
             QMessageBox.warning(self, "Ошибка", "Выберите пациента для редактирования")
             return
 
-        row = selected_items[0].row()
-        patient_id = int(self.table.item(row, 0).text())
-        user_id = self.table.item(row, 7).text() if self.table.item(row, 7) else None
-        current_card = self.table.item(row, 1).text()
-        current_lastname = self.table.item(row, 2).text()
-        current_firstname = self.table.item(row, 3).text()
-        current_midname = self.table.item(row, 4).text()
-        current_birthdate = QDate.fromString(self.table.item(row, 5).text(), "dd.MM.yyyy")
-        current_phone = self.table.item(row, 6).text()
+        values = self.model.row_values(row)
+        patient_id = int(values[0])
+        user_id = values[7] or None
+        current_card = values[1]
+        current_lastname = values[2]
+        current_firstname = values[3]
+        current_midname = values[4]
+        current_birthdate = QDate.fromString(values[5], "dd.MM.yyyy")
+        current_phone = values[6]
 
         dialog = QDialog(self)
         dialog.setWindowTitle("Редактировать пациента")
@@ -459,14 +363,10 @@ class PatientsApp(QMainWindow):
                     WHERE patientid = %s""",
                     (medical_card_id, lastname, firstname, midname or None, birthdate, phone_num, patient_id))
                 self.conn.commit()
-                formatted_birthdate = birthdate_input.date().toString("dd.MM.yyyy")
-                card_number = str(medical_card_combo.currentData()) if medical_card_id else ""
-                self.table.item(row, 1).setText(card_number)
-                self.table.item(row, 2).setText(lastname)
-                self.table.item(row, 3).setText(firstname)
-                self.table.item(row, 4).setText(midname or "")
-                self.table.item(row, 5).setText(formatted_birthdate)
-                self.table.item(row, 6).setText(phone_input.text() if phone else "")
+                self.model.update_row(row, [
+                    patient_id, medical_card_id, lastname, firstname, midname or None,
+                    birthdate_input.date().toPyDate(), phone_num, int(user_id) if user_id else None
+                ])
                 dialog.close()
             except Exception as e:
                 self.conn.rollback()
@@ -477,15 +377,15 @@ class PatientsApp(QMainWindow):
         dialog.exec()
 
     def delete_patient(self):
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        row = self.selected_row()
+        if row is None:
             QMessageBox.warning(self, "Ошибка", "Выберите пациента для удаления")
             return
 
-        row = selected_items[0].row()
-        patient_id = int(self.table.item(row, 0).text())
-        user_id = self.table.item(row, 7).text() if self.table.item(row, 7) else None
-        patient_name = f"{self.table.item(row, 2).text()} {self.table.item(row, 3).text()}"
+        values = self.model.row_values(row)
+        patient_id = int(values[0])
+        user_id = values[7] or None
+        patient_name = f"{values[2]} {values[3]}"
 
         reply = QMessageBox.question(
             self, "Подтверждение",
@@ -498,7 +398,7 @@ class PatientsApp(QMainWindow):
                 if user_id:
                     self.cursor.execute("DELETE FROM users WHERE userid = %s", (user_id,))
                 self.conn.commit()
-                self.table.removeRow(row)
+                self.model.remove_row(row)
             except Exception as e:
                 self.conn.rollback()
                 QMessageBox.critical(self, "Ошибка", f"Не удалось удалить пациента:\n{str(e)}")
@@ -511,7 +411,9 @@ class PatientsApp(QMainWindow):
         event.accept()
 
 if __name__ == "__main__":
+    setup_logging()
     app = QApplication(sys.argv)
+    apply_theme(app)
     app.setStyle("Fusion")
     window = PatientsApp()
     window.show()
@@ -0,0 +1,180 @@
+import logging
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+from SearchPicker import LRUCache
+from Formatting import format_date
+from Config import config
+
+# Выражение совпадает с индексом patient_search_trgm_idx (см. Migrations.py),
+# поэтому ILIKE '%текст%' по нему обслуживается триграммным индексом.
+PATIENT_SEARCH_EXPR = (
+    "(p.lastname || ' ' || p.firstname || ' ' || COALESCE(p.midname, '') || ' ' || COALESCE(p.phonenumber::text, ''))"
+)
+PAGE_SIZE = config.getint('fetch', 'patient_page_size', fallback=200)
+
+
+def search_pattern(text):
+    """Шаблон ILIKE с экранированием спецсимволов"""
+    escaped = text.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def fetch_patient_page(cursor, text="", after=None, limit=PAGE_SIZE):
+    """Страница пациентов в порядке ФИО (keyset-пагинация по ключу последней строки)"""
+    query = """
+        SELECT p.patientid, p.medicalcardid, p.lastname, p.firstname, p.midname,
+               p.birthdate, p.phonenumber, p.userid
+        FROM patient p
+        WHERE 1=1
+    """
+    params = []
+    if text.strip():
+        # Номер телефона хранится без +7, поэтому префикс из строки поиска отбрасываем
+        term = text.strip()
+        if term.startswith("+7"):
+            term = term[2:]
+        query += f" AND {PATIENT_SEARCH_EXPR} ILIKE %s"
+        params.append(search_pattern(term))
+    if after is not None:
+        query += " AND (p.lastname, p.firstname, COALESCE(p.midname, ''), p.patientid) > (%s, %s, %s, %s)"
+        params.extend(after)
+    query += " ORDER BY p.lastname, p.firstname, COALESCE(p.midname, ''), p.patientid LIMIT %s"
+    params.append(limit)
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+# Недавние результаты поиска для выбора пациента в диалогах приёмов
+picker_cache = LRUCache(
+    maxsize=config.getint('cache', 'patient_search', fallback=256),
+    ttl=config.getint('cache', 'patient_search_ttl', fallback=60)
+)
+
+
+def search_patients(cursor, text, medical_card_id=None, limit=20):
+    """Пациенты для выпадающего списка: [(patientid, ФИО, medicalcardid)].
+
+    Сначала идут совпадения по началу фамилии, затем остальные совпадения по подстроке.
+    """
+    key = (text.strip().lower(), medical_card_id, limit)
+    cached = picker_cache.get(key)
+    if cached is not None:
+        return cached
+
+    term = text.strip()
+    if term.startswith("+7"):
+        term = term[2:]
+    query = f"""
+        SELECT p.patientid,
+               p.lastname || ' ' || p.firstname || ' ' || COALESCE(p.midname, '') as patient_name,
+               p.medicalcardid
+        FROM patient p
+        WHERE {PATIENT_SEARCH_EXPR} ILIKE %s
+    """
+    params = [search_pattern(term)]
+    if medical_card_id is not None:
+        query += " AND p.medicalcardid = %s"
+        params.append(medical_card_id)
+    query += " ORDER BY (p.lastname ILIKE %s) DESC, p.lastname, p.firstname LIMIT %s"
+    params.extend([search_pattern(term)[1:], limit])
+    cursor.execute(query, params)
+    results = cursor.fetchall()
+    picker_cache.put(key, results)
+    logging.debug(f"Поиск пациентов '{text}': найдено {len(results)}")
+    return results
+
+
+class PatientTableModel(QAbstractTableModel):
+    HEADERS = ["ID", "Номер мед. карты", "Фамилия", "Имя", "Отчество", "Дата рождения", "Телефон", "ID пользователя"]
+
+    def __init__(self, cursor, parent=None):
+        super().__init__(parent)
+        self.cursor = cursor
+        self.rows = []
+        self.filter_text = ""
+        self.has_more = True
+        # Ключ последней строки, полученной с сервера; следующая страница начинается после него.
+        # Хранится отдельно от rows: показанные строки меняются при редактировании и удалении
+        self.last_key = None
+
+    def set_filter(self, text):
+        """Новый фильтр: сброс модели и загрузка первой страницы"""
+        self.beginResetModel()
+        self.filter_text = text
+        self.rows = []
+        self.has_more = True
+        self.last_key = None
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def reload(self):
+        self.set_filter(self.filter_text)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.row_values(index.row())[index.column()]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return QColor(53, 59, 72) if index.row() % 2 == 0 else QColor(47, 53, 66)
+        return None
+
+    def flags(self, index):
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Подгрузка следующей страницы, когда представление докручено до конца"""
+        if parent.isValid() or not self.has_more:
+            return
+        try:
+            page = fetch_patient_page(self.cursor, self.filter_text, self.last_key)
+        except Exception as e:
+            logging.error(f"Ошибка при загрузке страницы пациентов: {str(e)}")
+            self.cursor.connection.rollback()
+            self.has_more = False
+            return
+        self.has_more = len(page) == PAGE_SIZE
+        if not page:
+            return
+        last = page[-1]
+        self.last_key = (last[2], last[3], last[4] or "", last[0])
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+        logging.debug(f"Загружено {len(page)} пациентов (всего в модели {len(self.rows)})")
+
+    def row_values(self, row):
+        """Строковые значения столбцов строки в том виде, в каком они показываются в таблице"""
+        values = []
+        for col_idx, value in enumerate(self.rows[row]):
+            if col_idx == 5 and value is not None:
+                value = format_date(value)
+            elif col_idx == 6 and value is not None:
+                value = f"+7{value}"
+            values.append(str(value) if value is not None else "")
+        return values
+
+    def update_row(self, row, values):
+        self.rows[row] = tuple(values)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.rows[row]
+        self.endRemoveRows()
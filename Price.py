@@ -1,5 +1,6 @@
 import sys
-import psycopg2
+import logging
+from Database import connect
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout,
     QHBoxLayout, QLabel, QPushButton, QTableWidget,
@@ -7,7 +8,10 @@ from PyQt6.QtWidgets import (
     QHeaderView, QDialog, QFormLayout
 )
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor, QPalette, QIcon
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme, set_variant, VARIANT_GRID
+from LogConfig import setup_logging
+from Formatting import format_price
 
 class PriceApp(QMainWindow):
     def __init__(self):
@@ -23,64 +27,6 @@ class PriceApp(QMainWindow):
         self.med_white = QColor(255, 255, 255)  # Белый
         self.med_red = QColor(200, 16, 46)  # Для предупреждений
 
-        # Установка стиля приложения
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {self.med_light.name()};
-            }}
-            QTableWidget {{
-                background-color: {self.med_white.name()};
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                gridline-color: #d1d8e0;
-                font-size: 14px;
-            }}
-            QTableWidget::item {{
-                padding: 8px;
-            }}
-            QHeaderView::section {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                padding: 8px;
-                border: none;
-                font-weight: bold;
-            }}
-            QPushButton {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px 15px;
-                font-size: 14px;
-                min-width: 100px;
-            }}
-            QPushButton:hover {{
-                background-color: {self.med_blue.darker(110).name()};
-            }}
-            QPushButton:pressed {{
-                background-color: {self.med_blue.darker(120).name()};
-            }}
-            QPushButton:disabled {{
-                background-color: #cccccc;
-            }}
-            QLineEdit {{
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-            }}
-            QDialog {{
-                background-color: {self.med_light.name()};
-            }}
-        """)
-
-        # Настройка цветовой палитры
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Window, self.med_light)
-        palette.setColor(QPalette.ColorRole.Base, self.med_white)
-        palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-        self.setPalette(palette)
-
         self.conn = None
         self.cursor = None
         self.connect_to_db()
@@ -90,12 +36,7 @@ class PriceApp(QMainWindow):
     def connect_to_db(self):
         """Подключение к базе данных"""
         try:
-            self.conn = psycopg2.connect(
-                dbname='Practice',
-                user='postgres',
-                password='123',
-                host='localhost'
-            )
+            self.conn = connect()
             self.cursor = self.conn.cursor()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {str(e)}")
@@ -111,14 +52,7 @@ class PriceApp(QMainWindow):
 
         # Заголовок
         title_label = QLabel("Управление ценами")
-        title_label.setStyleSheet(f"""
-            QLabel {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {self.med_blue.name()};
-                padding: 10px;
-            }}
-        """)
+        title_label.setObjectName("title")
         layout.addWidget(title_label)
 
         # Кнопки управления
@@ -150,24 +84,7 @@ class PriceApp(QMainWindow):
         self.table.setColumnHidden(0, True)  # Скрываем столбец ID
 
         # Настройка границ и внешнего вида таблицы
-        self.table.setStyleSheet("""
-            QTableWidget {
-                border: 1px solid #c0c0c0;
-                gridline-color: #c0c0c0;
-            }
-            QHeaderView::section {
-                background-color: #006DB0;
-                color: white;
-                padding: 8px;
-                border: 1px solid #c0c0c0;
-                font-weight: bold;
-            }
-            QTableWidget::item {
-                border-right: 1px solid #c0c0c0;
-                border-bottom: 1px solid #c0c0c0;
-                padding: 8px;
-            }
-        """)
+        set_variant(self.table, VARIANT_GRID)
 
         # Настройка размеров столбцов
         header = self.table.horizontalHeader()
@@ -181,11 +98,6 @@ class PriceApp(QMainWindow):
 
         # Альтернативные цвета строк
         self.table.setAlternatingRowColors(True)
-        self.table.setStyleSheet(self.table.styleSheet() + """
-            QTableWidget {
-                alternate-background-color: #f5f5f5;
-            }
-        """)
 
         layout.addLayout(btn_layout)
         layout.addWidget(self.table)
@@ -193,7 +105,7 @@ class PriceApp(QMainWindow):
     def load_data(self):
         """Загрузка данных из таблицы price"""
         if not hasattr(self, 'cursor') or not self.cursor:
-            print("Курсор не инициализирован")
+            logging.error("Курсор не инициализирован")
             return
 
         try:
@@ -204,7 +116,7 @@ class PriceApp(QMainWindow):
             for row_idx, row in enumerate(data):
                 # Заполняем оба столбца (ID и цена), даже если ID скрыт
                 price_id = str(row[0])
-                price_value = f"{row[1]:.2f}"  # Форматируем цену с двумя знаками после запятой
+                price_value = format_price(row[1])  # Форматируем цену с двумя знаками после запятой
 
                 # ID
                 id_item = QTableWidgetItem(price_id)
@@ -224,10 +136,10 @@ class PriceApp(QMainWindow):
                     price_item.setForeground(QColor(47, 53, 66))
                 self.table.setItem(row_idx, 1, price_item)
 
-            print(f"Загружено {len(data)} записей")
+            logging.debug(f"Загружено {len(data)} записей")
 
         except Exception as e:
-            print(f"Ошибка при загрузке данных: {e}")
+            logging.error(f"Ошибка при загрузке данных: {str(e)}")
             QMessageBox.critical(
                 self,
                 "Ошибка загрузки",
@@ -315,7 +227,7 @@ class PriceApp(QMainWindow):
                 id_item.setFlags(id_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
                 self.table.setItem(row_pos, 0, id_item)
 
-                price_item = QTableWidgetItem(f"{price:.2f}")
+                price_item = QTableWidgetItem(format_price(price))
                 price_item.setFlags(price_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
                 self.table.setItem(row_pos, 1, price_item)
 
@@ -415,7 +327,7 @@ class PriceApp(QMainWindow):
                     (new_price, price_id))
                 self.conn.commit()
 
-                self.table.item(row, 1).setText(f"{new_price:.2f}")
+                self.table.item(row, 1).setText(format_price(new_price))
                 dialog.close()
 
             except Exception as e:
@@ -463,7 +375,9 @@ class PriceApp(QMainWindow):
         event.accept()
 
 if __name__ == "__main__":
+    setup_logging()
     app = QApplication(sys.argv)
+    apply_theme(app)
     app.setStyle("Fusion")
     window = PriceApp()
     window.show()
@@ -0,0 +1,128 @@
+import logging
+from contextlib import contextmanager
+
+from psycopg2.errors import QueryCanceled
+from PyQt6.QtWidgets import QProgressDialog, QMainWindow
+from PyQt6.QtCore import Qt, QThread, QEventLoop
+
+from Config import config
+
+# Долгие чтения (поиск, загрузка периода, отчёты) выполняются в отдельном потоке на соединении
+# окна. Если запрос идёт дольше CANCEL_DIALOG_DELAY_MS, появляется окно с кнопкой «Отмена»:
+# она вызывает connection.cancel(), и сервер прерывает запрос сразу, освобождая процесс.
+LONG_QUERY_TIMEOUT = config.get('database', 'long_query_timeout', fallback='5min')
+CANCEL_DIALOG_DELAY_MS = config.getint('database', 'cancel_dialog_delay_ms', fallback=500)
+# Через сколько повторять работу, отложенную из-за занятого окна
+BUSY_RETRY_MS = 500
+
+# Окна, в которых сейчас работает фоновый поток. Пока он работает, вложенный цикл событий
+# продолжает обрабатывать таймеры и сигналы окна, а соединение окна занято потоком:
+# обработчики таймеров проверяют is_busy и откладывают работу, а повторный запуск отклоняется.
+_busy_windows = set()
+
+
+class QueryCancelled(Exception):
+    """Запрос отменён пользователем"""
+
+
+class QueryBusy(QueryCancelled):
+    """В окне уже выполняется фоновый запрос; новый не запускается"""
+
+
+def is_busy(widget):
+    """Работает ли фоновый поток в окне, которому принадлежит widget"""
+    return widget.window() in _busy_windows
+
+
+@contextmanager
+def busy_window(parent):
+    """Окно parent на время работы фонового потока: ввод в него отключён, повторный запуск запрещён"""
+    window = parent.window()
+    if window in _busy_windows:
+        logging.debug(f"Окно {type(window).__name__} занято фоновым запросом")
+        raise QueryBusy("В окне уже выполняется запрос. Дождитесь его окончания и повторите действие")
+    _busy_windows.add(window)
+    # Отключается содержимое, а не всё окно: иначе стало бы недоступно и окно с кнопкой «Отмена»
+    content = window.centralWidget() if isinstance(window, QMainWindow) else None
+    if content is not None:
+        content.setEnabled(False)
+    try:
+        yield
+    finally:
+        _busy_windows.discard(window)
+        if content is not None:
+            content.setEnabled(True)
+
+
+class QueryThread(QThread):
+    def __init__(self, conn, func, timeout):
+        super().__init__()
+        self.conn = conn
+        self.func = func
+        self.timeout = timeout
+        self.result = None
+        self.error = None
+
+    def run(self):
+        cursor = None
+        try:
+            cursor = self.conn.cursor()
+            # Действует до конца транзакции (run_cancellable завершает её после запроса)
+            # и задаётся заново, если курсор повторяет чтение на новом соединении
+            cursor.set_timeout(self.timeout)
+            self.result = self.func(cursor)
+        except Exception as e:
+            self.error = e
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+
+def run_cancellable(parent, conn, func, text="Выполняется запрос...", timeout=LONG_QUERY_TIMEOUT):
+    """Выполнение func(cursor) с возможностью отмены; возвращает результат func.
+
+    Только для чтения: после запроса транзакция откатывается. При отмене пользователем
+    выбрасывается QueryCancelled, если в окне уже идёт запрос — QueryBusy; остальные ошибки
+    (в том числе превышение timeout) передаются вызывающему коду как есть.
+    """
+    with busy_window(parent):
+        return run_in_thread(parent, conn, func, text, timeout)
+
+
+def run_in_thread(parent, conn, func, text, timeout):
+    thread = QueryThread(conn, func, timeout)
+    dialog = QProgressDialog(text, "Отмена", 0, 0, parent)
+    dialog.setWindowTitle("Подождите")
+    dialog.setWindowModality(Qt.WindowModality.WindowModal)
+    dialog.setMinimumDuration(CANCEL_DIALOG_DELAY_MS)
+    # Таймер показа запускает только setValue: без него окно не появится вовсе
+    dialog.setValue(0)
+
+    cancelled = False
+
+    def cancel():
+        nonlocal cancelled
+        cancelled = True
+        logging.debug("Отмена запроса пользователем")
+        try:
+            conn.cancel()
+        except Exception as e:
+            logging.error(f"Не удалось отменить запрос: {str(e)}")
+
+    dialog.canceled.connect(cancel)
+    loop = QEventLoop()
+    thread.finished.connect(loop.quit)
+    thread.start()
+    loop.exec()
+    thread.wait()
+    dialog.canceled.disconnect(cancel)
+    dialog.close()
+    dialog.deleteLater()
+
+    conn.rollback()
+    # Отмена, пришедшая между запросами func, сервер не прерывает: результат всё равно отбрасывается
+    if cancelled and (thread.error is None or isinstance(thread.error, QueryCanceled)):
+        raise QueryCancelled()
+    if thread.error is not None:
+        raise thread.error
+    return thread.result
@@ -0,0 +1,145 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+
+from PyQt6.QtWidgets import QProgressDialog
+from PyQt6.QtCore import Qt, QThread, QEventLoop
+
+from Config import config
+from QueryRunner import busy_window
+
+# Готовые PDF-отчёты хранятся на диске под отпечатком содержимого (строки отчёта в том виде,
+# в каком они показаны, то есть после фильтров и с текущими данными). Повторный отчёт по тем же
+# данным копируется из кэша без построения — это файл первого построения без изменений, поэтому
+# время в отчёте относится к данным, а не к выдаче. Размер папки ограничен: сверх REPORT_CACHE_MAX_BYTES
+# удаляются файлы, которые дольше всего не запрашивались (время изменения файла — время обращения).
+REPORT_CACHE_DIR = config.get('cache', 'report_dir', fallback='report_cache')
+REPORT_CACHE_MAX_BYTES = config.getint('cache', 'report_max_bytes', fallback=100 * 1024 * 1024)
+REPORT_DIALOG_DELAY_MS = 500
+
+
+def report_fingerprint(kind, rows):
+    """Отпечаток отчёта: вид отчёта (включает версию оформления) и его строки"""
+    payload = json.dumps([kind, rows], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    def __init__(self, directory=REPORT_CACHE_DIR, max_bytes=REPORT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key):
+        """Путь к готовому отчёту или None"""
+        path = self.path(key)
+        with self.lock:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+        return path
+
+    def put(self, key, source):
+        """Копия построенного отчёта source в кэш"""
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.path(key)
+            tmp_path = f"{path}.tmp"
+            # Через временный файл: недописанный отчёт не может попасть в кэш
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, path)
+            self.evict(keep=path)
+
+    def evict(self, keep=None):
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pdf'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                logging.debug(f"Отчёт удалён из кэша: {path}")
+            except OSError as e:
+                logging.warning(f"Не удалось удалить отчёт из кэша {path}: {str(e)}")
+
+    def clear(self):
+        with self.lock:
+            if os.path.isdir(self.directory):
+                shutil.rmtree(self.directory, ignore_errors=True)
+
+
+_report_cache = None
+
+
+def get_report_cache():
+    """Общий кэш отчётов приложения"""
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache()
+    return _report_cache
+
+
+class ReportThread(QThread):
+    def __init__(self, build, path):
+        super().__init__()
+        self.build = build
+        self.path = path
+        self.error = None
+
+    def run(self):
+        try:
+            self.build(self.path)
+        except Exception as e:
+            self.error = e
+
+
+def build_in_background(parent, build, path, text="Формирование отчёта..."):
+    """Выполнение build(path) в отдельном потоке; окно остаётся отзывчивым.
+
+    build не должна обращаться к виджетам: данные для отчёта собираются заранее.
+    Ошибка построения передаётся вызывающему коду; если в окне уже работает фоновый
+    поток, выбрасывается QueryBusy.
+    """
+    with busy_window(parent):
+        build_in_thread(parent, build, path, text)
+
+
+def build_in_thread(parent, build, path, text):
+    thread = ReportThread(build, path)
+    dialog = QProgressDialog(text, None, 0, 0, parent)
+    dialog.setWindowTitle("Подождите")
+    dialog.setCancelButton(None)
+    dialog.setWindowModality(Qt.WindowModality.WindowModal)
+    dialog.setMinimumDuration(REPORT_DIALOG_DELAY_MS)
+    # Таймер показа запускает только setValue: без него окно не появится вовсе
+    dialog.setValue(0)
+
+    loop = QEventLoop()
+    thread.finished.connect(loop.quit)
+    thread.start()
+    loop.exec()
+    thread.wait()
+    dialog.close()
+    dialog.deleteLater()
+
+    if thread.error is not None:
+        raise thread.error
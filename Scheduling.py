@@ -0,0 +1,368 @@
+import logging
+from datetime import time, timedelta
+
+from psycopg2.extras import execute_values
+
+# Общие правила расписания приёмов: сетка 08:00–16:00 по 30 минут
+# и проверка пересечения с уже назначенными приёмами врача.
+WORKDAY_START_HOUR = 8
+WORKDAY_END_HOUR = 16
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = (WORKDAY_END_HOUR - WORKDAY_START_HOUR) * 60 // SLOT_MINUTES
+
+OVERLAP_QUERY = """
+    SELECT COUNT(*)
+    FROM appointment
+    WHERE doctorid = %s
+    AND appointmentdate = %s
+    AND status != 'Отменён'
+    AND (
+        (starttime <= %s AND endtime > %s) OR
+        (starttime < %s AND endtime >= %s) OR
+        (starttime >= %s AND endtime <= %s)
+    )
+"""
+
+
+def count_overlaps(cursor, doctor_id, appointment_date, start_time, end_time, exclude_appointment_id=None):
+    """Количество неотменённых приёмов врача, пересекающихся с интервалом"""
+    query = OVERLAP_QUERY
+    params = [doctor_id, appointment_date, start_time, start_time, end_time, end_time, start_time, end_time]
+    if exclude_appointment_id is not None:
+        query += " AND appointmentid != %s"
+        params.append(exclude_appointment_id)
+    cursor.execute(query, params)
+    overlap_count = cursor.fetchone()[0]
+    logging.debug(f"Пересечений для врача {doctor_id} на {appointment_date} {start_time}-{end_time}: {overlap_count}")
+    return overlap_count
+
+
+def find_next_free_slot(cursor, after, specialization_id=None, max_price=None, horizon_days=60):
+    """Ближайший свободный слот среди подходящих врачей: (doctorid, ФИО врача, дата, начало, цена) или None.
+
+    after — datetime, раньше которого слоты не предлагаются. Сетка слотов строится через
+    generate_series, занятые слоты отсекаются NOT EXISTS по appointment — одним запросом.
+    """
+    doctor_filter = ""
+    params = {
+        'after': after,
+        'horizon': horizon_days,
+        'slot': f"{SLOT_MINUTES} minutes",
+        'day_start': f"{WORKDAY_START_HOUR} hours",
+        'day_end': f"{WORKDAY_END_HOUR} hours",
+    }
+    if specialization_id is not None:
+        doctor_filter += " AND d.specializationid = %(specialization_id)s"
+        params['specialization_id'] = specialization_id
+    if max_price is not None:
+        doctor_filter += " AND p.price <= %(max_price)s"
+        params['max_price'] = max_price
+
+    query = f"""
+        WITH candidates AS (
+            SELECT d.doctorid,
+                   d.secondname || ' ' || d.firstname || ' ' || COALESCE(d.midname, '') AS doctor_name,
+                   p.price
+            FROM doctor d
+            LEFT JOIN price p ON d.priceid = p.priceid
+            WHERE 1=1 {doctor_filter}
+        ),
+        slots AS (
+            SELECT slot_start
+            FROM generate_series(%(after)s::date::timestamp, (%(after)s::date + %(horizon)s)::timestamp,
+                                 interval '1 day') AS day,
+                 LATERAL generate_series(day + %(day_start)s::interval,
+                                         day + %(day_end)s::interval - %(slot)s::interval,
+                                         %(slot)s::interval) AS slot_start
+            WHERE slot_start >= %(after)s::timestamp
+        )
+        SELECT c.doctorid, c.doctor_name, s.slot_start::date, s.slot_start::time, c.price
+        FROM slots s
+        CROSS JOIN candidates c
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM appointment a
+            WHERE a.doctorid = c.doctorid
+            AND a.appointmentdate = s.slot_start::date
+            AND a.status != 'Отменён'
+            AND a.starttime < (s.slot_start + %(slot)s::interval)::time
+            AND a.endtime > s.slot_start::time
+        )
+        ORDER BY s.slot_start, c.price NULLS LAST, c.doctor_name
+        LIMIT 1
+    """
+    cursor.execute(query, params)
+    result = cursor.fetchone()
+    logging.debug(f"Ближайший свободный слот после {after} (специализация {specialization_id}, "
+                  f"цена до {max_price}): {result}")
+    return result
+
+
+APPOINTMENT_COLUMNS = (
+    "patientid, medicalcardid, doctorid, diagnosisid, appointmentdate, starttime, endtime, status, appointmentprice"
+)
+
+
+def series_dates(first_date, occurrences, interval_days):
+    """Даты серии повторяющихся приёмов"""
+    return [first_date + timedelta(days=i * interval_days) for i in range(occurrences)]
+
+
+def find_series_conflicts(cursor, doctor_id, dates, start_time, end_time):
+    """Даты серии, на которые у врача уже есть пересекающийся приём (один запрос на всю серию)"""
+    cursor.execute("""
+        SELECT DISTINCT appointmentdate
+        FROM appointment
+        WHERE doctorid = %s
+        AND appointmentdate = ANY(%s)
+        AND status != 'Отменён'
+        AND starttime < %s AND endtime > %s
+    """, (doctor_id, list(dates), end_time, start_time))
+    conflicts = {row[0] for row in cursor.fetchall()}
+    logging.debug(f"Конфликты серии для врача {doctor_id}: {len(conflicts)} из {len(dates)}")
+    return conflicts
+
+
+def suggest_alternative_slots(cursor, doctor_id, dates, start_time, duration, not_before=None):
+    """Для каждой даты — свободное время врача в тот же день, ближайшее к start_time: {дата: время}.
+
+    duration — длительность приёма (timedelta): предлагаются начала по сетке слотов, после которых
+    свободны все duration минут и приём заканчивается до конца рабочего дня. Время раньше
+    not_before (datetime) не предлагается.
+    """
+    cursor.execute("""
+        SELECT DISTINCT ON (day) day::date, slot_start::time
+        FROM unnest(%(dates)s::date[]) AS day,
+             LATERAL generate_series(day + %(day_start)s::interval,
+                                     day + %(day_end)s::interval - %(duration)s::interval,
+                                     %(slot)s::interval) AS slot_start
+        WHERE (%(not_before)s::timestamp IS NULL OR slot_start >= %(not_before)s::timestamp)
+        AND NOT EXISTS (
+            SELECT 1
+            FROM appointment a
+            WHERE a.doctorid = %(doctor_id)s
+            AND a.appointmentdate = day
+            AND a.status != 'Отменён'
+            AND a.starttime < (slot_start + %(duration)s::interval)::time
+            AND a.endtime > slot_start::time
+        )
+        ORDER BY day, abs(EXTRACT(EPOCH FROM slot_start::time - %(start_time)s::time))
+    """, {
+        'dates': list(dates),
+        'doctor_id': doctor_id,
+        'start_time': start_time,
+        'duration': duration,
+        'not_before': not_before,
+        'slot': f"{SLOT_MINUTES} minutes",
+        'day_start': f"{WORKDAY_START_HOUR} hours",
+        'day_end': f"{WORKDAY_END_HOUR} hours",
+    })
+    return dict(cursor.fetchall())
+
+
+def insert_appointments(cursor, rows):
+    """Вставка нескольких приёмов одним INSERT; rows в порядке APPOINTMENT_COLUMNS. Возвращает id"""
+    new_ids = execute_values(
+        cursor,
+        f"INSERT INTO appointment ({APPOINTMENT_COLUMNS}) VALUES %s RETURNING appointmentid",
+        rows,
+        fetch=True
+    )
+    return [row[0] for row in new_ids]
+
+
+def slot_index(value):
+    """Номер слота сетки, в который попадает время"""
+    return (value.hour * 60 + value.minute - WORKDAY_START_HOUR * 60) // SLOT_MINUTES
+
+
+def slot_time(index):
+    """Время начала слота с номером index"""
+    minutes = WORKDAY_START_HOUR * 60 + index * SLOT_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+
+def slot_count(start_time, end_time):
+    """Сколько слотов сетки занимает приём"""
+    minutes = (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
+    return max(-(-minutes // SLOT_MINUTES), 1)
+
+
+def busy_slots(rows):
+    """Множество занятых (ключ, дата, слот) по строкам (ключ, дата, начало, конец)"""
+    busy = set()
+    for key, appointment_date, start_time, end_time in rows:
+        first = slot_index(start_time)
+        for index in range(first, first + slot_count(start_time, end_time)):
+            busy.add((key, appointment_date, index))
+    return busy
+
+
+def plan_reschedule(cursor, doctor_id, date_from, date_to, target_doctor_id=None,
+                    target_date_from=None, target_date_to=None, not_before=None):
+    """План переноса назначенных приёмов врача за период без пересечений.
+
+    target_doctor_id — новый врач (по умолчанию тот же), target_date_from/target_date_to —
+    новые даты (по умолчанию тот же день: ближайшее к прежнему свободное время).
+    Занятость врача и пациентов читается двумя запросами, подбор идёт в памяти,
+    поэтому назначенные в плане слоты сразу считаются занятыми.
+
+    Возвращает (moves, unplaced): moves — [(appointmentid, пациент, старая дата, старое начало,
+    новый врач, новая дата, новое начало, новый конец)], unplaced — [(appointmentid, пациент, дата, начало)].
+    """
+    target_doctor_id = target_doctor_id or doctor_id
+    cursor.execute("""
+        SELECT a.appointmentid, a.patientid, a.appointmentdate, a.starttime, a.endtime,
+               p.lastname || ' ' || p.firstname || ' ' || COALESCE(p.midname, '')
+        FROM appointment a
+        LEFT JOIN patient p ON p.patientid = a.patientid
+        WHERE a.doctorid = %s
+        AND a.appointmentdate BETWEEN %s AND %s
+        AND a.status = 'Назначен'
+        ORDER BY a.appointmentdate, a.starttime
+    """, (doctor_id, date_from, date_to))
+    appointments = cursor.fetchall()
+    if not appointments:
+        return [], []
+
+    if target_date_from is not None:
+        days = [target_date_from + timedelta(days=i) for i in range((target_date_to - target_date_from).days + 1)]
+    else:
+        days = sorted({row[2] for row in appointments})
+    moved_ids = [row[0] for row in appointments]
+    patient_ids = list({row[1] for row in appointments if row[1] is not None})
+
+    # Занятость нового врача и самих пациентов в целевые дни (без переносимых приёмов)
+    cursor.execute("""
+        SELECT 'doctor', appointmentdate, starttime, endtime
+        FROM appointment
+        WHERE doctorid = %(doctor_id)s
+        AND appointmentdate BETWEEN %(first_day)s AND %(last_day)s
+        AND status != 'Отменён'
+        AND NOT appointmentid = ANY(%(moved_ids)s)
+        UNION ALL
+        SELECT patientid::text, appointmentdate, starttime, endtime
+        FROM appointment
+        WHERE patientid = ANY(%(patient_ids)s)
+        AND appointmentdate BETWEEN %(first_day)s AND %(last_day)s
+        AND status != 'Отменён'
+        AND NOT appointmentid = ANY(%(moved_ids)s)
+    """, {
+        'doctor_id': target_doctor_id, 'first_day': days[0], 'last_day': days[-1],
+        'moved_ids': moved_ids, 'patient_ids': patient_ids,
+    })
+    busy = busy_slots(cursor.fetchall())
+
+    def is_free(patient_id, day, first, length):
+        if first < 0 or first + length > SLOTS_PER_DAY:
+            return False
+        if not_before is not None and (day, slot_time(first)) < (not_before.date(), not_before.time()):
+            return False
+        return all(('doctor', day, i) not in busy and (str(patient_id), day, i) not in busy
+                   for i in range(first, first + length))
+
+    moves = []
+    unplaced = []
+    for appointment_id, patient_id, old_date, old_start, old_end, patient_name in appointments:
+        length = slot_count(old_start, old_end)
+        original = slot_index(old_start)
+        if target_date_from is not None:
+            # Другие даты: самое раннее свободное время в порядке исходного расписания
+            candidates = ((day, index) for day in days for index in range(SLOTS_PER_DAY))
+        else:
+            # Тот же день: сначала прежнее время, затем ближайшее к нему
+            order = sorted(range(SLOTS_PER_DAY), key=lambda index: (abs(index - original), index))
+            candidates = ((old_date, index) for index in order)
+        placed = next(((day, index) for day, index in candidates if is_free(patient_id, day, index, length)), None)
+        if placed is None:
+            unplaced.append((appointment_id, patient_name, old_date, old_start))
+            continue
+        day, index = placed
+        for i in range(index, index + length):
+            busy.add(('doctor', day, i))
+            busy.add((str(patient_id), day, i))
+        moves.append((appointment_id, patient_name, old_date, old_start,
+                      target_doctor_id, day, slot_time(index), slot_time(index + length)))
+    logging.debug(f"План переноса приемов врача {doctor_id}: {len(moves)} перенесено, {len(unplaced)} без места")
+    return moves, unplaced
+
+
+class StalePlanError(Exception):
+    """План переноса устарел: приёмы изменились после расчёта"""
+
+
+def apply_reschedule(cursor, moves):
+    """Применение плана переноса одним UPDATE ... FROM (VALUES ...); коммит делает вызывающий код.
+
+    План мог устареть, пока его просматривали, поэтому в той же транзакции переносимые приёмы
+    блокируются и проверяется, что они всё ещё назначены, а новые слоты врача свободны.
+    Иначе выбрасывается StalePlanError; транзакцию откатывает вызывающий код.
+    """
+    appointment_ids = [move[0] for move in moves]
+    cursor.execute("""
+        SELECT appointmentid
+        FROM appointment
+        WHERE appointmentid = ANY(%s)
+        AND status = 'Назначен'
+        ORDER BY appointmentid
+        FOR UPDATE
+    """, (appointment_ids,))
+    locked = len(cursor.fetchall())
+    if locked != len(moves):
+        raise StalePlanError(f"Отменены, удалены или изменены приёмов: {len(moves) - locked}")
+
+    execute_values(
+        cursor,
+        """
+        UPDATE appointment AS a
+        SET doctorid = v.doctorid, appointmentdate = v.appointmentdate,
+            starttime = v.starttime, endtime = v.endtime
+        FROM (VALUES %s) AS v (appointmentid, doctorid, appointmentdate, starttime, endtime)
+        WHERE a.appointmentid = v.appointmentid
+        AND a.status = 'Назначен'
+        """,
+        [(move[0], move[4], move[5], move[6], move[7]) for move in moves],
+        template="(%s, %s, %s::date, %s::time, %s::time)",
+        page_size=max(len(moves), 1)
+    )
+    if cursor.rowcount != len(moves):
+        raise StalePlanError(f"Перенесено {cursor.rowcount} из {len(moves)} приёмов")
+
+    # Проверка после UPDATE одним запросом по тому же списку VALUES: переносимые приёмы уже стоят
+    # на новых местах, поэтому сравниваются и между собой, и с приёмами, записанными после расчёта плана.
+    # Врач и пациент проверяются отдельными EXISTS — каждый по своему индексу (doctorid/patientid, дата)
+    conflicts = execute_values(
+        cursor,
+        """
+        SELECT v.appointmentdate, v.starttime,
+               EXISTS (
+                   SELECT 1 FROM appointment a
+                   WHERE a.doctorid = v.doctorid AND a.appointmentdate = v.appointmentdate
+                   AND a.appointmentid != v.appointmentid AND a.status != 'Отменён'
+                   AND a.starttime < v.endtime AND a.endtime > v.starttime
+               ) AS doctor_busy
+        FROM (VALUES %s) AS v (appointmentid, doctorid, appointmentdate, starttime, endtime)
+        JOIN appointment m ON m.appointmentid = v.appointmentid
+        WHERE EXISTS (
+            SELECT 1 FROM appointment a
+            WHERE a.doctorid = v.doctorid AND a.appointmentdate = v.appointmentdate
+            AND a.appointmentid != v.appointmentid AND a.status != 'Отменён'
+            AND a.starttime < v.endtime AND a.endtime > v.starttime
+        ) OR EXISTS (
+            SELECT 1 FROM appointment a
+            WHERE a.patientid = m.patientid AND a.appointmentdate = v.appointmentdate
+            AND a.appointmentid != v.appointmentid AND a.status != 'Отменён'
+            AND a.starttime < v.endtime AND a.endtime > v.starttime
+        )
+        ORDER BY v.appointmentdate, v.starttime
+        LIMIT 1
+        """,
+        [(move[0], move[4], move[5], move[6], move[7]) for move in moves],
+        template="(%s, %s, %s::date, %s::time, %s::time)",
+        page_size=max(len(moves), 1),
+        fetch=True
+    )
+    if conflicts:
+        day, start_time, doctor_busy = conflicts[0]
+        who = "врача" if doctor_busy else "пациента"
+        raise StalePlanError(f"Время {day:%d.%m.%Y} {start_time:%H:%M} у {who} уже занято")
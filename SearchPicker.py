@@ -0,0 +1,105 @@
+import time
+import logging
+from collections import OrderedDict
+
+from PyQt6.QtWidgets import QComboBox, QCompleter
+from PyQt6.QtCore import Qt, QTimer
+
+SEARCH_DEBOUNCE_MS = 250
+
+
+class LRUCache:
+    """Небольшой LRU-кэш результатов поиска с ограничением по времени жизни"""
+
+    def __init__(self, maxsize=128, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.items = OrderedDict()
+
+    def get(self, key):
+        entry = self.items.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self.items[key]
+            return None
+        self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.items[key] = (time.monotonic(), value)
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+
+
+class SearchPicker(QComboBox):
+    """Редактируемый комбобокс, который подгружает варианты с сервера по мере ввода.
+
+    search_func(text) возвращает список (id, подпись, доп. данные); в списке
+    комбобокса хранятся только последние найденные варианты.
+    """
+
+    def __init__(self, search_func, placeholder="", min_chars=2, parent=None):
+        super().__init__(parent)
+        self.search_func = search_func
+        self.min_chars = min_chars
+        self.setEditable(True)
+        self.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        self.lineEdit().setPlaceholderText(placeholder)
+
+        completer = QCompleter(self.model(), self)
+        completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.setCompleter(completer)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.run_search)
+        self.lineEdit().textEdited.connect(self.search_timer.start)
+
+    def run_search(self):
+        text = self.lineEdit().text().strip()
+        if len(text) < self.min_chars:
+            return
+        try:
+            results = self.search_func(text)
+        except Exception as e:
+            logging.error(f"Ошибка поиска '{text}': {str(e)}")
+            return
+        self.set_items(results)
+        self.lineEdit().setText(text)
+        if results:
+            self.completer().complete()
+
+    def set_items(self, results):
+        self.blockSignals(True)
+        self.clear()
+        for item_id, label, extra in results:
+            self.addItem(label, (item_id, extra))
+        self.setCurrentIndex(-1)
+        self.blockSignals(False)
+
+    def set_current(self, item_id, label, extra=None):
+        """Выбор заранее известного значения без обращения к серверу"""
+        self.set_items([(item_id, label, extra)])
+        self.setCurrentIndex(0)
+
+    def current_entry(self):
+        """(id, доп. данные) выбранного варианта или None, если текст не совпадает ни с одним вариантом"""
+        index = self.currentIndex()
+        if index < 0 or self.itemText(index) != self.currentText():
+            index = self.findText(self.currentText())
+            if index < 0:
+                return None
+            self.setCurrentIndex(index)
+        return self.itemData(index)
+
+    def current_id(self):
+        entry = self.current_entry()
+        return entry[0] if entry else None
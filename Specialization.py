@@ -1,5 +1,6 @@
 import sys
-import psycopg2
+import logging
+from Database import connect
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout,
     QHBoxLayout, QLabel, QPushButton, QTableWidget,
@@ -7,10 +8,14 @@ from PyQt6.QtWidgets import (
     QHeaderView, QDialog, QFormLayout
 )
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor, QPalette,QIcon
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme, set_variant, VARIANT_GRID
+from LogConfig import setup_logging
 
 
 class SpecializationApp(QMainWindow):
+    CHANGE_TABLES = ("specialization",)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Медицинская информационная система - Специализации")
@@ -24,64 +29,6 @@ class SpecializationApp(QMainWindow):
         self.med_white = QColor(255, 255, 255)  # Белый
         self.med_red = QColor(200, 16, 46)  # Для предупреждений
 
-        # Установка стиля приложения
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {self.med_light.name()};
-            }}
-            QTableWidget {{
-                background-color: {self.med_white.name()};
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                gridline-color: #d1d8e0;
-                font-size: 14px;
-            }}
-            QTableWidget::item {{
-                padding: 8px;
-            }}
-            QHeaderView::section {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                padding: 8px;
-                border: none;
-                font-weight: bold;
-            }}
-            QPushButton {{
-                background-color: {self.med_blue.name()};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px 15px;
-                font-size: 14px;
-                min-width: 100px;
-            }}
-            QPushButton:hover {{
-                background-color: {self.med_blue.darker(110).name()};
-            }}
-            QPushButton:pressed {{
-                background-color: {self.med_blue.darker(120).name()};
-            }}
-            QPushButton:disabled {{
-                background-color: #cccccc;
-            }}
-            QLineEdit {{
-                border: 1px solid #d1d8e0;
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-            }}
-            QDialog {{
-                background-color: {self.med_light.name()};
-            }}
-        """)
-
-        # Настройка цветовой палитры
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Window, self.med_light)
-        palette.setColor(QPalette.ColorRole.Base, self.med_white)
-        palette.setColor(QPalette.ColorRole.Highlight, self.med_blue)
-        self.setPalette(palette)
-
         self.conn = None
         self.cursor = None
         self.connect_to_db()
@@ -91,12 +38,7 @@ class SpecializationApp(QMainWindow):
     def connect_to_db(self):
         """Подключение к базе данных"""
         try:
-            self.conn = psycopg2.connect(
-                dbname='Practice',
-                user='postgres',
-                password='123',
-                host='localhost'
-            )
+            self.conn = connect()
             self.cursor = self.conn.cursor()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {str(e)}")
@@ -112,14 +54,7 @@ class SpecializationApp(QMainWindow):
 
         # Заголовок
         title_label = QLabel("Управление медицинскими специализациями")
-        title_label.setStyleSheet(f"""
-            QLabel {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {self.med_blue.name()};
-                padding: 10px;
-            }}
-        """)
+        title_label.setObjectName("title")
         layout.addWidget(title_label)
 
         # Кнопки управления
@@ -152,24 +87,7 @@ class SpecializationApp(QMainWindow):
         self.table.setColumnHidden(0, True)  # Скрываем столбец ID
 
         # Настройка границ и внешнего вида таблицы
-        self.table.setStyleSheet("""
-                    QTableWidget {
-                        border: 1px solid #c0c0c0;
-                        gridline-color: #c0c0c0;
-                    }
-                    QHeaderView::section {
-                        background-color: #006DB0;
-                        color: white;
-                        padding: 8px;
-                        border: 1px solid #c0c0c0;
-                        font-weight: bold;
-                    }
-                    QTableWidget::item {
-                        border-right: 1px solid #c0c0c0;
-                        border-bottom: 1px solid #c0c0c0;
-                        padding: 8px;
-                    }
-                """)
+        set_variant(self.table, VARIANT_GRID)
 
         # Настройка размеров столбцов
         header = self.table.horizontalHeader()
@@ -185,11 +103,6 @@ class SpecializationApp(QMainWindow):
 
         # Альтернативные цвета строк
         self.table.setAlternatingRowColors(True)
-        self.table.setStyleSheet("""
-                    QTableWidget {
-                        alternate-background-color: #f5f5f5;
-                    }
-                """)
 
         layout.addLayout(btn_layout)
         layout.addWidget(self.table)
@@ -197,7 +110,7 @@ class SpecializationApp(QMainWindow):
     def load_data(self):
         """Загрузка данных из таблицы specialization"""
         if not hasattr(self, 'cursor') or not self.cursor:
-            print("Курсор не инициализирован")
+            logging.error("Курсор не инициализирован")
             return
 
         try:
@@ -220,10 +133,10 @@ class SpecializationApp(QMainWindow):
 
                     self.table.setItem(row_idx, col_idx, item)
 
-            print(f"Загружено {len(data)} записей")
+            logging.debug(f"Загружено {len(data)} записей")
 
         except Exception as e:
-            print(f"Ошибка при загрузке данных: {e}")
+            logging.error(f"Ошибка при загрузке данных: {str(e)}")
             QMessageBox.critical(
                 self,
                 "Ошибка загрузки",
@@ -451,7 +364,9 @@ class SpecializationApp(QMainWindow):
 
 
 if __name__ == "__main__":
+    setup_logging()
     app = QApplication(sys.argv)
+    apply_theme(app)
 
     # Установка стиля для всего приложения
     app.setStyle("Fusion")
@@ -0,0 +1,142 @@
+from PyQt6.QtGui import QColor, QPalette
+
+# Медицинская цветовая схема
+MED_BLUE = QColor(0, 109, 176)  # Основной синий цвет
+MED_LIGHT = QColor(229, 243, 255)  # Светлый фон
+MED_WHITE = QColor(255, 255, 255)  # Белый
+MED_RED = QColor(200, 16, 46)  # Для предупреждений
+
+# Окна и диалоги выбирают вариант оформления свойством variant (см. set_variant)
+VARIANT_MENU = "menu"  # главное меню: крупные кнопки
+VARIANT_CLIENT = "client"  # окно пациента: крупные кнопки поуже
+VARIANT_FORM = "form"  # окна входа, регистрации и смены пароля
+VARIANT_GRID = "grid"  # таблицы справочников: рамка у каждой ячейки
+VARIANT_GRID_COMPACT = "grid-compact"  # то же с уменьшенными отступами (врачи, пациенты, мед. карты)
+
+# Таблица стилей строится один раз и применяется ко всему приложению (apply_theme),
+# поэтому Qt разбирает её однажды, а не при создании каждого окна
+STYLESHEET = f"""
+    QMainWindow, QDialog {{
+        background-color: {MED_LIGHT.name()};
+    }}
+    QLabel#title {{
+        font-size: 18px;
+        font-weight: bold;
+        color: {MED_BLUE.name()};
+        padding: 10px;
+    }}
+    QTableView {{
+        background-color: {MED_WHITE.name()};
+        alternate-background-color: #f5f5f5;
+        border: 1px solid #d1d8e0;
+        border-radius: 5px;
+        gridline-color: #d1d8e0;
+        font-size: 14px;
+    }}
+    QTableView::item {{
+        padding: 8px;
+    }}
+    QHeaderView::section {{
+        background-color: {MED_BLUE.name()};
+        color: white;
+        padding: 8px;
+        border: none;
+        font-weight: bold;
+    }}
+    QPushButton {{
+        background-color: {MED_BLUE.name()};
+        color: white;
+        border: none;
+        border-radius: 5px;
+        padding: 10px 15px;
+        font-size: 14px;
+        min-width: 100px;
+    }}
+    QPushButton:hover {{
+        background-color: {MED_BLUE.darker(110).name()};
+    }}
+    QPushButton:pressed {{
+        background-color: {MED_BLUE.darker(120).name()};
+    }}
+    QPushButton:disabled {{
+        background-color: #cccccc;
+    }}
+    QLineEdit, QDateEdit, QTimeEdit, QComboBox {{
+        border: 1px solid #d1d8e0;
+        border-radius: 5px;
+        padding: 8px;
+        font-size: 14px;
+        max-width: 300px;
+    }}
+    QLineEdit[readOnly="true"] {{
+        background-color: #f0f0f0;
+    }}
+
+    *[variant="{VARIANT_MENU}"] QPushButton {{
+        padding: 15px 20px;
+        font-size: 16px;
+        min-width: 200px;
+    }}
+    *[variant="{VARIANT_CLIENT}"] QPushButton {{
+        padding: 15px 20px;
+        font-size: 16px;
+        min-width: 150px;
+    }}
+
+    QTableView[variant="{VARIANT_GRID}"], QTableView[variant="{VARIANT_GRID_COMPACT}"] {{
+        border: 1px solid #c0c0c0;
+        gridline-color: #c0c0c0;
+    }}
+    QTableView[variant="{VARIANT_GRID}"] QHeaderView::section,
+    QTableView[variant="{VARIANT_GRID_COMPACT}"] QHeaderView::section {{
+        border: 1px solid #c0c0c0;
+    }}
+    QTableView[variant="{VARIANT_GRID}"]::item, QTableView[variant="{VARIANT_GRID_COMPACT}"]::item {{
+        border-right: 1px solid #c0c0c0;
+        border-bottom: 1px solid #c0c0c0;
+    }}
+    QTableView[variant="{VARIANT_GRID_COMPACT}"] QHeaderView::section,
+    QTableView[variant="{VARIANT_GRID_COMPACT}"]::item {{
+        padding: 5px;
+    }}
+
+    *[variant="{VARIANT_FORM}"] QLineEdit,
+    *[variant="{VARIANT_FORM}"] QDateEdit,
+    *[variant="{VARIANT_FORM}"] QComboBox {{
+        border: 1px solid {MED_BLUE.name()};
+        border-radius: 4px;
+        min-width: 200px;
+        max-width: 16777215px;
+        background-color: white;
+    }}
+    *[variant="{VARIANT_FORM}"] QPushButton {{
+        border-radius: 4px;
+        padding: 10px;
+        min-width: 0px;
+    }}
+    *[variant="{VARIANT_FORM}"] QPushButton:hover {{
+        background-color: #005A9C;
+    }}
+    *[variant="{VARIANT_FORM}"] QPushButton:pressed {{
+        background-color: #004080;
+    }}
+    *[variant="{VARIANT_FORM}"] QLabel {{
+        font-size: 14px;
+        color: {MED_BLUE.name()};
+    }}
+"""
+
+
+def apply_theme(app):
+    """Таблица стилей и палитра для всего приложения; вызывается один раз после создания QApplication"""
+    app.setStyleSheet(STYLESHEET)
+    palette = app.palette()
+    palette.setColor(QPalette.ColorRole.Window, MED_LIGHT)
+    palette.setColor(QPalette.ColorRole.Base, MED_WHITE)
+    palette.setColor(QPalette.ColorRole.Highlight, MED_BLUE)
+    app.setPalette(palette)
+
+
+def set_variant(widget, variant):
+    """Вариант оформления окна; задаётся до создания дочерних виджетов"""
+    widget.setProperty("variant", variant)
@@ -0,0 +1,397 @@
+import sys
+import time
+import logging
+from Database import connect
+from PyQt6.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout,
+    QHBoxLayout, QLabel, QPushButton, QTableWidget,
+    QTableWidgetItem, QMessageBox, QHeaderView, QDialog,
+    QFormLayout, QComboBox, QDateEdit, QSpinBox
+)
+from PyQt6.QtCore import Qt, QDate
+from PyQt6.QtGui import QColor, QIcon
+from Theme import apply_theme
+from LogConfig import setup_logging
+
+from Config import config
+from Scheduling import count_overlaps
+from SearchPicker import SearchPicker
+from PatientSearch import search_patients
+from Formatting import format_date, format_datetime
+
+STATUS_WAITING = 'Ожидает'
+STATUS_BOOKED = 'Записан'
+STATUS_REMOVED = 'Снят'
+
+# True — освободившееся время сразу отдаётся первому подходящему пациенту,
+# False — администратору предлагается подтвердить запись
+WAITLIST_AUTO_BOOK = config.getboolean('waitlist', 'auto_book', fallback=False)
+
+# Один запрос на освободившийся слот: ожидающие этого врача или любого врача его специализации
+# (частичные индексы waitlist_*_match_idx из Migrations.py), без пациентов, занятых в это время
+MATCH_QUERY = """
+    SELECT w.waitlistid, w.patientid, p.medicalcardid,
+           p.lastname || ' ' || p.firstname || ' ' || COALESCE(p.midname, '') AS patient_name
+    FROM waitlist w
+    JOIN patient p ON p.patientid = w.patientid
+    WHERE w.status = 'Ожидает'
+    AND %(date)s BETWEEN w.datefrom AND w.dateto
+    AND (%(waitlist_id)s::integer IS NULL OR w.waitlistid = %(waitlist_id)s)
+    AND w.waitlistid <> ALL (%(exclude)s::integer[])
+    AND (
+        w.doctorid = %(doctor_id)s OR
+        (w.doctorid IS NULL AND w.specializationid = (
+            SELECT specializationid FROM doctor WHERE doctorid = %(doctor_id)s
+        ))
+    )
+    AND NOT EXISTS (
+        SELECT 1
+        FROM appointment a
+        WHERE a.patientid = w.patientid
+        AND a.appointmentdate = %(date)s
+        AND a.status != 'Отменён'
+        AND a.starttime < %(end)s AND a.endtime > %(start)s
+    )
+    ORDER BY w.priority DESC, w.createdat
+    LIMIT 1
+    FOR UPDATE OF w SKIP LOCKED
+"""
+
+
+def find_waitlist_match(cursor, doctor_id, appointment_date, start_time, end_time, exclude=(), waitlist_id=None):
+    """Лучший ожидающий пациент для слота: (waitlistid, patientid, medicalcardid, ФИО) или None.
+
+    exclude — записи листа, уже предложенные на другие слоты; waitlist_id — повторная проверка
+    одной записи перед записью на приём.
+    """
+    cursor.execute(MATCH_QUERY, {
+        'doctor_id': doctor_id, 'date': appointment_date, 'start': start_time, 'end': end_time,
+        'exclude': list(exclude), 'waitlist_id': waitlist_id,
+    })
+    return cursor.fetchone()
+
+
+def book_from_waitlist(cursor, match, doctor_id, appointment_date, start_time, end_time):
+    """Запись пациента из листа ожидания на слот; возвращает id нового приёма"""
+    waitlist_id, patient_id, medical_card_id, _ = match
+    cursor.execute("""
+        INSERT INTO appointment
+        (patientid, medicalcardid, doctorid, appointmentdate, starttime, endtime, status, appointmentprice)
+        SELECT %s, %s, d.doctorid, %s, %s, %s, 'Назначен', pr.price
+        FROM doctor d
+        LEFT JOIN price pr ON d.priceid = pr.priceid
+        WHERE d.doctorid = %s
+        RETURNING appointmentid
+    """, (patient_id, medical_card_id, appointment_date, start_time, end_time, doctor_id))
+    appointment_id = cursor.fetchone()[0]
+    cursor.execute(
+        "UPDATE waitlist SET status = %s, appointmentid = %s, appointmentdate = %s WHERE waitlistid = %s",
+        (STATUS_BOOKED, appointment_id, appointment_date, waitlist_id))
+    return appointment_id
+
+
+def backfill_slots(cursor, slots):
+    """Автозапись из листа ожидания на освободившиеся слоты [(doctorid, дата, начало, конец)].
+
+    Каждый слот — один индексный запрос подбора; записанные пациенты сразу выбывают
+    из следующих подборов. Коммит делает вызывающий код.
+    Возвращает [(слот, найденный пациент, id приёма)] для заполненных слотов.
+    """
+    started = time.perf_counter()
+    booked = []
+    for doctor_id, appointment_date, start_time, end_time in slots:
+        if count_overlaps(cursor, doctor_id, appointment_date, start_time, end_time) > 0:
+            continue
+        match = find_waitlist_match(cursor, doctor_id, appointment_date, start_time, end_time)
+        if match is None:
+            continue
+        appointment_id = book_from_waitlist(cursor, match, doctor_id, appointment_date, start_time, end_time)
+        booked.append(((doctor_id, appointment_date, start_time, end_time), match, appointment_id))
+    elapsed = time.perf_counter() - started
+    logging.debug(f"Лист ожидания: {len(booked)} из {len(slots)} слотов заполнено за {elapsed:.3f} с "
+                  f"({len(slots) / elapsed if elapsed else 0:.0f} слотов/с)")
+    return booked
+
+
+def offer_backfill(parent, conn, slots):
+    """Заполнение освободившихся слотов из листа ожидания после отмены.
+
+    При WAITLIST_AUTO_BOOK запись делается сразу, иначе по каждому слоту спрашивается подтверждение.
+    Пока открыт вопрос, транзакция не держится: кандидаты подбираются и транзакция завершается,
+    а подтверждённая запись делается в новой короткой транзакции с повторной проверкой слота.
+    Возвращает количество созданных приёмов.
+    """
+    cursor = conn.cursor()
+    try:
+        if WAITLIST_AUTO_BOOK:
+            booked = backfill_slots(cursor, slots)
+            conn.commit()
+            if booked:
+                names = "\n".join(f"{match[3]} — {slot[1]} {str(slot[2])[:5]}" for slot, match, _ in booked)
+                QMessageBox.information(parent, "Лист ожидания", f"Освободившееся время занято:\n{names}")
+            return len(booked)
+
+        candidates = []
+        for slot in slots:
+            if count_overlaps(cursor, *slot) > 0:
+                continue
+            match = find_waitlist_match(cursor, *slot, exclude=[match[0] for _, match in candidates])
+            if match is not None:
+                candidates.append((slot, match))
+        conn.rollback()
+
+        booked = 0
+        for slot, match in candidates:
+            doctor_id, appointment_date, start_time, end_time = slot
+            reply = QMessageBox.question(
+                parent, "Лист ожидания",
+                f"Пациент {match[3]} ждёт приёма.\n"
+                f"Записать его на освободившееся время {appointment_date} {str(start_time)[:5]}?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply != QMessageBox.StandardButton.Yes:
+                continue
+            # За время вопроса слот могли занять, а пациента — записать или снять с листа
+            waitlist_id, match = match[0], None
+            if count_overlaps(cursor, *slot) == 0:
+                match = find_waitlist_match(cursor, *slot, waitlist_id=waitlist_id)
+            if match is None:
+                conn.rollback()
+                QMessageBox.information(parent, "Лист ожидания",
+                                        "Время уже занято или пациент больше не ждёт приёма")
+                continue
+            book_from_waitlist(cursor, match, doctor_id, appointment_date, start_time, end_time)
+            conn.commit()
+            booked += 1
+        return booked
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Ошибка при подборе пациента из листа ожидания: {str(e)}")
+        QMessageBox.warning(parent, "Ошибка", f"Не удалось записать пациента из листа ожидания: {str(e)}")
+        return 0
+    finally:
+        cursor.close()
+
+
+class WaitlistApp(QMainWindow):
+    CHANGE_TABLES = ("waitlist", "patient", "doctor", "specialization")
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Медицинская информационная система - Лист ожидания")
+        self.setGeometry(100, 100, 1100, 650)
+        self.setWindowIcon(QIcon('icon.jpg'))
+
+        # Медицинская цветовая схема
+        self.med_blue = QColor(0, 109, 176)  # Основной синий цвет
+        self.med_light = QColor(229, 243, 255)  # Светлый фон
+        self.med_white = QColor(255, 255, 255)  # Белый
+
+        self.conn = None
+        self.cursor = None
+        self.connect_to_db()
+        self.setup_ui()
+        self.load_data()
+
+    def connect_to_db(self):
+        """Подключение к базе данных"""
+        try:
+            self.conn = connect()
+            self.cursor = self.conn.cursor()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {str(e)}")
+            sys.exit(1)
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса"""
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout(central_widget)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        title_label = QLabel("Лист ожидания")
+        title_label.setObjectName("title")
+        layout.addWidget(title_label)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.setSpacing(10)
+        self.add_btn = QPushButton("Добавить")
+        self.remove_btn = QPushButton("Снять с ожидания")
+        self.refresh_btn = QPushButton("Обновить")
+        for btn in [self.add_btn, self.remove_btn, self.refresh_btn]:
+            btn.setCursor(Qt.CursorShape.PointingHandCursor)
+            btn_layout.addWidget(btn)
+        self.add_btn.clicked.connect(self.show_add_dialog)
+        self.remove_btn.clicked.connect(self.remove_entry)
+        self.refresh_btn.clicked.connect(self.load_data)
+        layout.addLayout(btn_layout)
+
+        self.table = QTableWidget()
+        headers = ["ID", "Пациент", "Врач", "Специализация", "С", "По", "Приоритет", "Добавлен"]
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setColumnHidden(0, True)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setAlternatingRowColors(True)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+
+    def load_data(self):
+        """Загрузка ожидающих пациентов в порядке очереди"""
+        try:
+            self.cursor.execute("""
+                SELECT w.waitlistid,
+                       p.lastname || ' ' || p.firstname || ' ' || COALESCE(p.midname, ''),
+                       d.secondname || ' ' || d.firstname || ' ' || COALESCE(d.midname, ''),
+                       COALESCE(s.specializationname, ds.specializationname),
+                       w.datefrom, w.dateto, w.priority, w.createdat
+                FROM waitlist w
+                JOIN patient p ON p.patientid = w.patientid
+                LEFT JOIN doctor d ON d.doctorid = w.doctorid
+                LEFT JOIN specialization s ON s.specializationid = w.specializationid
+                LEFT JOIN specialization ds ON ds.specializationid = d.specializationid
+                WHERE w.status = %s
+                ORDER BY w.priority DESC, w.createdat
+            """, (STATUS_WAITING,))
+            data = self.cursor.fetchall()
+            self.table.setRowCount(len(data))
+            for row_idx, row in enumerate(data):
+                for col_idx, value in enumerate(row):
+                    if col_idx == 2 and value is None:
+                        value = "Любой врач"
+                    elif col_idx in (4, 5):
+                        value = format_date(value)
+                    elif col_idx == 7:
+                        value = format_datetime(value)
+                    item = QTableWidgetItem(str(value) if value is not None else "")
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                    self.table.setItem(row_idx, col_idx, item)
+            logging.debug(f"Загружено {len(data)} записей листа ожидания")
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Ошибка при загрузке листа ожидания: {str(e)}")
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить лист ожидания:\n{str(e)}")
+
+    def show_add_dialog(self):
+        """Диалог постановки пациента в лист ожидания"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Добавить в лист ожидания")
+        dialog.setFixedSize(500, 400)
+
+        layout = QFormLayout(dialog)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        patient_combo = SearchPicker(lambda text: search_patients(self.cursor, text),
+                                     placeholder="Начните вводить ФИО или телефон")
+
+        doctor_combo = QComboBox()
+        doctor_combo.addItem("Любой врач специализации", None)
+        specialization_combo = QComboBox()
+        specialization_combo.addItem("Не выбрано", None)
+        try:
+            self.cursor.execute("""
+                SELECT doctorid, secondname || ' ' || firstname || ' ' || COALESCE(midname, '')
+                FROM doctor ORDER BY secondname, firstname
+            """)
+            for doctor_id, doctor_name in self.cursor.fetchall():
+                doctor_combo.addItem(doctor_name, doctor_id)
+            self.cursor.execute("SELECT specializationid, specializationname FROM specialization ORDER BY specializationname")
+            for specialization_id, specialization_name in self.cursor.fetchall():
+                specialization_combo.addItem(specialization_name, specialization_id)
+        except Exception as e:
+            self.conn.rollback()
+            QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить врачей и специализации: {str(e)}")
+
+        date_from_input = QDateEdit(QDate.currentDate())
+        date_from_input.setDisplayFormat("dd.MM.yyyy")
+        date_from_input.setCalendarPopup(True)
+        date_to_input = QDateEdit(QDate.currentDate().addDays(14))
+        date_to_input.setDisplayFormat("dd.MM.yyyy")
+        date_to_input.setCalendarPopup(True)
+
+        priority_input = QSpinBox()
+        priority_input.setRange(0, 10)
+
+        btn_box = QHBoxLayout()
+        btn_box.setSpacing(10)
+        ok_btn = QPushButton("Добавить")
+        cancel_btn = QPushButton("Отмена")
+        btn_box.addWidget(ok_btn)
+        btn_box.addWidget(cancel_btn)
+
+        layout.addRow("Пациент:", patient_combo)
+        layout.addRow("Врач:", doctor_combo)
+        layout.addRow("Специализация:", specialization_combo)
+        layout.addRow("С:", date_from_input)
+        layout.addRow("По:", date_to_input)
+        layout.addRow("Приоритет:", priority_input)
+        layout.addRow(btn_box)
+
+        def add_entry():
+            patient_id = patient_combo.current_id()
+            doctor_id = doctor_combo.currentData()
+            specialization_id = specialization_combo.currentData()
+            if patient_id is None:
+                QMessageBox.warning(dialog, "Ошибка", "Выберите пациента")
+                return
+            if doctor_id is None and specialization_id is None:
+                QMessageBox.warning(dialog, "Ошибка", "Выберите врача или специализацию")
+                return
+            if date_from_input.date() > date_to_input.date():
+                QMessageBox.warning(dialog, "Ошибка", "Начальная дата не может быть позже конечной")
+                return
+            try:
+                self.cursor.execute("""
+                    INSERT INTO waitlist (patientid, doctorid, specializationid, datefrom, dateto, priority)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (patient_id, doctor_id, specialization_id if doctor_id is None else None,
+                      date_from_input.date().toString("yyyy-MM-dd"), date_to_input.date().toString("yyyy-MM-dd"),
+                      priority_input.value()))
+                self.conn.commit()
+                dialog.close()
+                self.load_data()
+            except Exception as e:
+                self.conn.rollback()
+                QMessageBox.critical(dialog, "Ошибка", f"Не удалось добавить в лист ожидания:\n{str(e)}")
+
+        ok_btn.clicked.connect(add_entry)
+        cancel_btn.clicked.connect(dialog.close)
+
+        dialog.exec()
+
+    def remove_entry(self):
+        """Снятие выбранного пациента с ожидания"""
+        selected_items = self.table.selectedItems()
+        if not selected_items:
+            QMessageBox.warning(self, "Ошибка", "Выберите запись листа ожидания")
+            return
+        row = selected_items[0].row()
+        waitlist_id = int(self.table.item(row, 0).text())
+        try:
+            self.cursor.execute("UPDATE waitlist SET status = %s WHERE waitlistid = %s", (STATUS_REMOVED, waitlist_id))
+            self.conn.commit()
+            self.table.removeRow(row)
+        except Exception as e:
+            self.conn.rollback()
+            QMessageBox.critical(self, "Ошибка", f"Не удалось снять с ожидания:\n{str(e)}")
+
+    def closeEvent(self, event):
+        """Обработчик закрытия окна"""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.close()
+        event.accept()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    app = QApplication(sys.argv)
+    apply_theme(app)
+    app.setStyle("Fusion")
+    window = WaitlistApp()
+    window.show()
+    sys.exit(app.exec())
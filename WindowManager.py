@@ -0,0 +1,224 @@
+import time
+import logging
+from collections import OrderedDict
+
+from PyQt6.QtCore import QObject, QEvent, QTimer, QAbstractProxyModel
+from PyQt6.QtWidgets import QAbstractItemView
+
+from Config import config
+from QueryRunner import is_busy, run_cancellable, QueryBusy, QueryCancelled
+
+# Закрытое пользователем окно не уничтожается, а скрывается вместе с соединением и моделью,
+# поэтому повторное открытие из меню — это show() и дочитывание того, что изменилось, пока окно
+# было скрыто. Скрытые окна ограничены числом (MAX_HIDDEN_WINDOWS) и общим числом ячеек
+# в их таблицах (MAX_HIDDEN_CELLS) — основной памятью окна; давно не открывавшиеся закрываются.
+MAX_HIDDEN_WINDOWS = config.getint('windows', 'max_hidden_windows', fallback=4)
+MAX_HIDDEN_CELLS = config.getint('windows', 'max_hidden_cells', fallback=500000)
+IDLE_TIMEOUT = config.getint('windows', 'idle_timeout', fallback=10 * 60)
+EVICTION_CHECK_MS = 60 * 1000
+
+# Изменения за время скрытия берутся из audit_log (миграция 007_audit_log) по номеру записи:
+# окно объявляет CHANGE_TABLES — таблицы, от которых зависит его содержимое. Если изменений
+# больше CHANGE_LIMIT, окно перечитывается целиком. Запись транзакции, начатой до скрытия
+# и зафиксированной после, может получить меньший номер; такие строки подтянет кнопка "Обновить".
+CHANGE_LIMIT = 1000
+
+
+def connect_global(window, signal, slot):
+    """Подключение окна к сигналу общего объекта приложения (офлайн-очередь, реплика).
+
+    Такие соединения переживают окно, поэтому они запоминаются и снимаются
+    disconnect_global — при закрытии окна и при вытеснении скрытого окна.
+    """
+    signal.connect(slot)
+    if not hasattr(window, 'global_connections'):
+        window.global_connections = []
+    window.global_connections.append((signal, slot))
+
+
+def disconnect_global(window):
+    for signal, slot in getattr(window, 'global_connections', []):
+        try:
+            signal.disconnect(slot)
+        except TypeError:
+            pass
+    window.global_connections = []
+
+
+def window_cells(window):
+    """Число ячеек в моделях таблиц окна (для прокси — в исходной модели)"""
+    models = set()
+    for view in window.findChildren(QAbstractItemView):
+        model = view.model()
+        while isinstance(model, QAbstractProxyModel):
+            model = model.sourceModel()
+        if model is not None:
+            models.add(model)
+    return sum(model.rowCount() * model.columnCount() for model in models)
+
+
+def change_watermark(conn):
+    """Номер последней записи журнала изменений"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(auditid), 0) FROM audit_log")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        # Скрытое окно не держит открытую транзакцию
+        conn.rollback()
+
+
+def fetch_changes(cursor, watermark, tables):
+    """{таблица: {id строки}} после записи watermark или None, если изменений больше CHANGE_LIMIT"""
+    cursor.execute(
+        "SELECT tablename, rowid FROM audit_log WHERE auditid > %s AND tablename = ANY(%s) LIMIT %s",
+        (watermark, list(tables), CHANGE_LIMIT + 1)
+    )
+    rows = cursor.fetchall()
+    if len(rows) > CHANGE_LIMIT:
+        return None
+    changes = {}
+    for table, row_id in rows:
+        changes.setdefault(table, set()).add(row_id)
+    return changes
+
+
+class WindowManager(QObject):
+    """Окна, открытые из главного меню, по ключу; вытеснение скрытых окон по LRU"""
+
+    def __init__(self, parent=None, max_hidden_windows=MAX_HIDDEN_WINDOWS, max_hidden_cells=MAX_HIDDEN_CELLS,
+                 idle_timeout=IDLE_TIMEOUT):
+        super().__init__(parent)
+        self.max_hidden_windows = max_hidden_windows
+        self.max_hidden_cells = max_hidden_cells
+        self.idle_timeout = idle_timeout
+        # Порядок ключей — от давно открывавшихся окон к недавним
+        self.windows = OrderedDict()
+        self.hidden_at = {}
+        # Номер записи audit_log на момент скрытия окна; None — окно перечитывается целиком
+        self.watermarks = {}
+
+        self.eviction_timer = QTimer(self)
+        self.eviction_timer.timeout.connect(self.evict_idle)
+        self.eviction_timer.start(EVICTION_CHECK_MS)
+
+    def open(self, key, factory):
+        """Показ окна key; factory() создаёт окно, если его ещё нет или оно было вытеснено"""
+        window = self.windows.get(key)
+        if window is None:
+            window = factory()
+            window.installEventFilter(self)
+            self.windows[key] = window
+            logging.debug(f"Создано окно {key}")
+        else:
+            self.windows.move_to_end(key)
+            if self.hidden_at.pop(key, None) is not None:
+                # Данные обновляются после показа, чтобы окно появилось сразу
+                QTimer.singleShot(0, lambda: self.refresh(key))
+                logging.debug(f"Повторно открыто окно {key}")
+        window.show()
+        window.raise_()
+        window.activateWindow()
+        return window
+
+    def refresh(self, key):
+        """Обновление повторно открытого окна: только если за время скрытия что-то изменилось.
+
+        Окно с методом apply_changes(changes) получает изменённые id и дочитывает только их,
+        остальные перечитываются через load_data.
+        """
+        window = self.windows.get(key)
+        watermark = self.watermarks.pop(key, None)
+        if window is None or not hasattr(window, "load_data"):
+            return
+        changes = None
+        if watermark is not None:
+            try:
+                changes = run_cancellable(
+                    window, window.conn, lambda cursor: fetch_changes(cursor, watermark, window.CHANGE_TABLES),
+                    "Проверка изменений..."
+                )
+            except (QueryBusy, QueryCancelled):
+                return
+            except Exception as e:
+                logging.warning(f"Не удалось получить изменения для окна {key}: {str(e)}")
+        try:
+            if changes is None:
+                window.load_data()
+            elif not changes:
+                logging.debug(f"Окно {key}: изменений нет")
+            elif hasattr(window, "apply_changes"):
+                logging.debug(f"Окно {key}: изменения в {', '.join(sorted(changes))}")
+                window.apply_changes(changes)
+            else:
+                window.load_data()
+        except Exception as e:
+            logging.error(f"Ошибка при обновлении окна {key}: {str(e)}")
+
+    def remember_watermark(self, key, window):
+        self.watermarks.pop(key, None)
+        if not getattr(window, "CHANGE_TABLES", None) or getattr(window, "conn", None) is None or is_busy(window):
+            return
+        try:
+            self.watermarks[key] = change_watermark(window.conn)
+        except Exception as e:
+            logging.warning(f"Не удалось запомнить состояние окна {key}: {str(e)}")
+
+    def key_of(self, window):
+        for key, candidate in self.windows.items():
+            if candidate is window:
+                return key
+        return None
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Close:
+            key = self.key_of(obj)
+            if key is not None:
+                event.ignore()
+                obj.hide()
+                self.hidden_at[key] = time.monotonic()
+                self.remember_watermark(key, obj)
+                self.trim()
+                return True
+        return super().eventFilter(obj, event)
+
+    def trim(self):
+        """Закрытие самых давних скрытых окон сверх лимитов по числу окон и ячеек"""
+        # Окна с работающим фоновым запросом не закрываются: их соединение занято потоком
+        hidden = [key for key in self.windows if key in self.hidden_at and not is_busy(self.windows[key])]
+        cells = {key: window_cells(self.windows[key]) for key in hidden}
+        total = sum(cells.values())
+        count = len(hidden)
+        for key in hidden:
+            if count <= self.max_hidden_windows and total <= self.max_hidden_cells:
+                break
+            logging.debug(f"Вытеснение окна {key}: скрыто окон {count}, ячеек {total}")
+            self.evict(key)
+            count -= 1
+            total -= cells[key]
+
+    def evict_idle(self):
+        now = time.monotonic()
+        for key, hidden_at in list(self.hidden_at.items()):
+            if now - hidden_at > self.idle_timeout and not is_busy(self.windows[key]):
+                self.evict(key)
+
+    def evict(self, key):
+        """Настоящее закрытие окна: его closeEvent закрывает соединение с базой"""
+        window = self.windows.pop(key, None)
+        self.hidden_at.pop(key, None)
+        self.watermarks.pop(key, None)
+        if window is None:
+            return
+        window.removeEventFilter(self)
+        # Скрытое окно не должно получать сигналы приложения до и после удаления
+        disconnect_global(window)
+        window.close()
+        window.deleteLater()
+        logging.debug(f"Закрыто окно {key}")
+
+    def close_all(self):
+        self.eviction_timer.stop()
+        for key in list(self.windows):
+            self.evict(key)